@@ -1,7 +1,9 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import Dict, Any, Optional
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Dict, Any, Optional, Awaitable, AsyncIterator
+import asyncio
+import json
 import time
 import logging
 from datetime import datetime
@@ -23,6 +25,12 @@ logger = logging.getLogger(__name__)
 orchestrator: Optional[OrchestratorAgent] = None
 start_time = time.time()
 
+# 检查客户端是否断开连接的间隔（秒）
+DISCONNECT_POLL_INTERVAL = 0.5
+
+# 各数据源类型在orchestrator中对应的位置字段
+SOURCE_LOCATION_KEYS = {"file": "path", "http": "url", "text": "location"}
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
@@ -44,6 +52,9 @@ async def lifespan(app: FastAPI):
     
     # 关闭时清理
     logger.info("Shutting down Knowledge Base Multi-Agent System...")
+    if orchestrator is not None:
+        orchestrator.shutdown(wait=False)
+        orchestrator = None
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -71,6 +82,32 @@ async def get_orchestrator() -> OrchestratorAgent:
         )
     return orchestrator
 
+async def run_until_disconnected(http_request: Request, coro: Awaitable[Any]) -> Any:
+    """运行请求对应的协程，客户端断开连接时取消它
+
+    Args:
+        http_request: 当前HTTP请求
+        coro: 要执行的协程
+
+    Returns:
+        协程的返回值
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.info(f"Client disconnected, cancelling {http_request.url.path}")
+                task.cancel()
+                # 499: 客户端关闭了请求（nginx约定），响应不会再被发送
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        # 处理函数本身被取消时，同时取消正在执行的流水线
+        if not task.done():
+            task.cancel()
+
 # 异常处理
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -118,6 +155,7 @@ async def get_system_status(orch: OrchestratorAgent = Depends(get_orchestrator))
 @app.post("/api/v1/knowledge", response_model=AddKnowledgeResponse)
 async def add_knowledge(
     request: AddKnowledgeRequest,
+    http_request: Request,
     orch: OrchestratorAgent = Depends(get_orchestrator)
 ):
     """添加知识到知识库"""
@@ -127,17 +165,19 @@ async def add_knowledge(
         for source in request.sources:
             source_dict = {
                 "type": source.type,
-                "path" if source.type == "file" else "url": source.location,
+                SOURCE_LOCATION_KEYS[source.type]: source.location,
                 "metadata": source.metadata
             }
             sources.append(source_dict)
         
         payload = {
             "sources": sources,
-            "processing_options": request.processing_options
+            "processing_options": request.processing_options or {}
         }
         
-        result = orch.receive_request("api", "add_knowledge", payload)
+        result = await run_until_disconnected(
+            http_request, orch.receive_request("api", "add_knowledge", payload)
+        )
         
         if result.get("status") == "error":
             raise HTTPException(
@@ -174,16 +214,19 @@ async def get_task_status(task_id: str):
 @app.post("/api/v1/chat/query", response_model=QueryResponse)
 async def query_knowledge(
     request: QueryRequest,
+    http_request: Request,
     orch: OrchestratorAgent = Depends(get_orchestrator)
 ):
     """查询知识库（RAG）"""
     try:
         payload = {
             "query": request.query,
-            "search_params": request.search_params
+            "search_params": request.search_params or {}
         }
         
-        result = orch.receive_request("api", "query", payload)
+        result = await run_until_disconnected(
+            http_request, orch.receive_request("api", "query", payload)
+        )
         
         if result.get("status") == "error":
             raise HTTPException(
@@ -207,6 +250,45 @@ async def query_knowledge(
             detail=f"Query failed: {str(e)}"
         )
 
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """按 Server-Sent Events 格式编码一个事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/v1/chat/query/stream")
+async def stream_query_knowledge(
+    request: QueryRequest,
+    orch: OrchestratorAgent = Depends(get_orchestrator)
+):
+    """流式查询知识库（RAG）
+
+    以SSE返回：先发送 sources 事件（检索到的来源），再逐个发送 token 事件（LLM生成的片段），
+    最后发送 done 事件（完整答案）；出错时发送 error 事件。
+    客户端断开连接时，StreamingResponse 会取消生成器，流水线随之停止。
+    """
+    payload = {
+        "query": request.query,
+        "search_params": request.search_params or {}
+    }
+
+    async def event_stream() -> AsyncIterator[str]:
+        events = orch.stream_query(payload)
+        try:
+            async for event in events:
+                if event["event"] == "done":
+                    event["data"]["session_id"] = request.session_id
+                yield format_sse(event["event"], event["data"])
+        except Exception as e:
+            logger.error(f"Failed to stream query: {e}")
+            yield format_sse("error", {"message": f"Query failed: {str(e)}"})
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # --- 调试端点 ---
 @app.get("/api/v1/debug/agents")
 async def debug_agents(orch: OrchestratorAgent = Depends(get_orchestrator)):
@@ -1,5 +1,8 @@
 import os
-from typing import List, Dict, Any
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple, Union
+import aiohttp
 import requests
 try:
     import PyPDF2
@@ -15,6 +18,24 @@ class RawDocument:
         self.metadata = metadata
 
 class DataCollectionAgent:
+    def __init__(self,
+                 max_concurrency: int = 32,
+                 max_per_host: int = 8,
+                 file_workers: int = 4,
+                 http_timeout: float = 30.0):
+        """
+        Args:
+            max_concurrency: Upper bound on sources collected at the same time (and on open HTTP connections).
+            max_per_host: Upper bound on simultaneous HTTP connections to a single host.
+            file_workers: Threads used for blocking file reads.
+            http_timeout: Total timeout in seconds for one HTTP fetch.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.file_workers = file_workers
+        self.http_timeout = http_timeout
+        self._file_executor: Optional[ThreadPoolExecutor] = None
+
     def collect(self, source_config: Dict) -> List[RawDocument]:
         source_type = source_config.get("type")
         if source_type == "file":
@@ -26,6 +47,83 @@ class DataCollectionAgent:
         else:
             raise ValueError(f"Unsupported source type: {source_type}")
 
+    async def acollect(self, source_config: Dict, session: Optional[aiohttp.ClientSession] = None) -> List[RawDocument]:
+        """
+        Async counterpart of `collect`: HTTP sources are fetched through `session`
+        (a one-off session is opened if none is given) and files are read on the
+        agent's thread pool, so the event loop is never blocked.
+        """
+        source_type = source_config.get("type")
+        if source_type == "file":
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_file_executor(), self._collect_from_file, source_config.get("path"))
+        elif source_type == "http":
+            if session is None:
+                async with self._open_session(self.max_concurrency, self.max_per_host) as own_session:
+                    return await self._acollect_from_http(source_config.get("url"), own_session)
+            return await self._acollect_from_http(source_config.get("url"), session)
+        elif source_type == "text":
+            return self._collect_from_text(source_config.get("location"), source_config.get("metadata", {}))
+        else:
+            raise ValueError(f"Unsupported source type: {source_type}")
+
+    async def acollect_all(self,
+                           sources: List[Dict],
+                           max_concurrency: Optional[int] = None,
+                           max_per_host: Optional[int] = None) -> AsyncIterator[Tuple[int, Union[List[RawDocument], Exception]]]:
+        """
+        Collects many sources concurrently and yields `(source_index, documents)` pairs
+        in completion order. A failing source yields `(source_index, exception)` instead
+        of aborting the others. At most `max_concurrency` sources are in flight, and HTTP
+        fetches share one pooled session limited to `max_per_host` connections per host.
+        Closing the generator early cancels the fetches still in flight.
+        """
+        max_concurrency = max_concurrency or self.max_concurrency
+        max_per_host = max_per_host or self.max_per_host
+        semaphore = asyncio.Semaphore(max_concurrency)
+        session = None
+        if any(source.get("type") == "http" for source in sources):
+            session = self._open_session(max_concurrency, max_per_host)
+
+        async def run(index: int, source: Dict):
+            async with semaphore:
+                try:
+                    return index, await self.acollect(source, session)
+                except Exception as e:
+                    return index, e
+
+        tasks = [asyncio.create_task(run(index, source)) for index, source in enumerate(sources)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if session is not None:
+                await session.close()
+
+    def close(self):
+        """Shuts down the file-reading thread pool."""
+        if self._file_executor is not None:
+            self._file_executor.shutdown(wait=False)
+            self._file_executor = None
+
+    def _get_file_executor(self) -> ThreadPoolExecutor:
+        if self._file_executor is None:
+            self._file_executor = ThreadPoolExecutor(max_workers=self.file_workers, thread_name_prefix="collect-file")
+        return self._file_executor
+
+    def _open_session(self, max_concurrency: int, max_per_host: int) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=max_concurrency, limit_per_host=max_per_host)
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.http_timeout))
+
+    async def _acollect_from_http(self, url: str, session: aiohttp.ClientSession) -> List[RawDocument]:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            content = await response.text()
+        return [RawDocument(id=url, content=content, source=url, type="http", metadata={})]
+
     def _collect_from_file(self, file_path: str) -> List[RawDocument]:
         _, ext = os.path.splitext(file_path)
         ext = ext.lower()
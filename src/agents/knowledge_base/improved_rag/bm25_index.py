@@ -0,0 +1,136 @@
+"""
+BM25关键词检索 - 增量维护的倒排索引
+"""
+
+from typing import List, Dict, Optional, Iterable, Tuple, Callable
+import heapq
+import math
+from .tokenizer import default_tokenizer
+
+
+class BM25Index:
+    """BM25倒排索引
+
+    词项来自分词器（默认中文字符n-gram），postings 记录每个词项出现的文档及词频，查询只访问查询词项的倒排链，
+    开销与命中的文档数成正比，而不是与语料规模成正比。
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75,
+                 tokenizer: Optional[Callable[[str], List[str]]] = None):
+        """初始化索引
+
+        Args:
+            k1: 词频饱和参数
+            b: 文档长度归一化参数
+            tokenizer: 分词函数，默认为中文n-gram分词器
+        """
+        self.k1 = k1
+        self.b = b
+        self.tokenizer = tokenizer or default_tokenizer
+        # 分词器可以为查询提供单独的切分方式（如 CJKTokenizer.tokenize_query）
+        self.query_tokenizer = getattr(self.tokenizer, 'tokenize_query', self.tokenizer)
+        self.postings: Dict[str, Dict[str, int]] = {}   # 词项 -> {doc_id: 词频}
+        self.doc_lengths: Dict[str, int] = {}
+        self._doc_terms: Dict[str, List[str]] = {}      # doc_id -> 去重后的词项，用于删除
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.doc_lengths
+
+    @property
+    def average_length(self) -> float:
+        return self._total_length / len(self.doc_lengths) if self.doc_lengths else 0.0
+
+    def add(self, doc_id: str, text: str) -> None:
+        """写入或覆盖一个文档"""
+        self.remove(doc_id)
+        tokens = self.tokenizer(text)
+        term_freqs: Dict[str, int] = {}
+        for token in tokens:
+            term_freqs[token] = term_freqs.get(token, 0) + 1
+        for term, freq in term_freqs.items():
+            self.postings.setdefault(term, {})[doc_id] = freq
+        self.doc_lengths[doc_id] = len(tokens)
+        self._doc_terms[doc_id] = list(term_freqs)
+        self._total_length += len(tokens)
+
+    def remove(self, doc_id: str) -> bool:
+        """删除一个文档的所有倒排项"""
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return False
+        self._total_length -= length
+        for term in self._doc_terms.pop(doc_id, ()):
+            docs = self.postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+        return True
+
+    def clear(self) -> None:
+        self.postings = {}
+        self.doc_lengths = {}
+        self._doc_terms = {}
+        self._total_length = 0
+
+    def idf(self, term: str) -> float:
+        """BM25 idf（加1平滑，保证非负）"""
+        doc_freq = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.doc_lengths) - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def search(self, query: str, top_k: Optional[int] = None,
+               candidate_ids: Optional[Iterable[str]] = None,
+               normalize: bool = False) -> List[Tuple[float, str]]:
+        """对查询文本做BM25打分
+
+        Args:
+            query: 查询文本
+            top_k: 返回结果数量，为None时返回所有命中文档
+            candidate_ids: 可选的候选文档id集合，只在其中打分
+            normalize: 为True时把分数除以查询词项idf之和，映射到[0, 1]，
+                       约等于按idf加权的查询词覆盖率；索引中不存在的词项（如“是多少”）
+                       不计入，否则它们会把所有分数压低
+
+        Returns:
+            按分数降序排列的 (score, doc_id) 列表
+        """
+        scores = self.scores(query, candidate_ids, normalize)
+        ranked = ((score, doc_id) for doc_id, score in scores.items())
+        if top_k is None:
+            return sorted(ranked, reverse=True)
+        return heapq.nlargest(top_k, ranked)
+
+    def scores(self, query: str, candidate_ids: Optional[Iterable[str]] = None,
+               normalize: bool = False) -> Dict[str, float]:
+        """返回所有命中文档的BM25分数（doc_id -> score），不排序
+
+        调用方需要在打分后再做过滤时，可在此结果上流式选择top-k。
+        """
+        terms = set(self.query_tokenizer(query))
+        if not terms or not self.doc_lengths:
+            return {}
+        if candidate_ids is not None and not isinstance(candidate_ids, (set, frozenset, dict)):
+            candidate_ids = set(candidate_ids)
+
+        avg_length = self.average_length or 1.0
+        k1, b = self.k1, self.b
+        scores: Dict[str, float] = {}
+        idf_total = 0.0
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            idf_total += idf
+            for doc_id, freq in postings.items():
+                if candidate_ids is not None and doc_id not in candidate_ids:
+                    continue
+                norm = k1 * (1 - b + b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (k1 + 1) / (freq + norm)
+
+        if normalize and idf_total > 0:
+            scores = {doc_id: min(1.0, score / idf_total) for doc_id, score in scores.items()}
+        return scores
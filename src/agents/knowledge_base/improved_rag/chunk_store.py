@@ -0,0 +1,255 @@
+"""
+列式chunk存储 - 用共享缓冲区和定长数组代替逐个chunk的Python对象
+"""
+
+from typing import Any, Dict, Iterator, List
+from array import array
+from collections.abc import MutableMapping
+
+
+class _ValueTable:
+    """字典编码表：相同的值只保存一份，chunk中只记录整数编码"""
+
+    __slots__ = ('values', '_codes')
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+
+    def encode(self, value: Any) -> int:
+        try:
+            # 带上类型，避免 1、1.0、True 被编码成同一个值
+            key = (type(value), value)
+            code = self._codes.get(key)
+        except TypeError:
+            # 不可哈希的值（列表、字典等）不去重
+            self.values.append(value)
+            return len(self.values) - 1
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[key] = code
+        return code
+
+
+class ChunkView:
+    """列式存储中一个chunk的轻量视图
+
+    提供与 ProcessedKnowledgeChunk 相同的属性，访问时才从列中解码。
+    metadata、vector 等每次访问都返回新的对象，修改它们不会写回存储。
+    """
+
+    __slots__ = ('_store', 'id')
+
+    def __init__(self, store: 'ColumnarChunkStore', chunk_id: str):
+        self._store = store
+        self.id = chunk_id
+
+    @property
+    def original_id(self) -> str:
+        return self._store._decode(self.id, 'original_id')
+
+    @property
+    def text_content(self) -> str:
+        return self._store._decode(self.id, 'text_content')
+
+    @property
+    def vector(self) -> List[float]:
+        return self._store._decode(self.id, 'vector')
+
+    @property
+    def category(self) -> str:
+        return self._store._decode(self.id, 'category')
+
+    @property
+    def entities(self) -> List[str]:
+        return self._store._decode(self.id, 'entities')
+
+    @property
+    def relationships(self) -> List[Dict]:
+        return self._store._decode(self.id, 'relationships')
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self._store._decode(self.id, 'metadata')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in ColumnarChunkStore.FIELDS}
+
+    def __repr__(self) -> str:
+        return f"ChunkView(id={self.id!r})"
+
+
+class ColumnarChunkStore(MutableMapping):
+    """列式chunk存储，按 chunk id 映射到 ChunkView
+
+    - 文本：UTF-8 编码后追加到一个共享 bytearray，只记录偏移和长度
+    - 向量：按维度分段保存在 float32 的 array 中（同一存储内允许不同维度）
+    - original_id / category / 实体 / 元数据键值：字典编码，每个不同的值只保存一份
+    删除只标记槽位，废弃的槽位超过 compaction_ratio 时整体重建。
+    """
+
+    FIELDS = ('id', 'original_id', 'text_content', 'vector', 'category', 'entities', 'relationships', 'metadata')
+
+    def __init__(self, compaction_ratio: float = 0.5):
+        """初始化存储
+
+        Args:
+            compaction_ratio: 废弃槽位占存活槽位的比例超过该值时重建
+        """
+        self.compaction_ratio = compaction_ratio
+        self._slots: Dict[str, int] = {}          # chunk id -> 槽位
+        self._dead = 0
+        self._table = _ValueTable()
+
+        self._text = bytearray()
+        self._text_offsets = array('q')
+        self._text_lengths = array('q')
+        self._original_ids = array('i')
+        self._categories = array('i')
+        # 实体和元数据是变长的，编码拼接在一个数组中，按槽位记录起点和个数
+        self._entity_offsets = array('q')
+        self._entity_counts = array('i')
+        self._entity_codes = array('i')
+        self._meta_offsets = array('q')
+        self._meta_counts = array('i')
+        self._meta_codes = array('i')             # 键编码、值编码交替存放
+        self._relationships: Dict[int, List[Dict]] = {}   # 稀疏：只保存非空的关系
+        self._vector_dims = array('i')            # 0 表示没有向量
+        self._vector_rows = array('q')
+        self._vectors: Dict[int, array] = {}      # 维度 -> 按行拼接的float32数组
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._slots))
+
+    def __contains__(self, chunk_id: object) -> bool:
+        return chunk_id in self._slots
+
+    def __getitem__(self, chunk_id: str) -> ChunkView:
+        if chunk_id not in self._slots:
+            raise KeyError(chunk_id)
+        return ChunkView(self, chunk_id)
+
+    def __setitem__(self, chunk_id: str, chunk: Any) -> None:
+        if chunk_id in self._slots:
+            self._release(chunk_id)
+        self._append(chunk_id, chunk)
+        self._maybe_compact()
+
+    def __delitem__(self, chunk_id: str) -> None:
+        if chunk_id not in self._slots:
+            raise KeyError(chunk_id)
+        self._release(chunk_id)
+        self._maybe_compact()
+
+    def pop(self, chunk_id: str, *default: Any) -> Any:
+        """删除并返回chunk，返回的是独立的 ProcessedKnowledgeChunk 而不是视图"""
+        if chunk_id not in self._slots:
+            if default:
+                return default[0]
+            raise KeyError(chunk_id)
+        chunk = self.materialize(chunk_id)
+        del self[chunk_id]
+        return chunk
+
+    def materialize(self, chunk_id: str) -> Any:
+        """把一个chunk解码为普通的 ProcessedKnowledgeChunk 对象"""
+        from ..knowledge_processing_agent import ProcessedKnowledgeChunk
+        return ProcessedKnowledgeChunk(**ChunkView(self, chunk_id).to_dict())
+
+    def compact(self) -> None:
+        """只保留存活的chunk，重建所有列"""
+        fresh = ColumnarChunkStore(self.compaction_ratio)
+        for chunk_id in self._slots:
+            fresh._append(chunk_id, ChunkView(self, chunk_id))
+        self.__dict__.update(fresh.__dict__)
+
+    @property
+    def nbytes(self) -> int:
+        """各列数组及文本缓冲区占用的字节数（不含字典编码表）"""
+        columns = [
+            self._text_offsets, self._text_lengths, self._original_ids, self._categories,
+            self._entity_offsets, self._entity_counts, self._entity_codes,
+            self._meta_offsets, self._meta_counts, self._meta_codes,
+            self._vector_dims, self._vector_rows, *self._vectors.values()
+        ]
+        return len(self._text) + sum(column.itemsize * len(column) for column in columns)
+
+    def _append(self, chunk_id: str, chunk: Any) -> None:
+        slot = len(self._text_offsets)
+        encode = self._table.encode
+
+        text = chunk.text_content.encode('utf-8')
+        self._text_offsets.append(len(self._text))
+        self._text_lengths.append(len(text))
+        self._text.extend(text)
+
+        self._original_ids.append(encode(chunk.original_id))
+        self._categories.append(encode(chunk.category))
+
+        entities = chunk.entities or []
+        self._entity_offsets.append(len(self._entity_codes))
+        self._entity_counts.append(len(entities))
+        self._entity_codes.extend(encode(entity) for entity in entities)
+
+        metadata = chunk.metadata or {}
+        self._meta_offsets.append(len(self._meta_codes))
+        self._meta_counts.append(len(metadata))
+        for key, value in metadata.items():
+            self._meta_codes.append(encode(key))
+            self._meta_codes.append(encode(value))
+
+        if chunk.relationships:
+            self._relationships[slot] = list(chunk.relationships)
+
+        vector = chunk.vector
+        if vector is not None and len(vector):
+            dim = len(vector)
+            segment = self._vectors.setdefault(dim, array('f'))
+            self._vector_dims.append(dim)
+            self._vector_rows.append(len(segment) // dim)
+            segment.extend(vector)
+        else:
+            self._vector_dims.append(0)
+            self._vector_rows.append(-1)
+
+        self._slots[chunk_id] = slot
+
+    def _maybe_compact(self) -> None:
+        if self._dead > max(len(self._slots), 1) * self.compaction_ratio:
+            self.compact()
+
+    def _release(self, chunk_id: str) -> None:
+        slot = self._slots.pop(chunk_id)
+        self._relationships.pop(slot, None)
+        self._dead += 1
+
+    def _decode(self, chunk_id: str, field: str) -> Any:
+        slot = self._slots[chunk_id]
+        values = self._table.values
+        if field == 'text_content':
+            start = self._text_offsets[slot]
+            return self._text[start:start + self._text_lengths[slot]].decode('utf-8')
+        if field == 'metadata':
+            start = self._meta_offsets[slot]
+            codes = self._meta_codes[start:start + 2 * self._meta_counts[slot]]
+            return {values[codes[i]]: values[codes[i + 1]] for i in range(0, len(codes), 2)}
+        if field == 'vector':
+            dim = self._vector_dims[slot]
+            if dim == 0:
+                return []
+            start = self._vector_rows[slot] * dim
+            return self._vectors[dim][start:start + dim].tolist()
+        if field == 'original_id':
+            return values[self._original_ids[slot]]
+        if field == 'category':
+            return values[self._categories[slot]]
+        if field == 'entities':
+            start = self._entity_offsets[slot]
+            return [values[code] for code in self._entity_codes[start:start + self._entity_counts[slot]]]
+        if field == 'relationships':
+            return list(self._relationships.get(slot, ()))
+        raise AttributeError(field)
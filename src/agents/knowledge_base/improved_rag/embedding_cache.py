@@ -0,0 +1,258 @@
+"""
+持久化嵌入向量缓存 - 以 (模型, 文本SHA-256) 为键的本地内容寻址缓存
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+import numpy as np
+
+
+class EmbeddingCache:
+    """本地嵌入向量缓存
+
+    索引保存在 SQLite 中，向量按维度保存在内存映射的 float32 段文件里
+    （vectors_<dim>.f32，每行一个向量）。超出条数或字节预算时按最近最少使用淘汰，
+    被淘汰的行号会被复用。进程重启或重新入库相同文本时无需再次计算嵌入。
+
+    命中只在内存中记录访问时间，累计 access_flush_size 条或淘汰、关闭前才批量写回；
+    条目数和向量总维度也在内存中维护，热路径上没有全表统计。
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000, max_bytes: Optional[int] = None,
+                 access_flush_size: int = 1024):
+        """初始化缓存
+
+        Args:
+            path: 缓存目录，不存在时自动创建
+            max_entries: 最大缓存条目数
+            max_bytes: 可选的向量数据字节上限
+            access_flush_size: 累计多少条未写回的访问时间后批量写入索引
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.access_flush_size = access_flush_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._segments: Dict[int, np.memmap] = {}
+        # (model, text_hash) -> 最近访问时间，尚未写回索引
+        self._pending_access: Dict[Tuple[str, str], float] = {}
+        self._db = sqlite3.connect(os.path.join(path, 'index.sqlite'), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                slot INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+            CREATE TABLE IF NOT EXISTS free_slots (
+                dim INTEGER NOT NULL,
+                slot INTEGER NOT NULL,
+                PRIMARY KEY (dim, slot)
+            );
+            CREATE TABLE IF NOT EXISTS segments (
+                dim INTEGER PRIMARY KEY,
+                next_slot INTEGER NOT NULL
+            );
+        """)
+        self._db.commit()
+        self._entry_count, self._total_dims = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(dim), 0) FROM entries"
+        ).fetchone()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        """规范化文本（NFKC、合并空白）后计算SHA-256"""
+        normalized = ' '.join(unicodedata.normalize('NFKC', text).split())
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """获取单个文本的缓存向量，不存在时返回None"""
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """批量获取缓存向量，结果与texts一一对应"""
+        hashes = [self.text_hash(text) for text in texts]
+        with self._lock:
+            found: Dict[str, Tuple[int, int]] = {}
+            unique_hashes = list(dict.fromkeys(hashes))
+            # SQLite单条语句的参数个数有限，分段查询
+            for start in range(0, len(unique_hashes), 500):
+                part = unique_hashes[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT text_hash, dim, slot FROM entries WHERE model = ? AND text_hash IN ({','.join('?' * len(part))})",
+                    [model, *part]
+                ).fetchall()
+                found.update((text_hash, (dim, slot)) for text_hash, dim, slot in rows)
+
+            results = []
+            for text_hash in hashes:
+                location = found.get(text_hash)
+                if location is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    dim, slot = location
+                    results.append(self._segment(dim)[slot].tolist())
+
+            if found:
+                now = time.time()
+                self._pending_access.update(((model, text_hash), now) for text_hash in found)
+                if len(self._pending_access) >= self.access_flush_size:
+                    self._flush_access()
+                    self._db.commit()
+        return results
+
+    def put(self, model: str, text: str, vector: List[float]) -> None:
+        """写入单个文本的向量"""
+        self.put_many(model, [text], [vector])
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        """批量写入向量，已存在的条目会被覆盖"""
+        if not texts:
+            return
+        with self._lock:
+            now = time.time()
+            for text, vector in zip(texts, vectors):
+                data = np.asarray(vector, dtype=np.float32)
+                text_hash = self.text_hash(text)
+                row = self._db.execute(
+                    "SELECT dim, slot FROM entries WHERE model = ? AND text_hash = ?", (model, text_hash)
+                ).fetchone()
+                if row is not None and row[0] == data.shape[0]:
+                    slot = row[1]
+                else:
+                    if row is not None:
+                        self._release_slot(*row)
+                        self._entry_count -= 1
+                        self._total_dims -= row[0]
+                    slot = self._allocate_slot(data.shape[0])
+                    self._entry_count += 1
+                    self._total_dims += data.shape[0]
+                self._segment(data.shape[0], slot + 1)[slot] = data
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (model, text_hash, dim, slot, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (model, text_hash, data.shape[0], slot, now)
+                )
+                self._pending_access.pop((model, text_hash), None)
+            self._evict()
+            self._db.commit()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """命中/未命中/淘汰计数及当前条目数"""
+        entries, dims = self._entry_count, self._total_dims
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'bytes': dims * 4,
+        }
+
+    def clear(self) -> None:
+        """清空缓存（段文件保留，行号全部回收）"""
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("DELETE FROM free_slots")
+            self._db.execute("UPDATE segments SET next_slot = 0")
+            self._db.commit()
+            self._pending_access.clear()
+            self._entry_count = self._total_dims = 0
+
+    def flush(self) -> None:
+        """把内存中的访问时间写回索引，并把向量段刷到磁盘"""
+        with self._lock:
+            self._flush_access()
+            self._db.commit()
+            for segment in self._segments.values():
+                segment.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_access()
+            self._db.commit()
+            for segment in self._segments.values():
+                segment.flush()
+            self._segments.clear()
+            self._db.close()
+
+    def _flush_access(self) -> None:
+        """批量写回命中记录的访问时间"""
+        if not self._pending_access:
+            return
+        self._db.executemany(
+            "UPDATE entries SET last_access = ? WHERE model = ? AND text_hash = ?",
+            [(accessed, model, text_hash) for (model, text_hash), accessed in self._pending_access.items()]
+        )
+        self._pending_access.clear()
+
+    def _evict(self) -> None:
+        """按 last_access 淘汰最久未使用的条目，直到满足条数和字节预算"""
+        while True:
+            excess = max(0, self._entry_count - self.max_entries)
+            if self.max_bytes is not None and self._total_dims * 4 > self.max_bytes:
+                excess = max(excess, 1)
+            if excess == 0:
+                return
+            # 淘汰顺序依赖最新的访问时间
+            self._flush_access()
+            victims = self._db.execute(
+                "SELECT model, text_hash, dim, slot FROM entries ORDER BY last_access LIMIT ?", (excess,)
+            ).fetchall()
+            for model, text_hash, dim, slot in victims:
+                self._db.execute("DELETE FROM entries WHERE model = ? AND text_hash = ?", (model, text_hash))
+                self._release_slot(dim, slot)
+                self._entry_count -= 1
+                self._total_dims -= dim
+                self.evictions += 1
+
+    def _allocate_slot(self, dim: int) -> int:
+        row = self._db.execute("SELECT slot FROM free_slots WHERE dim = ? LIMIT 1", (dim,)).fetchone()
+        if row is not None:
+            self._db.execute("DELETE FROM free_slots WHERE dim = ? AND slot = ?", (dim, row[0]))
+            return row[0]
+        row = self._db.execute("SELECT next_slot FROM segments WHERE dim = ?", (dim,)).fetchone()
+        slot = row[0] if row else 0
+        self._db.execute("INSERT OR REPLACE INTO segments (dim, next_slot) VALUES (?, ?)", (dim, slot + 1))
+        return slot
+
+    def _release_slot(self, dim: int, slot: int) -> None:
+        self._db.execute("INSERT OR IGNORE INTO free_slots (dim, slot) VALUES (?, ?)", (dim, slot))
+
+    def _segment(self, dim: int, min_rows: int = 0) -> np.memmap:
+        """返回维度为dim的内存映射段，行数不足min_rows时按倍数扩容"""
+        segment = self._segments.get(dim)
+        if segment is not None and segment.shape[0] >= min_rows:
+            return segment
+
+        file_path = os.path.join(self.path, f'vectors_{dim}.f32')
+        row_bytes = dim * 4
+        current_rows = os.path.getsize(file_path) // row_bytes if os.path.exists(file_path) else 0
+        rows = current_rows
+        if rows < max(min_rows, 1):
+            rows = max(min_rows, current_rows * 2, 1024)
+            if segment is not None:
+                segment.flush()
+            with open(file_path, 'ab') as f:
+                f.truncate(rows * row_bytes)
+        segment = np.memmap(file_path, dtype=np.float32, mode='r+', shape=(rows, dim))
+        self._segments[dim] = segment
+        return segment
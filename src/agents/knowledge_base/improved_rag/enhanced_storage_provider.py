@@ -4,8 +4,17 @@
 
 from typing import List, Dict, Any, Optional
 from abc import ABC, abstractmethod
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from ..storage_providers.base import BaseStorageProvider, RetrievedChunk, ProcessedKnowledgeChunk
 from .semantic_retriever import SemanticRetriever, EmbeddingProvider, SimpleEmbeddingProvider
+from .vector_index import FlatVectorIndex
+from .hnsw_index import HNSWIndex
+from .product_quantizer import PQVectorIndex
+from .chunk_store import ColumnarChunkStore
+from .bm25_index import BM25Index
+from .metadata_index import MetadataIndex
+from .tokenizer import CJKTokenizer
 
 
 class EnhancedStorageProvider(BaseStorageProvider):
@@ -14,26 +23,132 @@ class EnhancedStorageProvider(BaseStorageProvider):
     def __init__(self, config: Dict[str, Any] = None, embedding_provider: EmbeddingProvider = None):
         super().__init__(config or {})
         self.embedding_provider = embedding_provider or SimpleEmbeddingProvider()
-        self.semantic_retriever = SemanticRetriever(self.embedding_provider)
         
         # 存储嵌入向量
         self.embeddings_db: Dict[str, List[float]] = {}
+        # 可检索chunk的BM25倒排索引，在store/promote时增量维护
+        self.keyword_index = BM25Index(
+            k1=self.config.get('bm25_k1', 1.5),
+            b=self.config.get('bm25_b', 0.75),
+            tokenizer=CJKTokenizer(dictionary=self.config.get('tokenizer_dictionary'))
+        )
+        # 常用过滤字段的哈希索引，带过滤条件的检索只访问命中的子集
+        self.metadata_index = MetadataIndex(self.config.get('metadata_index_keys', MetadataIndex.DEFAULT_KEYS))
+        # 检索器直接复用入库时计算的向量，不再在查询时重新嵌入
+        self.semantic_retriever = SemanticRetriever(
+            self.embedding_provider,
+            keyword_index=self.keyword_index,
+            embeddings=self.embeddings_db
+        )
+        # 可检索chunk的向量索引，与embeddings_db保持同步
+        self.vector_index = self._create_vector_index(self.config)
+        if isinstance(self.vector_index, PQVectorIndex) and self.config.get('pq_keep_vectors', False):
+            # 保留原始向量时用它们对PQ候选精确重排
+            self.vector_index.vector_loader = lambda chunk_ids: [self.embeddings_db[chunk_id] for chunk_id in chunk_ids]
+        # 查询嵌入在此线程池中执行，与过滤和BM25检索并行；首次检索时创建，close() 时关闭
+        self._retrieval_executor: Optional[ThreadPoolExecutor] = None
+    
+    @staticmethod
+    def _create_vector_index(config: Dict[str, Any]):
+        """根据配置创建向量索引：'flat'（精确，默认）、'hnsw'（近似）或 'pq'（乘积量化压缩）"""
+        index_type = config.get('vector_index', 'flat')
+        if index_type == 'flat':
+            return FlatVectorIndex()
+        if index_type == 'hnsw':
+            return HNSWIndex(
+                m=config.get('hnsw_m', 16),
+                ef_construction=config.get('hnsw_ef_construction', 200),
+                ef_search=config.get('hnsw_ef_search', 64),
+                compaction_ratio=config.get('hnsw_compaction_ratio', 0.5)
+            )
+        if index_type == 'pq':
+            return PQVectorIndex(
+                num_subspaces=config.get('pq_subspaces', 16),
+                num_centroids=config.get('pq_centroids', 256),
+                train_size=config.get('pq_train_size', 4096),
+                rerank_factor=config.get('pq_rerank_factor', 4)
+            )
+        raise ValueError(f"Unsupported vector index type: {index_type}")
     
     async def store(self, chunks: List[ProcessedKnowledgeChunk]) -> bool:
         """存储chunks并生成嵌入向量"""
-        # 调用原有的存储逻辑
-        result = self._store_chunks(chunks)
+        # 索引修改持有写锁，在工作线程中执行，等待读者时不会阻塞事件循环；
+        # 生成嵌入期间不持有锁，检索可以继续
+        result = await asyncio.to_thread(self._store_and_index_text, chunks)
         
         if result:
-            # 生成并存储嵌入向量
-            for chunk in chunks:
+            # 批量、并发生成嵌入向量，并整体写回
+            embeddings = await self._embed_chunks(chunks)
+            # 暂存区的chunk在提升后才进入索引
+            searchable_ids = [
+                chunk.id for chunk in chunks
+                if chunk.id in embeddings and not chunk.metadata.get('stage', False)
+            ]
+            await asyncio.to_thread(self._index_embeddings, embeddings, searchable_ids)
+        
+        return result
+    
+    def _store_and_index_text(self, chunks: List[ProcessedKnowledgeChunk]) -> bool:
+        """持有写锁存储chunks，并把可检索的chunk加入BM25和元数据索引"""
+        with self.index_lock.write():
+            result = self._store_chunks(chunks)
+            if result:
+                for chunk in chunks:
+                    if not chunk.metadata.get('stage', False):
+                        self.keyword_index.add(chunk.id, chunk.text_content)
+                        self.metadata_index.add(chunk.id, chunk.metadata)
+        return result
+    
+    def _index_embeddings(self, embeddings: Dict[str, List[float]], searchable_ids: List[str]) -> None:
+        """持有写锁写回嵌入向量，并把可检索的chunk加入向量索引"""
+        with self.index_lock.write():
+            self.embeddings_db.update(embeddings)
+            try:
+                self.vector_index.add_batch(searchable_ids, [embeddings[chunk_id] for chunk_id in searchable_ids])
+                self._release_embeddings(searchable_ids)
+            except Exception as e:
+                print(f"Failed to index embeddings for {len(searchable_ids)} chunks: {e}")
+    
+    def _make_embedding_batches(self, chunks: List[ProcessedKnowledgeChunk]) -> List[List[ProcessedKnowledgeChunk]]:
+        """按条数和token预算把chunks切成微批次"""
+        max_size = self.config.get('embedding_batch_size', 32)
+        max_tokens = self.config.get('embedding_batch_tokens', 8000)
+        
+        batches = []
+        current, current_tokens = [], 0
+        for chunk in chunks:
+            tokens = self.embedding_provider.count_tokens(chunk.text_content)
+            if current and (len(current) >= max_size or current_tokens + tokens > max_tokens):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(chunk)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def _embed_chunks(self, chunks: List[ProcessedKnowledgeChunk]) -> Dict[str, List[float]]:
+        """并发执行多个批量嵌入调用（并发数受 embedding_concurrency 限制）"""
+        semaphore = asyncio.Semaphore(self.config.get('embedding_concurrency', 4))
+        
+        async def embed_batch(batch: List[ProcessedKnowledgeChunk]) -> Dict[str, List[float]]:
+            async with semaphore:
                 try:
-                    embedding = self.embedding_provider.embed_text(chunk.text_content)
-                    self.embeddings_db[chunk.id] = embedding
+                    vectors = await asyncio.to_thread(
+                        self.embedding_provider.embed_batch, [chunk.text_content for chunk in batch]
+                    )
                 except Exception as e:
-                    print(f"Failed to generate embedding for chunk {chunk.id}: {e}")
+                    print(f"Failed to generate embeddings for a batch of {len(batch)} chunks: {e}")
+                    return {}
+            if len(vectors) != len(batch):
+                print(f"Embedding batch size mismatch: expected {len(batch)}, got {len(vectors)}")
+                return {}
+            return {chunk.id: vector for chunk, vector in zip(batch, vectors)}
         
-        return result
+        embeddings: Dict[str, List[float]] = {}
+        for batch_embeddings in await asyncio.gather(*(embed_batch(batch) for batch in self._make_embedding_batches(chunks))):
+            embeddings.update(batch_embeddings)
+        return embeddings
     
     @abstractmethod
     def _store_chunks(self, chunks: List[ProcessedKnowledgeChunk]) -> bool:
@@ -46,40 +161,148 @@ class EnhancedStorageProvider(BaseStorageProvider):
         
         if not query_text:
             # 如果没有查询文本，使用原有的向量检索
-            return self._vector_retrieve(query_vector, top_k, filters)
-        
-        # 获取所有chunks
-        all_chunks = self._get_all_chunks()
+            with self.index_lock.read():
+                return self._vector_retrieve(query_vector, top_k, filters)
         
-        if not all_chunks:
-            return []
+        return self.retrieve_batch([query_text], top_k, filters)[0]
+    
+    def retrieve_batch(self, query_texts: List[str], top_k: int, filters: Dict = None) -> List[List[RetrievedChunk]]:
+        """批量检索：所有查询共用过滤条件
         
-        # 应用元数据过滤器
-        filtered_chunks = self._apply_metadata_filters(all_chunks, filters)
+        语义检索一次批量嵌入所有查询，再对嵌入矩阵做一次矩阵-矩阵乘法，
+        返回与 query_texts 一一对应的结果列表。
+        查询嵌入可能是远程模型调用，在线程池中提前开始，与过滤和BM25检索并行；
+        读锁只在访问索引时持有，不覆盖嵌入调用，入库的写锁不必等待它。
+        """
+        filters = filters or {}
+        if not query_texts or not len(self.metadata_index):
+            return [[] for _ in query_texts]
         
-        # 使用语义检索
         retrieval_method = filters.get('retrieval_method', 'hybrid')  # 'semantic', 'keyword', 'hybrid'
+        embedding_future = None
+        if retrieval_method != 'keyword':
+            embedding_future = self._get_retrieval_executor().submit(self._embed_queries, query_texts)
+        # 两路检索各自只返回前若干个候选，融合时只计算候选的并集
+        semantic_candidates = self.config.get('semantic_candidates', max(top_k * 4, 20))
+        keyword_candidates = self.config.get('keyword_candidates', semantic_candidates)
+        
+        with self.index_lock.read():
+            # 应用元数据过滤器：先查元数据索引得到候选集，再交给向量/BM25索引
+            candidate_ids = self._filter_candidates(filters)
+            if candidate_ids is not None and not candidate_ids:
+                return [[] for _ in query_texts]
+            if retrieval_method == 'keyword':
+                return self._to_retrieved_batch([
+                    self._keyword_search(query_text, top_k, candidate_ids) for query_text in query_texts
+                ])
+            if retrieval_method != 'semantic':
+                keyword_batch = [
+                    self._keyword_search(query_text, keyword_candidates, candidate_ids) for query_text in query_texts
+                ]
+        
+        query_embeddings = embedding_future.result()
+        with self.index_lock.read():
+            if retrieval_method == 'semantic':
+                return self._to_retrieved_batch(self._semantic_search_batch(query_embeddings, top_k, candidate_ids))
+            semantic_batch = self._semantic_search_batch(query_embeddings, semantic_candidates, candidate_ids)
         
-        if retrieval_method == 'semantic':
-            results = self.semantic_retriever.retrieve_semantic(query_text, filtered_chunks, top_k)
-        elif retrieval_method == 'keyword':
-            results = self.semantic_retriever._keyword_retrieve(query_text, filtered_chunks)[:top_k]
-        else:  # hybrid
-            results = self.semantic_retriever.hybrid_retrieve(query_text, filtered_chunks, top_k)
-        
-        # 转换为RetrievedChunk对象
-        retrieved_chunks = []
-        for score, chunk in results:
-            retrieved_chunks.append(
+        # hybrid：融合只使用两路结果，不再访问索引
+        # 余弦相似度和BM25分数尺度不同，默认先按路归一化再加权
+        fusion_method = filters.get('fusion_method', self.config.get('fusion_method', 'minmax'))
+        return self._to_retrieved_batch([
+            SemanticRetriever.fuse_ranked(
+                semantic_results, keyword_results, top_k,
+                semantic_weight=self.config.get('semantic_weight', 0.7),
+                keyword_weight=self.config.get('keyword_weight', 0.3),
+                fusion_method=fusion_method,
+                rrf_k=self.config.get('rrf_k', 60)
+            )
+            for semantic_results, keyword_results in zip(semantic_batch, keyword_batch)
+        ])
+    
+    def close(self) -> None:
+        """关闭检索线程池"""
+        if self._retrieval_executor is not None:
+            self._retrieval_executor.shutdown(wait=True)
+            self._retrieval_executor = None
+    
+    def _get_retrieval_executor(self) -> ThreadPoolExecutor:
+        if self._retrieval_executor is None:
+            self._retrieval_executor = ThreadPoolExecutor(
+                max_workers=self.config.get('retrieval_workers', 2),
+                thread_name_prefix='retrieval'
+            )
+        return self._retrieval_executor
+    
+    @staticmethod
+    def _to_retrieved_batch(batch_results: List[List[tuple]]) -> List[List[RetrievedChunk]]:
+        """把每个查询的 (score, chunk) 列表转换为RetrievedChunk对象"""
+        return [
+            [
                 RetrievedChunk(
                     id=chunk.id,
                     text_content=chunk.text_content,
                     score=score,
                     metadata=chunk.metadata
                 )
-            )
-        
-        return retrieved_chunks
+                for score, chunk in results
+            ]
+            for results in batch_results
+        ]
+    
+    def _embed_queries(self, query_texts: List[str]) -> List[List[float]]:
+        """嵌入查询文本：单个查询走 embed_text，多个查询一次 embed_batch 调用"""
+        if len(query_texts) == 1:
+            return [self.embedding_provider.embed_text(query_texts[0])]
+        return self.embedding_provider.embed_batch(query_texts)
+    
+    def _semantic_search(self, query_text: str, top_k: int, candidate_ids: Optional[List[str]] = None) -> List[tuple]:
+        """在嵌入矩阵上做语义检索：一次矩阵-向量乘法 + top_k 选择"""
+        query_embeddings = self._embed_queries([query_text])
+        with self.index_lock.read():
+            return self._semantic_search_batch(query_embeddings, top_k, candidate_ids)[0]
+    
+    def _semantic_search_batch(self, query_embeddings: List[List[float]], top_k: int,
+                               candidate_ids: Optional[List[str]] = None) -> List[List[tuple]]:
+        """批量语义检索：对已嵌入的查询做一次矩阵-矩阵乘法，调用方持有读锁"""
+        batch_results = []
+        for hits in self.vector_index.search_batch(query_embeddings, top_k, candidate_ids):
+            results = []
+            for score, chunk_id in hits:
+                chunk = self._get_chunk(chunk_id)
+                if chunk is not None:
+                    results.append((score, chunk))
+            batch_results.append(results)
+        return batch_results
+    
+    def _keyword_search(self, query_text: str, top_k: Optional[int], candidate_ids: Optional[List[str]] = None) -> List[tuple]:
+        """在BM25倒排索引上做关键词检索，只访问查询词项的倒排链"""
+        results = []
+        for score, chunk_id in self.keyword_index.search(query_text, top_k, candidate_ids, normalize=True):
+            chunk = self._get_chunk(chunk_id)
+            if chunk is not None:
+                results.append((score, chunk))
+        return results
+    
+    def _index_embedding(self, chunk_id: str, embedding: List[float]) -> None:
+        """记录chunk的嵌入向量并加入检索索引"""
+        with self.index_lock.write():
+            self.embeddings_db[chunk_id] = embedding
+            self.vector_index.add(chunk_id, embedding)
+            self._release_embeddings([chunk_id])
+    
+    def _release_embeddings(self, chunk_ids: List[str]) -> None:
+        """PQ索引不做精确重排时，已编码chunk的原始向量不再常驻内存"""
+        if isinstance(self.vector_index, PQVectorIndex) and self.vector_index.vector_loader is None:
+            for chunk_id in chunk_ids:
+                self.embeddings_db.pop(chunk_id, None)
+    
+    def _unindex_chunk(self, chunk_id: str) -> None:
+        """从嵌入库和所有检索索引中移除chunk"""
+        self.embeddings_db.pop(chunk_id, None)
+        self.vector_index.remove(chunk_id)
+        self.keyword_index.remove(chunk_id)
+        self.metadata_index.remove(chunk_id)
     
     @abstractmethod
     def _vector_retrieve(self, query_vector: List[float], top_k: int, filters: Dict) -> List[RetrievedChunk]:
@@ -91,6 +314,23 @@ class EnhancedStorageProvider(BaseStorageProvider):
         """子类实现获取所有chunks的逻辑"""
         pass
     
+    @abstractmethod
+    def _get_chunk(self, chunk_id: str) -> Optional[ProcessedKnowledgeChunk]:
+        """子类实现按ID获取可检索chunk的逻辑"""
+        pass
+    
+    def _filter_candidates(self, filters: Dict) -> Optional[set]:
+        """求满足元数据过滤条件的chunk id集合，没有过滤条件时返回None"""
+        candidate_ids, residual_filters = self.metadata_index.lookup(filters)
+        if not residual_filters:
+            return candidate_ids
+        # 未建索引的字段只能逐条比较，但只比较索引已缩小的候选集
+        if candidate_ids is None:
+            chunks = self._get_all_chunks()
+        else:
+            chunks = [chunk for chunk in map(self._get_chunk, candidate_ids) if chunk is not None]
+        return {chunk.id for chunk in self._apply_metadata_filters(chunks, residual_filters)}
+    
     def _apply_metadata_filters(self, chunks: List[ProcessedKnowledgeChunk], filters: Dict) -> List[ProcessedKnowledgeChunk]:
         """应用元数据过滤器"""
         if not filters:
@@ -100,7 +340,7 @@ class EnhancedStorageProvider(BaseStorageProvider):
         for chunk in chunks:
             metadata_match = True
             for key, value in filters.items():
-                if key not in ['query_text', 'retrieval_method']:
+                if key not in MetadataIndex.CONTROL_KEYS:
                     if not (key in chunk.metadata and chunk.metadata[key] == value):
                         metadata_match = False
                         break
@@ -116,7 +356,8 @@ class EnhancedMemoryStorageProvider(EnhancedStorageProvider):
     
     def __init__(self, config: Dict[str, Any] = None, embedding_provider: EmbeddingProvider = None):
         super().__init__(config, embedding_provider)
-        self.vector_db: Dict[str, ProcessedKnowledgeChunk] = {}
+        # 可检索chunk按列存储，取出的是轻量视图
+        self.vector_db = ColumnarChunkStore()
         self.staged_chunks: Dict[str, ProcessedKnowledgeChunk] = {}
     
     def _store_chunks(self, chunks: List[ProcessedKnowledgeChunk]) -> bool:
@@ -144,10 +385,15 @@ class EnhancedMemoryStorageProvider(EnhancedStorageProvider):
         """获取所有chunks"""
         return list(self.vector_db.values())
     
+    def _get_chunk(self, chunk_id: str) -> Optional[ProcessedKnowledgeChunk]:
+        """按ID获取chunk"""
+        return self.vector_db.get(chunk_id)
+    
     def get_all_chunk_ids(self) -> List[str]:
         """获取所有chunk IDs"""
         print("[EnhancedMemoryProvider] Fetching all chunk IDs.")
-        return list(self.vector_db.keys())
+        with self.index_lock.read():
+            return list(self.vector_db.keys())
     
     async def list_staged_chunks(self) -> List[str]:
         """列出暂存的chunks"""
@@ -157,14 +403,38 @@ class EnhancedMemoryStorageProvider(EnhancedStorageProvider):
     async def validate_and_promote(self, chunk_id: str) -> bool:
         """将chunk从暂存区移动到主数据库"""
         print(f"[EnhancedMemoryProvider] Promoting chunk {chunk_id}.")
-        if chunk_id in self.staged_chunks:
-            chunk = self.staged_chunks.pop(chunk_id)
-            self.vector_db[chunk.id] = chunk
-            # 同时生成嵌入向量
+        chunk = await asyncio.to_thread(self._promote_chunk, chunk_id)
+        if chunk is not None:
+            # 复用暂存时生成的嵌入向量，缺失时再生成
             try:
-                embedding = self.embedding_provider.embed_text(chunk.text_content)
-                self.embeddings_db[chunk.id] = embedding
+                embedding = self.embeddings_db.get(chunk.id)
+                if embedding is None:
+                    embedding = await asyncio.to_thread(self.embedding_provider.embed_text, chunk.text_content)
+                await asyncio.to_thread(self._index_embedding, chunk.id, embedding)
             except Exception as e:
                 print(f"Failed to generate embedding for promoted chunk {chunk_id}: {e}")
             return True
-        return False
\ No newline at end of file
+        return False
+    
+    def _promote_chunk(self, chunk_id: str) -> Optional[ProcessedKnowledgeChunk]:
+        """持有写锁把chunk移入主数据库并加入文本索引，返回被提升的chunk"""
+        with self.index_lock.write():
+            chunk = self.staged_chunks.pop(chunk_id, None)
+            if chunk is not None:
+                self.vector_db[chunk.id] = chunk
+                self.keyword_index.add(chunk.id, chunk.text_content)
+                self.metadata_index.add(chunk.id, chunk.metadata)
+        return chunk
+    
+    async def delete_chunk(self, chunk_id: str) -> bool:
+        """删除chunk（包括暂存区），同时移除其嵌入向量"""
+        print(f"[EnhancedMemoryProvider] Deleting chunk {chunk_id}.")
+        return await asyncio.to_thread(self._delete_chunk, chunk_id)
+    
+    def _delete_chunk(self, chunk_id: str) -> bool:
+        with self.index_lock.write():
+            chunk = self.vector_db.pop(chunk_id, None) or self.staged_chunks.pop(chunk_id, None)
+            if chunk is None:
+                return False
+            self._unindex_chunk(chunk_id)
+        return True
@@ -0,0 +1,87 @@
+"""
+检索结果融合 - 合并多路检索器的候选列表
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import math
+from .topk import select_top_k
+
+FUSION_METHODS = ('weighted', 'rrf', 'minmax', 'zscore')
+
+
+def fuse(candidate_lists: Sequence[Sequence[Tuple[float, Any]]],
+         weights: Optional[Sequence[float]] = None,
+         method: str = 'rrf',
+         top_k: Optional[int] = None,
+         rrf_k: int = 60,
+         key: Callable[[Any], Any] = lambda item: item.id) -> List[Tuple[float, Any]]:
+    """融合多路检索器给出的 (score, item) 候选列表
+
+    只对各路候选的并集打分，不访问候选之外的chunk。
+
+    Args:
+        candidate_lists: 每路检索器的候选，按分数降序排列
+        weights: 每路的权重，默认均为1
+        method: 融合方式
+            - 'weighted': 原始分数直接加权求和（各路分数尺度需可比）
+            - 'rrf': 倒数排名融合，只看名次，结果按最大可能值归一化到[0, 1]
+            - 'minmax': 每路分数先做min-max归一化再加权求和
+            - 'zscore': 每路分数先做z-score标准化再加权求和
+        top_k: 返回数量，为None时返回全部
+        rrf_k: RRF的平滑常数
+        key: 从item取唯一标识的函数，用于跨路合并
+
+    Returns:
+        按融合分数降序排列的 (score, item) 列表
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unsupported fusion method: {method}")
+    if weights is None:
+        weights = [1.0] * len(candidate_lists)
+    if len(weights) != len(candidate_lists):
+        raise ValueError("weights must match the number of candidate lists")
+
+    items: Dict[Any, Any] = {}
+    per_list = []
+    for candidates in candidate_lists:
+        values: Dict[Any, float] = {}
+        floor = 0.0
+        if candidates:
+            normalized, floor = _normalize([score for score, _ in candidates], method, rrf_k)
+            for value, (_, item) in zip(normalized, candidates):
+                item_key = key(item)
+                items.setdefault(item_key, item)
+                values.setdefault(item_key, value)
+        per_list.append((values, floor))
+
+    # 未出现在某一路的候选按该路的最低值计分（zscore时为负数），保持各路之间可比
+    fused = {
+        item_key: sum(weight * values.get(item_key, floor) for (values, floor), weight in zip(per_list, weights))
+        for item_key in items
+    }
+
+    if method == 'rrf':
+        best = sum(weights) / (rrf_k + 1)
+        if best > 0:
+            fused = {item_key: score / best for item_key, score in fused.items()}
+
+    return select_top_k(((score, items[item_key]) for item_key, score in fused.items()), top_k)
+
+
+def _normalize(scores: List[float], method: str, rrf_k: int) -> Tuple[List[float], float]:
+    """把一路分数映射到融合尺度，返回 (映射后的分数, 未命中时的取值)"""
+    if method == 'weighted':
+        return scores, 0.0
+    if method == 'rrf':
+        return [1.0 / (rrf_k + rank) for rank in range(1, len(scores) + 1)], 0.0
+    if method == 'minmax':
+        low, high = min(scores), max(scores)
+        if high == low:
+            return [1.0] * len(scores), 0.0
+        return [(score - low) / (high - low) for score in scores], 0.0
+    mean = sum(scores) / len(scores)
+    std = math.sqrt(sum((score - mean) ** 2 for score in scores) / len(scores))
+    if std == 0:
+        return [0.0] * len(scores), 0.0
+    normalized = [(score - mean) / std for score in scores]
+    return normalized, min(normalized)
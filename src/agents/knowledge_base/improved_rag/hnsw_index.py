@@ -0,0 +1,289 @@
+"""
+HNSW近似最近邻索引 - 纯Python/NumPy实现
+"""
+
+from typing import List, Dict, Optional, Iterable, Tuple, Set
+import heapq
+import math
+import random
+import numpy as np
+
+
+class HNSWIndex:
+    """分层可导航小世界图（HNSW）索引
+
+    与 FlatVectorIndex 接口一致，查询复杂度随数据量亚线性增长。
+    删除采用墓碑标记：节点仍参与图导航，但不会出现在结果中。
+    替换和删除累积的墓碑超过存活节点数的 compaction_ratio 倍时自动重建图，
+    避免更新频繁时图和查询开销无限增长。
+    """
+
+    def __init__(self, dim: Optional[int] = None, m: int = 16, ef_construction: int = 200,
+                 ef_search: int = 64, initial_capacity: int = 1024, seed: Optional[int] = None,
+                 compaction_ratio: Optional[float] = 0.5):
+        """初始化索引
+
+        Args:
+            dim: 向量维度，为None时由第一次写入的向量决定
+            m: 每个节点在上层保留的邻居数，第0层为 2*m
+            ef_construction: 构建时的候选集大小，越大召回越高、写入越慢
+            ef_search: 查询时的候选集大小，越大召回越高、查询越慢
+            initial_capacity: 向量矩阵初始行数
+            seed: 层级随机数种子
+            compaction_ratio: 墓碑数超过存活节点数的该倍数时自动 compact，为None时只能手动调用
+        """
+        if m < 2:
+            raise ValueError("m must be at least 2")
+        self.dim = dim
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = max(ef_construction, m)
+        self.ef_search = ef_search
+        self._level_mult = 1 / math.log(m)
+        self._rng = random.Random(seed)
+        self._initial_capacity = max(1, initial_capacity)
+        self.compaction_ratio = compaction_ratio
+
+        self._vectors: Optional[np.ndarray] = None
+        self._node_count = 0
+        self._node_ids: List[str] = []            # 节点 -> chunk id
+        self._rows: Dict[str, int] = {}           # chunk id -> 存活节点
+        self._deleted: Set[int] = set()           # 墓碑节点
+        self._graph: List[Dict[int, List[int]]] = []  # 每层的邻接表
+        self._entry_point: Optional[int] = None
+        self._max_level = -1
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._rows
+
+    @property
+    def tombstone_count(self) -> int:
+        """已标记删除但仍保留在图中的节点数"""
+        return len(self._deleted)
+
+    def add(self, chunk_id: str, vector: List[float]) -> None:
+        """写入单个向量，已存在的chunk id会被替换"""
+        self.add_batch([chunk_id], [vector])
+
+    def add_batch(self, chunk_ids: List[str], vectors: Iterable[List[float]]) -> None:
+        """逐个插入向量（HNSW支持增量构建）"""
+        if not chunk_ids:
+            return
+        block = np.asarray(list(vectors), dtype=np.float32)
+        if block.ndim != 2 or block.shape[0] != len(chunk_ids):
+            raise ValueError("chunk_ids and vectors must have the same length")
+        if self.dim is None:
+            self.dim = block.shape[1]
+        elif block.shape[1] != self.dim:
+            raise ValueError(f"Vector dimension mismatch: expected {self.dim}, got {block.shape[1]}")
+
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        block = block / norms
+        for chunk_id, vector in zip(chunk_ids, block):
+            self._tombstone(chunk_id)
+            self._insert(chunk_id, vector)
+        self._maybe_compact()
+
+    def remove(self, chunk_id: str) -> bool:
+        """墓碑删除"""
+        if not self._tombstone(chunk_id):
+            return False
+        self._maybe_compact()
+        return True
+
+    def _tombstone(self, chunk_id: str) -> bool:
+        node = self._rows.pop(chunk_id, None)
+        if node is None:
+            return False
+        self._deleted.add(node)
+        return True
+
+    def _maybe_compact(self) -> None:
+        """墓碑比例超过阈值时重建图，重建开销由此前的多次替换/删除分摊"""
+        if self.compaction_ratio is not None and len(self._deleted) > len(self._rows) * self.compaction_ratio:
+            self.compact()
+
+    def clear(self) -> None:
+        """清空索引（保留维度和参数）"""
+        self._vectors = None
+        self._node_count = 0
+        self._node_ids = []
+        self._rows = {}
+        self._deleted = set()
+        self._graph = []
+        self._entry_point = None
+        self._max_level = -1
+
+    def compact(self) -> None:
+        """丢弃墓碑节点并用存活向量重建图"""
+        if not self._deleted:
+            return
+        live = list(self._rows.items())
+        vectors = self._vectors
+        self.clear()
+        for chunk_id, node in live:
+            self._insert(chunk_id, vectors[node])
+
+    def search(self, query_vector: List[float], top_k: int,
+               candidate_ids: Optional[Iterable[str]] = None) -> List[Tuple[float, str]]:
+        """近似检索与查询向量最相似的top_k个chunk
+
+        Args:
+            query_vector: 查询向量
+            top_k: 返回结果数量
+            candidate_ids: 可选的候选chunk id集合，只在其中检索
+
+        Returns:
+            按相似度降序排列的 (score, chunk_id) 列表
+        """
+        if not self._rows or top_k <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.ndim != 1 or query.shape[0] != self.dim:
+            return []
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+
+        allowed = None
+        if candidate_ids is not None:
+            allowed = {self._rows[chunk_id] for chunk_id in candidate_ids if chunk_id in self._rows}
+            if not allowed:
+                return []
+            # 候选集很小时直接精确计算，比在图上过滤更快也更准
+            if len(allowed) <= max(self.ef_search, top_k) * 4:
+                nodes = list(allowed)
+                sims = self._vectors[nodes] @ query
+                best = heapq.nlargest(top_k, zip(sims.tolist(), nodes))
+                return [(max(0.0, sim), self._node_ids[node]) for sim, node in best]
+
+        ef = max(self.ef_search, top_k)
+        while True:
+            found = self._search_graph(query, ef)
+            hits = [(sim, node) for sim, node in found
+                    if node not in self._deleted and (allowed is None or node in allowed)]
+            if len(hits) >= top_k or ef >= self._node_count:
+                break
+            # 墓碑或过滤导致结果不足时扩大搜索范围
+            ef *= 2
+        hits.sort(reverse=True)
+        return [(max(0.0, sim), self._node_ids[node]) for sim, node in hits[:top_k]]
+
+    def search_batch(self, query_vectors: List[List[float]], top_k: int,
+                     candidate_ids: Optional[Iterable[str]] = None) -> List[List[Tuple[float, str]]]:
+        """批量检索：图搜索无法合并为矩阵乘法，逐个查询执行，接口与FlatVectorIndex一致"""
+        if candidate_ids is not None and not isinstance(candidate_ids, (set, frozenset, dict)):
+            candidate_ids = set(candidate_ids)
+        return [self.search(query_vector, top_k, candidate_ids) for query_vector in query_vectors]
+
+    def _insert(self, chunk_id: str, vector: np.ndarray) -> None:
+        node = self._node_count
+        self._reserve(node + 1)
+        self._vectors[node] = vector
+        self._node_ids.append(chunk_id)
+        self._rows[chunk_id] = node
+        self._node_count += 1
+
+        level = int(-math.log(1.0 - self._rng.random()) * self._level_mult)
+        while len(self._graph) <= level:
+            self._graph.append({})
+        for lc in range(level + 1):
+            self._graph[lc][node] = []
+
+        if self._entry_point is None:
+            self._entry_point = node
+            self._max_level = level
+            return
+
+        entry = [self._entry_point]
+        for lc in range(self._max_level, level, -1):
+            entry = [max(self._search_layer(vector, entry, 1, lc))[1]]
+
+        for lc in range(min(level, self._max_level), -1, -1):
+            found = self._search_layer(vector, entry, self.ef_construction, lc)
+            max_links = self.m0 if lc == 0 else self.m
+            neighbors = self._select_neighbors(found, self.m)
+            layer = self._graph[lc]
+            layer[node] = neighbors
+            for neighbor in neighbors:
+                links = layer[neighbor]
+                links.append(node)
+                if len(links) > max_links:
+                    sims = self._vectors[links] @ self._vectors[neighbor]
+                    layer[neighbor] = self._select_neighbors(list(zip(sims.tolist(), links)), max_links)
+            entry = [candidate for _, candidate in found]
+
+        if level > self._max_level:
+            self._entry_point = node
+            self._max_level = level
+
+    def _search_graph(self, query: np.ndarray, ef: int) -> List[Tuple[float, int]]:
+        entry = [self._entry_point]
+        for lc in range(self._max_level, 0, -1):
+            entry = [max(self._search_layer(query, entry, 1, lc))[1]]
+        return self._search_layer(query, entry, ef, 0)
+
+    def _search_layer(self, query: np.ndarray, entry: List[int], ef: int, level: int) -> List[Tuple[float, int]]:
+        """在单层上做贪心 best-first 搜索，返回最多 ef 个 (sim, node)"""
+        layer = self._graph[level]
+        visited = set(entry)
+        sims = (self._vectors[entry] @ query).tolist()
+        candidates = [(-sim, node) for sim, node in zip(sims, entry)]
+        heapq.heapify(candidates)
+        results = list(zip(sims, entry))
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            neg_sim, node = heapq.heappop(candidates)
+            if -neg_sim < results[0][0] and len(results) >= ef:
+                break
+            neighbors = [n for n in layer.get(node, ()) if n not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            neighbor_sims = (self._vectors[neighbors] @ query).tolist()
+            for sim, neighbor in zip(neighbor_sims, neighbors):
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, neighbor))
+                    heapq.heappush(results, (sim, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return results
+
+    def _select_neighbors(self, candidates: List[Tuple[float, int]], m: int) -> List[int]:
+        """启发式邻居选择：优先保留彼此不相近的邻居，不足时按相似度补齐"""
+        ordered = sorted(candidates, reverse=True)
+        if len(ordered) <= m:
+            return [node for _, node in ordered]
+
+        selected: List[int] = []
+        for sim, node in ordered:
+            if len(selected) >= m:
+                break
+            if selected and float((self._vectors[selected] @ self._vectors[node]).max()) > sim:
+                continue
+            selected.append(node)
+
+        if len(selected) < m:
+            chosen = set(selected)
+            for _, node in ordered:
+                if node not in chosen:
+                    selected.append(node)
+                    if len(selected) >= m:
+                        break
+        return selected
+
+    def _reserve(self, rows: int) -> None:
+        if self._vectors is None:
+            self._vectors = np.zeros((max(self._initial_capacity, rows), self.dim), dtype=np.float32)
+        elif rows > self._vectors.shape[0]:
+            grown = np.zeros((max(rows, self._vectors.shape[0] * 2), self.dim), dtype=np.float32)
+            grown[:self._node_count] = self._vectors[:self._node_count]
+            self._vectors = grown
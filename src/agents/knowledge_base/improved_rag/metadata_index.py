@@ -0,0 +1,115 @@
+"""
+元数据二级索引 - 常用过滤字段的哈希索引
+"""
+
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+
+class MetadataIndex:
+    """元数据哈希索引
+
+    对常用过滤字段维护 值 -> chunk id 集合 的映射。带过滤条件的检索先按索引
+    求交得到候选集，开销与命中的子集大小成正比，而不是与整个库的大小成正比。
+    未建索引的字段（或不可哈希的过滤值）作为剩余条件返回，由调用方逐条检查。
+    """
+
+    DEFAULT_KEYS = ('category', 'topic', 'source_id', 'source_type')
+
+    # 这些键是检索参数而不是元数据过滤条件
+    CONTROL_KEYS = frozenset({'query_text', 'retrieval_method', 'fusion_method'})
+
+    def __init__(self, keys: Iterable[str] = DEFAULT_KEYS):
+        """初始化索引
+
+        Args:
+            keys: 需要建索引的元数据字段
+        """
+        self.keys = tuple(keys)
+        self._postings: Dict[str, Dict[Any, Set[str]]] = {key: {} for key in self.keys}
+        self._doc_values: Dict[str, Dict[str, Any]] = {}   # doc_id -> 已索引的字段值，用于删除
+        self._missing: Dict[str, Set[str]] = {key: set() for key in self.keys}   # 字段 -> 缺少该字段的文档
+
+    def __len__(self) -> int:
+        return len(self._doc_values)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_values
+
+    def add(self, doc_id: str, metadata: Optional[Dict[str, Any]]) -> None:
+        """写入或覆盖一个文档的元数据"""
+        self.remove(doc_id)
+        values = {}
+        for key in self.keys:
+            if not metadata or key not in metadata:
+                self._missing[key].add(doc_id)
+            elif _hashable(metadata[key]):
+                value = metadata[key]
+                self._postings[key].setdefault(value, set()).add(doc_id)
+                values[key] = value
+        self._doc_values[doc_id] = values
+
+    def remove(self, doc_id: str) -> bool:
+        """删除一个文档的所有索引项"""
+        values = self._doc_values.pop(doc_id, None)
+        if values is None:
+            return False
+        for missing in self._missing.values():
+            missing.discard(doc_id)
+        for key, value in values.items():
+            ids = self._postings[key][value]
+            ids.discard(doc_id)
+            if not ids:
+                del self._postings[key][value]
+        return True
+
+    def clear(self) -> None:
+        self._postings = {key: {} for key in self.keys}
+        self._doc_values = {}
+        self._missing = {key: set() for key in self.keys}
+
+    def lookup(self, filters: Optional[Dict[str, Any]],
+               missing_matches: Iterable[str] = ()) -> Tuple[Optional[Set[str]], Dict[str, Any]]:
+        """按过滤条件求候选集
+
+        Args:
+            filters: 过滤条件
+            missing_matches: 在这些字段上，缺少该字段的文档也视为满足条件，
+                             与逐条比较时忽略缺失字段的调用方保持一致
+
+        Returns:
+            (candidate_ids, residual_filters)：candidate_ids 为满足所有已索引条件的
+            chunk id 集合，过滤条件不涉及已索引字段时为None；residual_filters 为
+            仍需逐条检查的元数据条件
+        """
+        if not filters:
+            return None, {}
+        matched = []
+        residual = {}
+        for key, value in filters.items():
+            if key in self.CONTROL_KEYS:
+                continue
+            if key in self._postings and _hashable(value):
+                ids = self._postings[key].get(value, set())
+                if key in missing_matches:
+                    ids = ids | self._missing[key]
+                matched.append(ids)
+            else:
+                residual[key] = value
+        if not matched:
+            return None, residual
+        # 从最小的集合开始求交
+        matched.sort(key=len)
+        candidates = set(matched[0])
+        for ids in matched[1:]:
+            if not candidates:
+                break
+            candidates &= ids
+        return candidates, residual
+
+
+def _hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
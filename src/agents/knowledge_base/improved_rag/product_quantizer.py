@@ -0,0 +1,300 @@
+"""
+乘积量化（PQ）- 压缩向量存储与非对称距离检索
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import math
+import numpy as np
+
+
+class ProductQuantizer:
+    """乘积量化编解码器
+
+    把向量切成 num_subspaces 段，每段用 k-means 训练出最多256个中心，
+    每个向量压缩为 num_subspaces 个 uint8 编码。查询时先算出查询向量每段与各中心的
+    内积表（非对称距离表），编码向量的分数只需查表求和，无需解码。
+    """
+
+    def __init__(self, dim: int, num_subspaces: int = 16, num_centroids: int = 256,
+                 iterations: int = 20, seed: Optional[int] = None):
+        """初始化编解码器
+
+        Args:
+            dim: 向量维度
+            num_subspaces: 子空间数量，即每个向量的编码字节数
+            num_centroids: 每个子空间的中心数，不超过256
+            iterations: k-means 迭代次数
+            seed: 随机数种子
+        """
+        if not 1 <= num_centroids <= 256:
+            raise ValueError("num_centroids must be between 1 and 256")
+        self.dim = dim
+        self.num_subspaces = max(1, min(num_subspaces, dim))
+        # 维度不能整除时末尾补零
+        self.sub_dim = math.ceil(dim / self.num_subspaces)
+        self.num_centroids = num_centroids
+        self.iterations = iterations
+        self._rng = np.random.default_rng(seed)
+        self.codebooks: Optional[np.ndarray] = None   # (num_subspaces, 中心数, sub_dim)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.codebooks is not None
+
+    def train(self, vectors: np.ndarray) -> None:
+        """在样本向量上逐个子空间训练 k-means 码本"""
+        data = self._split(np.asarray(vectors, dtype=np.float32))
+        if data.shape[0] == 0:
+            raise ValueError("Cannot train product quantizer without vectors")
+        centroids = min(self.num_centroids, data.shape[0])
+        self.codebooks = np.stack([
+            self._kmeans(data[:, sub], centroids) for sub in range(self.num_subspaces)
+        ])
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """把向量编码为 (n, num_subspaces) 的uint8矩阵"""
+        data = self._split(np.asarray(vectors, dtype=np.float32))
+        codes = np.empty((data.shape[0], self.num_subspaces), dtype=np.uint8)
+        for sub in range(self.num_subspaces):
+            codes[:, sub] = self._nearest(data[:, sub], self.codebooks[sub])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """由编码重建近似向量"""
+        parts = [self.codebooks[sub][codes[:, sub]] for sub in range(self.num_subspaces)]
+        return np.concatenate(parts, axis=1)[:, :self.dim]
+
+    def distance_table(self, query: np.ndarray) -> np.ndarray:
+        """查询向量每个子空间与各中心的内积，形状为 (num_subspaces, 中心数)"""
+        parts = self._split(np.asarray(query, dtype=np.float32)[None, :])[0]
+        return np.einsum('scd,sd->sc', self.codebooks, parts)
+
+    def score(self, table: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """按距离表对编码向量打分（近似内积）"""
+        return table[np.arange(self.num_subspaces), codes].sum(axis=1)
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        """(n, dim) -> (n, num_subspaces, sub_dim)"""
+        padded_dim = self.num_subspaces * self.sub_dim
+        if vectors.shape[1] < padded_dim:
+            vectors = np.pad(vectors, ((0, 0), (0, padded_dim - vectors.shape[1])))
+        return vectors.reshape(vectors.shape[0], self.num_subspaces, self.sub_dim)
+
+    def _kmeans(self, data: np.ndarray, k: int) -> np.ndarray:
+        centroids = data[self._rng.choice(data.shape[0], k, replace=False)].copy()
+        for _ in range(self.iterations):
+            assignment = self._nearest(data, centroids)
+            counts = np.bincount(assignment, minlength=k)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, data)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            # 空簇重新取一个随机样本作为中心
+            empty = np.flatnonzero(~filled)
+            if empty.size:
+                centroids[empty] = data[self._rng.choice(data.shape[0], empty.size)]
+        return centroids
+
+    @staticmethod
+    def _nearest(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        # ||x - c||^2 = ||x||^2 - 2 x·c + ||c||^2，||x||^2 对排序无影响
+        distances = (centroids * centroids).sum(axis=1)[None, :] - 2 * data @ centroids.T
+        return distances.argmin(axis=1)
+
+
+class PQVectorIndex:
+    """乘积量化向量索引
+
+    与 FlatVectorIndex 接口一致，内存中只保存每个向量 num_subspaces 字节的编码。
+    写入的向量先缓存为原始向量，达到 train_size 条后训练码本并全部编码；之后的
+    写入直接编码。查询用非对称距离表对编码打分，取前 top_k * rerank_factor 个，
+    若提供了 vector_loader 则用原始向量精确重排。
+    """
+
+    def __init__(self, dim: Optional[int] = None, num_subspaces: int = 16, num_centroids: int = 256,
+                 train_size: int = 4096, rerank_factor: int = 4,
+                 vector_loader: Optional[Callable[[List[str]], Iterable[List[float]]]] = None,
+                 seed: Optional[int] = None):
+        """初始化索引
+
+        Args:
+            dim: 向量维度，为None时由第一次写入的向量决定
+            num_subspaces: 子空间数量（每个向量的编码字节数）
+            num_centroids: 每个子空间的中心数
+            train_size: 训练码本所需的向量数
+            rerank_factor: 精确重排的候选倍数
+            vector_loader: 按chunk id取原始向量的函数，用于精确重排
+            seed: 随机数种子
+        """
+        self.dim = dim
+        self.num_subspaces = num_subspaces
+        self.num_centroids = num_centroids
+        self.train_size = max(1, train_size)
+        self.rerank_factor = max(1, rerank_factor)
+        self.vector_loader = vector_loader
+        self._seed = seed
+        self.quantizer: Optional[ProductQuantizer] = None
+
+        self._pending: Dict[str, np.ndarray] = {}   # 训练前缓存的归一化原始向量
+        self._codes: Optional[np.ndarray] = None
+        self._size = 0
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._size + len(self._pending)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._rows or chunk_id in self._pending
+
+    @property
+    def is_trained(self) -> bool:
+        return self.quantizer is not None and self.quantizer.is_trained
+
+    @property
+    def nbytes(self) -> int:
+        """编码及训练前缓存向量占用的字节数"""
+        codes = self._size * (self.quantizer.num_subspaces if self.quantizer else 0)
+        return codes + sum(vector.nbytes for vector in self._pending.values())
+
+    def add(self, chunk_id: str, vector: List[float]) -> None:
+        """写入或覆盖单个向量"""
+        self.add_batch([chunk_id], [vector])
+
+    def add_batch(self, chunk_ids: List[str], vectors: Iterable[List[float]]) -> None:
+        """批量写入向量，已存在的chunk id会被覆盖"""
+        if not chunk_ids:
+            return
+        block = _normalize(np.asarray(list(vectors), dtype=np.float32))
+        if block.ndim != 2 or block.shape[0] != len(chunk_ids):
+            raise ValueError("chunk_ids and vectors must have the same length")
+        if self.dim is None:
+            self.dim = block.shape[1]
+        elif block.shape[1] != self.dim:
+            raise ValueError(f"Vector dimension mismatch: expected {self.dim}, got {block.shape[1]}")
+
+        if not self.is_trained:
+            for chunk_id, vector in zip(chunk_ids, block):
+                self._pending[chunk_id] = vector
+            if len(self._pending) >= self.train_size:
+                self.train()
+            return
+
+        self._store_codes(chunk_ids, self.quantizer.encode(block))
+
+    def train(self) -> None:
+        """用已缓存的向量训练码本并编码它们"""
+        if not self._pending:
+            return
+        self.quantizer = ProductQuantizer(
+            self.dim, self.num_subspaces, self.num_centroids, seed=self._seed
+        )
+        ids = list(self._pending)
+        vectors = np.stack([self._pending[chunk_id] for chunk_id in ids])
+        self.quantizer.train(vectors)
+        self._pending = {}
+        self._store_codes(ids, self.quantizer.encode(vectors))
+
+    def remove(self, chunk_id: str) -> bool:
+        """删除向量：用最后一行填补空洞"""
+        if self._pending.pop(chunk_id, None) is not None:
+            return True
+        row = self._rows.pop(chunk_id, None)
+        if row is None:
+            return False
+        last = self._size - 1
+        if row != last:
+            moved_id = self._ids[last]
+            self._codes[row] = self._codes[last]
+            self._ids[row] = moved_id
+            self._rows[moved_id] = row
+        self._ids.pop()
+        self._size -= 1
+        return True
+
+    def clear(self) -> None:
+        """清空索引（保留码本）"""
+        self._pending = {}
+        self._codes = None
+        self._size = 0
+        self._ids = []
+        self._rows = {}
+
+    def search(self, query_vector: List[float], top_k: int,
+               candidate_ids: Optional[Iterable[str]] = None) -> List[Tuple[float, str]]:
+        """检索与查询向量最相似的top_k个chunk
+
+        Returns:
+            按相似度降序排列的 (score, chunk_id) 列表
+        """
+        if not len(self) or top_k <= 0 or self.dim is None:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.ndim != 1 or query.shape[0] != self.dim:
+            return []
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+        if candidate_ids is not None and not isinstance(candidate_ids, (set, frozenset, dict)):
+            candidate_ids = set(candidate_ids)
+
+        # 训练前缓存的向量直接精确打分
+        hits = [
+            (float(vector @ query), chunk_id) for chunk_id, vector in self._pending.items()
+            if candidate_ids is None or chunk_id in candidate_ids
+        ]
+
+        if self._size:
+            if candidate_ids is None:
+                rows = np.arange(self._size)
+            else:
+                rows = np.fromiter(
+                    (self._rows[chunk_id] for chunk_id in candidate_ids if chunk_id in self._rows),
+                    dtype=np.int64
+                )
+            if rows.size:
+                table = self.quantizer.distance_table(query)
+                scores = self.quantizer.score(table, self._codes[rows])
+                shortlist = min(rows.size, top_k * self.rerank_factor if self.vector_loader else top_k)
+                top = np.argpartition(-scores, shortlist - 1)[:shortlist] if shortlist < rows.size else np.arange(rows.size)
+                shortlist_ids = [self._ids[rows[i]] for i in top]
+                if self.vector_loader is not None:
+                    exact = _normalize(np.asarray(list(self.vector_loader(shortlist_ids)), dtype=np.float32)) @ query
+                    hits.extend(zip(exact.tolist(), shortlist_ids))
+                else:
+                    hits.extend(zip(scores[top].tolist(), shortlist_ids))
+
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return [(max(0.0, score), chunk_id) for score, chunk_id in hits[:top_k]]
+
+    def search_batch(self, query_vectors: List[List[float]], top_k: int,
+                     candidate_ids: Optional[Iterable[str]] = None) -> List[List[Tuple[float, str]]]:
+        """批量检索，每个查询各自构建距离表"""
+        if candidate_ids is not None and not isinstance(candidate_ids, (set, frozenset, dict)):
+            candidate_ids = set(candidate_ids)
+        return [self.search(query_vector, top_k, candidate_ids) for query_vector in query_vectors]
+
+    def _store_codes(self, chunk_ids: List[str], codes: np.ndarray) -> None:
+        new_ids = [chunk_id for chunk_id in dict.fromkeys(chunk_ids) if chunk_id not in self._rows]
+        needed = self._size + len(new_ids)
+        if self._codes is None or self._codes.shape[0] < needed:
+            capacity = max(needed, 1024, 0 if self._codes is None else self._codes.shape[0] * 2)
+            grown = np.zeros((capacity, self.quantizer.num_subspaces), dtype=np.uint8)
+            if self._codes is not None:
+                grown[:self._size] = self._codes[:self._size]
+            self._codes = grown
+        for chunk_id in new_ids:
+            self._rows[chunk_id] = self._size
+            self._ids.append(chunk_id)
+            self._size += 1
+        self._codes[[self._rows[chunk_id] for chunk_id in chunk_ids]] = codes
+
+
+def _normalize(block: np.ndarray) -> np.ndarray:
+    """按行L2归一化，零向量保持为零"""
+    if block.ndim != 2:
+        return block
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return block / norms
@@ -0,0 +1,139 @@
+"""
+语义答案缓存 - 按问题嵌入相似度和检索到的chunk集合复用已生成的答案
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+from collections import OrderedDict
+import itertools
+import threading
+import time
+import numpy as np
+
+from .vector_index import FlatVectorIndex
+
+
+class SemanticAnswerCache:
+    """语义答案缓存
+
+    同义改写的问题在文本上不同，但嵌入相近，检索到的上下文也相同。
+    缓存以 (问题嵌入, 上下文chunk id集合) 为键：先在向量索引中找出相似的历史问题，
+    再要求余弦相似度不低于 similarity_threshold 且chunk集合完全一致（与顺序无关），
+    命中时直接返回之前生成的答案，不再调用LLM。
+    问题嵌入保存在 FlatVectorIndex 中：条目数有上限，精确扫描足够快，
+    而且删除是真正的删除，不会像HNSW那样在频繁淘汰后留下越来越多的墓碑节点。
+    """
+
+    def __init__(self, embedding_provider: Any, similarity_threshold: float = 0.92,
+                 max_entries: int = 10000, ttl: Optional[float] = None, candidates: int = 8):
+        """初始化缓存
+
+        Args:
+            embedding_provider: 提供 embed_text 的嵌入模型，应与检索使用的相同
+            similarity_threshold: 命中所需的最小余弦相似度
+            max_entries: 最大缓存条目数，超出时淘汰最久未命中的条目
+            ttl: 条目生存时间（秒），None表示不过期
+            candidates: 每次查询从索引中取出的相似问题数量
+        """
+        self.embedding_provider = embedding_provider
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.candidates = candidates
+        self.vector_index = FlatVectorIndex()
+        # 条目id -> (归一化的问题嵌入, chunk id集合, 答案, 写入时间)，按最近命中排序
+        self._entries: OrderedDict = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def embed(self, query: str) -> List[float]:
+        """计算问题嵌入，可传给 lookup / store 避免重复计算"""
+        return self.embedding_provider.embed_text(query)
+
+    def lookup(self, query: str, chunk_ids: Iterable[str],
+               query_vector: Optional[List[float]] = None) -> Optional[str]:
+        """查找语义相同的问题已经生成的答案
+
+        Args:
+            query: 用户问题
+            chunk_ids: 本次生成答案所用上下文的chunk id
+            query_vector: 预先计算的问题嵌入
+
+        Returns:
+            缓存的答案，未命中时返回None
+        """
+        chunk_set = frozenset(chunk_ids)
+        vector = self._normalize(query_vector if query_vector is not None else self.embed(query))
+        with self._lock:
+            if vector is None or not self._entries:
+                self.misses += 1
+                return None
+            now = time.time()
+            for _, entry_id in self.vector_index.search(vector.tolist(), self.candidates):
+                entry = self._entries.get(entry_id)
+                if entry is None:
+                    continue
+                entry_vector, entry_chunks, answer, created_at = entry
+                if self.ttl is not None and now - created_at > self.ttl:
+                    self._remove(entry_id)
+                    continue
+                if entry_chunks == chunk_set and float(entry_vector @ vector) >= self.similarity_threshold:
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return answer
+            self.misses += 1
+            return None
+
+    def store(self, query: str, chunk_ids: Iterable[str], answer: str,
+              query_vector: Optional[List[float]] = None) -> None:
+        """缓存一个生成的答案
+
+        Args:
+            query: 用户问题
+            chunk_ids: 生成答案所用上下文的chunk id
+            answer: 生成的答案
+            query_vector: 预先计算的问题嵌入
+        """
+        vector = self._normalize(query_vector if query_vector is not None else self.embed(query))
+        if vector is None:
+            return
+        with self._lock:
+            entry_id = f"answer-{next(self._ids)}"
+            self._entries[entry_id] = (vector, frozenset(chunk_ids), answer, time.time())
+            self.vector_index.add(entry_id, vector.tolist())
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self.vector_index.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取命中统计"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _remove(self, entry_id: str) -> None:
+        self._entries.pop(entry_id, None)
+        self.vector_index.remove(entry_id)
+
+    @staticmethod
+    def _normalize(vector: Optional[List[float]]) -> Optional[np.ndarray]:
+        if vector is None or len(vector) == 0:
+            return None
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        if norm == 0:
+            return None
+        return array / norm
@@ -5,6 +5,9 @@
 from typing import List, Dict, Any, Optional
 from abc import ABC, abstractmethod
 import math
+from .bm25_index import BM25Index
+from .topk import select_top_k
+from .fusion import fuse
 
 
 class EmbeddingProvider(ABC):
@@ -19,6 +22,14 @@ class EmbeddingProvider(ABC):
     def embed_batch(self, texts: List[str]) -> List[List[float]]:
         """批量将文本转换为嵌入向量"""
         pass
+    
+    def count_tokens(self, text: str) -> int:
+        """估算文本的token数量，用于按token预算划分批次
+        
+        默认按每个汉字1个token、其他字符每4个1个token估算。
+        """
+        cjk_chars = sum(1 for char in text if '\u4e00' <= char <= '\u9fff')
+        return max(1, cjk_chars + (len(text) - cjk_chars) // 4)
 
 
 class SimpleEmbeddingProvider(EmbeddingProvider):
@@ -142,35 +153,65 @@ class SimpleEmbeddingProvider(EmbeddingProvider):
 class LLMEmbeddingProvider(EmbeddingProvider):
     """使用LLM的嵌入向量提供商"""
     
-    def __init__(self, llm_client):
+    def __init__(self, llm_client, cache=None, model_name: Optional[str] = None):
+        """
+        Args:
+            llm_client: LLMClient实例
+            cache: 可选的EmbeddingCache，计算前先查询缓存
+            model_name: 缓存键中的模型名，默认为 "<provider>:<model>"
+        """
         self.llm_client = llm_client
+        self.cache = cache
+        self.model_name = model_name or f"{llm_client.provider}:{getattr(llm_client.llm, 'model', 'default')}"
     
     def embed_text(self, text: str) -> List[float]:
         """使用LLM生成嵌入向量"""
+        return self.embed_batch([text])[0]
+    
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """批量生成嵌入向量，只为缓存未命中的文本调用LLM"""
+        cached = self.cache.get_many(self.model_name, texts) if self.cache else [None] * len(texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if not missing:
+            return cached
+        
+        missing_texts = [texts[i] for i in missing]
         try:
-            return self.llm_client.get_embeddings(text)
+            if len(missing_texts) == 1:
+                vectors = [self.llm_client.get_embeddings(missing_texts[0])]
+            else:
+                vectors = self.llm_client.get_embeddings(missing_texts)
         except Exception as e:
             print(f"LLM embedding failed: {e}")
-            # 回退到简单提供商
+            # 回退到简单提供商（回退结果不写入缓存）
             simple_provider = SimpleEmbeddingProvider()
-            return simple_provider.embed_text(text)
+            vectors = simple_provider.embed_batch(missing_texts)
+        else:
+            if self.cache:
+                self.cache.put_many(self.model_name, missing_texts, vectors)
+        
+        for i, vector in zip(missing, vectors):
+            cached[i] = vector
+        return cached
     
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """批量生成嵌入向量"""
+    def count_tokens(self, text: str) -> int:
+        """使用模型的tokenizer计算token数量"""
         try:
-            return self.llm_client.get_embeddings(texts)
-        except Exception as e:
-            print(f"LLM batch embedding failed: {e}")
-            # 回退到简单提供商
-            simple_provider = SimpleEmbeddingProvider()
-            return simple_provider.embed_batch(texts)
+            return self.llm_client.get_token_count(text)
+        except Exception:
+            return super().count_tokens(text)
 
 
 class SemanticRetriever:
     """语义检索器 - 使用向量相似度进行检索"""
     
-    def __init__(self, embedding_provider: EmbeddingProvider):
+    def __init__(self, embedding_provider: EmbeddingProvider, keyword_index: Optional[BM25Index] = None,
+                 embeddings: Optional[Dict[str, List[float]]] = None):
         self.embedding_provider = embedding_provider
+        # 由存储层增量维护的BM25倒排索引，为None时按需临时构建
+        self.keyword_index = keyword_index
+        # 入库时已计算的chunk嵌入向量（chunk id -> 向量），检索时直接复用
+        self.embeddings = embeddings if embeddings is not None else {}
     
     def calculate_similarity(self, query_embedding: List[float], chunk_embedding: List[float]) -> float:
         """计算余弦相似度"""
@@ -194,77 +235,95 @@ class SemanticRetriever:
         similarity = dot_product / (query_norm * chunk_norm)
         return max(0.0, similarity)  # 确保相似度非负
     
-    def retrieve_semantic(self, query: str, chunks: List[Any], top_k: int = 5) -> List[tuple]:
-        """基于语义相似度检索"""
+    def retrieve_semantic(self, query: str, chunks: List[Any], top_k: int = 5,
+                          chunk_embeddings: Optional[Dict[str, List[float]]] = None) -> List[tuple]:
+        """基于语义相似度检索
+        
+        chunk_embeddings 为预先计算的向量（chunk id -> 向量），默认使用构造时传入的向量；
+        只有缺失向量的chunk才会被重新嵌入，且合并为一次批量调用。
+        """
         # 生成查询的嵌入向量
         query_embedding = self.embedding_provider.embed_text(query)
+        chunk_embeddings = self._resolve_embeddings(chunks, chunk_embeddings)
         
-        # 计算每个chunk的相似度
-        similarities = []
+        # 逐个计算相似度，用有界堆保留top_k，不构建、不排序完整列表
+        similarities = (
+            (self.calculate_similarity(query_embedding, chunk_embeddings[chunk.id]), chunk)
+            for chunk in chunks
+        )
+        return select_top_k(similarities, top_k)
+    
+    def _resolve_embeddings(self, chunks: List[Any],
+                            chunk_embeddings: Optional[Dict[str, List[float]]]) -> Dict[str, List[float]]:
+        """取出chunks的向量，缺失的部分批量嵌入"""
+        known = self.embeddings if chunk_embeddings is None else chunk_embeddings
+        resolved = {}
+        missing = []
         for chunk in chunks:
-            chunk_embedding = self.embedding_provider.embed_text(chunk.text_content)
-            similarity = self.calculate_similarity(query_embedding, chunk_embedding)
-            similarities.append((similarity, chunk))
+            embedding = known.get(chunk.id)
+            if embedding is None:
+                missing.append(chunk)
+            else:
+                resolved[chunk.id] = embedding
         
-        # 按相似度排序并返回top_k
-        similarities.sort(key=lambda x: x[0], reverse=True)
-        return similarities[:top_k]
+        if missing:
+            vectors = self.embedding_provider.embed_batch([chunk.text_content for chunk in missing])
+            for chunk, vector in zip(missing, vectors):
+                resolved[chunk.id] = vector
+        return resolved
     
     def hybrid_retrieve(self, query: str, chunks: List[Any], top_k: int = 5, 
-                       semantic_weight: float = 0.7, keyword_weight: float = 0.3) -> List[tuple]:
-        """混合检索：结合语义相似度和关键词匹配"""
-        # 语义检索
-        semantic_results = self.retrieve_semantic(query, chunks, len(chunks))
+                       semantic_weight: float = 0.7, keyword_weight: float = 0.3,
+                       semantic_results: Optional[List[tuple]] = None,
+                       keyword_results: Optional[List[tuple]] = None,
+                       fusion_method: str = 'minmax', rrf_k: int = 60) -> List[tuple]:
+        """混合检索：融合语义检索和关键词检索的候选
         
-        # 关键词检索（简化版）
-        keyword_results = self._keyword_retrieve(query, chunks)
+        semantic_results / keyword_results 为索引预先给出的 (score, chunk) 候选，
+        提供时不再对每个chunk重新打分。只融合两路候选集的并集。
+        fusion_method 见 fuse_ranked。
+        """
+        # 语义检索：只取前若干个候选参与融合
+        if semantic_results is None:
+            semantic_results = self.retrieve_semantic(query, chunks, max(top_k * 4, 20))
         
-        # 合并分数
-        final_scores = {}
-        for similarity, chunk in semantic_results:
-            chunk_id = chunk.id
-            final_scores[chunk_id] = {
-                'chunk': chunk,
-                'semantic_score': similarity,
-                'keyword_score': 0.0
-            }
-        
-        for keyword_score, chunk in keyword_results:
-            chunk_id = chunk.id
-            if chunk_id in final_scores:
-                final_scores[chunk_id]['keyword_score'] = keyword_score
-            else:
-                final_scores[chunk_id] = {
-                    'chunk': chunk,
-                    'semantic_score': 0.0,
-                    'keyword_score': keyword_score
-                }
+        # 关键词检索（BM25）
+        if keyword_results is None:
+            keyword_results = self._keyword_retrieve(query, chunks)
         
-        # 计算最终分数
-        final_results = []
-        for chunk_id, scores in final_scores.items():
-            final_score = (scores['semantic_score'] * semantic_weight + 
-                          scores['keyword_score'] * keyword_weight)
-            final_results.append((final_score, scores['chunk']))
+        return self.fuse_ranked(semantic_results, keyword_results, top_k,
+                                semantic_weight=semantic_weight, keyword_weight=keyword_weight,
+                                fusion_method=fusion_method, rrf_k=rrf_k)
+    
+    @staticmethod
+    def fuse_ranked(semantic_results: List[tuple], keyword_results: List[tuple], top_k: int = 5,
+                    semantic_weight: float = 0.7, keyword_weight: float = 0.3,
+                    fusion_method: str = 'minmax', rrf_k: int = 60) -> List[tuple]:
+        """融合两路已排好序的 (score, chunk) 候选列表，只对并集打分
         
-        # 排序并返回top_k
-        final_results.sort(key=lambda x: x[0], reverse=True)
-        return final_results[:top_k]
+        余弦相似度和BM25分数的尺度不可比，默认 'minmax' 先把每路分数归一化到[0, 1]
+        再加权；'rrf' 只看名次；'weighted' 直接加权原始分数，仅适用于尺度一致的分数。
+        其余方式见 fusion.fuse。
+        """
+        return fuse(
+            [semantic_results, keyword_results],
+            weights=[semantic_weight, keyword_weight],
+            method=fusion_method,
+            top_k=top_k,
+            rrf_k=rrf_k
+        )
     
     def _keyword_retrieve(self, query: str, chunks: List[Any]) -> List[tuple]:
-        """简单的关键词检索"""
-        query_lower = query.lower()
-        results = []
-        
-        for chunk in chunks:
-            chunk_text = chunk.text_content.lower()
-            
-            # 简单的关键词匹配分数
-            query_words = query_lower.split()
-            matching_words = sum(1 for word in query_words if word in chunk_text)
-            
-            if matching_words > 0:
-                score = matching_words / len(query_words)
-                results.append((score, chunk))
+        """BM25关键词检索，分数归一化到[0, 1]并按降序返回"""
+        chunk_by_id = {chunk.id: chunk for chunk in chunks}
+        if self.keyword_index is not None:
+            index = self.keyword_index
+        else:
+            index = BM25Index()
+            for chunk in chunks:
+                index.add(chunk.id, chunk.text_content)
         
-        return results
\ No newline at end of file
+        return [
+            (score, chunk_by_id[chunk_id])
+            for score, chunk_id in index.search(query, candidate_ids=chunk_by_id, normalize=True)
+        ]
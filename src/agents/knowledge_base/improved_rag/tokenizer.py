@@ -0,0 +1,90 @@
+"""
+分词器 - 中文字符n-gram切分，支持可选的词典分词
+"""
+
+from typing import List, Iterable, Optional, Tuple
+import re
+
+
+# 连续的中文字符，或连续的其他字母数字
+_RUN_PATTERN = re.compile(r'([\u4e00-\u9fff]+)|([^\W_\u4e00-\u9fff]+)')
+
+
+class CJKTokenizer:
+    """面向中英文混合文本的分词器
+
+    英文等按连续字母数字切词；中文连续片段切成字符 bigram/trigram，
+    无需分词词典即可匹配任意中文子串。提供词典时，再用正向最大匹配
+    额外输出长于 n-gram 的词（如“勾股定理”）。
+
+    文档还会输出单字，查询只对不超过 short_query_length 个字的中文片段输出单字：
+    “水”这样的短查询能命中，长查询则不会被“是”“的”等常见单字稀释。
+    """
+
+    def __init__(self, ngram_sizes: Tuple[int, ...] = (2, 3), dictionary: Optional[Iterable[str]] = None,
+                 short_query_length: int = 4):
+        """初始化分词器
+
+        Args:
+            ngram_sizes: 中文片段输出的n-gram长度
+            dictionary: 可选的中文词典
+            short_query_length: 查询中的中文片段不超过该长度时额外输出单字
+        """
+        if not ngram_sizes or min(ngram_sizes) < 1:
+            raise ValueError("ngram_sizes must contain positive lengths")
+        self.ngram_sizes = tuple(sorted(set(ngram_sizes)))
+        self.short_query_length = short_query_length
+        self.dictionary = {word.lower() for word in dictionary} if dictionary else set()
+        self._max_word_length = max((len(word) for word in self.dictionary), default=0)
+
+    def __call__(self, text: str) -> List[str]:
+        return self.tokenize(text)
+
+    def tokenize(self, text: str) -> List[str]:
+        """把文档文本切分为词项列表（保留重复，供词频统计）"""
+        return self._tokenize(text, unigrams=lambda run: True)
+
+    def tokenize_query(self, text: str) -> List[str]:
+        """把查询文本切分为词项列表，只有短的中文片段输出单字"""
+        return self._tokenize(text, unigrams=lambda run: len(run) <= self.short_query_length)
+
+    def _tokenize(self, text: str, unigrams) -> List[str]:
+        tokens: List[str] = []
+        for cjk_run, word in _RUN_PATTERN.findall(text.lower()):
+            if word:
+                tokens.append(word)
+            else:
+                tokens.extend(self._cjk_tokens(cjk_run, unigrams(cjk_run)))
+        return tokens
+
+    def _cjk_tokens(self, run: str, unigrams: bool) -> List[str]:
+        tokens = list(run) if unigrams and 1 not in self.ngram_sizes else []
+        if len(run) < self.ngram_sizes[0]:
+            # 比最短n-gram还短的片段原样输出
+            return tokens or [run]
+        tokens += [
+            run[i:i + n]
+            for n in self.ngram_sizes
+            for i in range(len(run) - n + 1)
+        ]
+        if self.dictionary:
+            tokens.extend(word for word in self._segment(run) if len(word) not in self.ngram_sizes)
+        return tokens
+
+    def _segment(self, run: str) -> List[str]:
+        """正向最大匹配，只返回词典中的词"""
+        words = []
+        i = 0
+        while i < len(run):
+            for length in range(min(self._max_word_length, len(run) - i), 1, -1):
+                candidate = run[i:i + length]
+                if candidate in self.dictionary:
+                    words.append(candidate)
+                    i += length
+                    break
+            else:
+                i += 1
+        return words
+
+
+default_tokenizer = CJKTokenizer()
@@ -0,0 +1,38 @@
+"""
+流式top-k选择 - 基于有界最小堆
+"""
+
+from typing import Iterable, List, Optional, Tuple, TypeVar
+import heapq
+import itertools
+
+T = TypeVar('T')
+
+
+def select_top_k(scored: Iterable[Tuple[float, T]], k: Optional[int]) -> List[Tuple[float, T]]:
+    """从 (score, item) 序列中选出分数最高的k个，按分数降序返回
+
+    只维护大小为k的最小堆，可直接消费生成器：内存为O(k)，耗时为O(N log k)，
+    不需要先构建完整列表再整体排序。分数相同时保持输入顺序，item 不需要可比较。
+
+    Args:
+        scored: (score, item) 可迭代对象
+        k: 返回数量，为None时返回全部（整体排序）
+    """
+    if k is None:
+        return sorted(scored, key=lambda pair: pair[0], reverse=True)
+    if k <= 0:
+        return []
+
+    # 堆元素为 (score, -序号, item)：堆顶是分数最低、同分中最晚到达的元素
+    heap: List[Tuple[float, int, T]] = []
+    counter = itertools.count()
+    for score, item in scored:
+        entry = (score, -next(counter), item)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    heap.sort(key=lambda entry: entry[:2], reverse=True)
+    return [(score, item) for score, _, item in heap]
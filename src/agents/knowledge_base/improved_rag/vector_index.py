@@ -0,0 +1,213 @@
+"""
+向量索引 - 基于NumPy连续矩阵的精确语义检索
+"""
+
+from typing import List, Dict, Optional, Iterable, Tuple
+import numpy as np
+
+
+class FlatVectorIndex:
+    """精确向量索引
+
+    所有嵌入向量按行保存在一个预归一化的float32矩阵中，
+    查询只需一次矩阵-向量乘法加 argpartition 选出 top_k。
+    """
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 1024):
+        """初始化索引
+
+        Args:
+            dim: 向量维度，为None时由第一次写入的向量决定
+            initial_capacity: 矩阵初始行数，不足时按倍数扩容
+        """
+        self.dim = dim
+        self._initial_capacity = max(1, initial_capacity)
+        self._matrix: Optional[np.ndarray] = None
+        self._size = 0
+        self._ids: List[str] = []          # 行号 -> chunk id
+        self._rows: Dict[str, int] = {}    # chunk id -> 行号
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._rows
+
+    def add(self, chunk_id: str, vector: List[float]) -> None:
+        """写入或覆盖单个向量"""
+        self.add_batch([chunk_id], [vector])
+
+    def add_batch(self, chunk_ids: List[str], vectors: Iterable[List[float]]) -> None:
+        """批量写入向量，已存在的chunk id会被原地覆盖"""
+        if not chunk_ids:
+            return
+        block = self._normalize(np.asarray(list(vectors), dtype=np.float32))
+        if block.ndim != 2 or block.shape[0] != len(chunk_ids):
+            raise ValueError("chunk_ids and vectors must have the same length")
+        self._ensure_dim(block.shape[1])
+
+        new_ids = [chunk_id for chunk_id in dict.fromkeys(chunk_ids) if chunk_id not in self._rows]
+        self._reserve(self._size + len(new_ids))
+        for chunk_id in new_ids:
+            self._rows[chunk_id] = self._size
+            self._ids.append(chunk_id)
+            self._size += 1
+
+        rows = [self._rows[chunk_id] for chunk_id in chunk_ids]
+        self._matrix[rows] = block
+
+    def remove(self, chunk_id: str) -> bool:
+        """删除向量：用最后一行填补空洞，保持矩阵连续"""
+        row = self._rows.pop(chunk_id, None)
+        if row is None:
+            return False
+
+        last = self._size - 1
+        if row != last:
+            moved_id = self._ids[last]
+            self._matrix[row] = self._matrix[last]
+            self._ids[row] = moved_id
+            self._rows[moved_id] = row
+        self._ids.pop()
+        self._size -= 1
+        return True
+
+    def clear(self) -> None:
+        """清空索引（保留维度）"""
+        self._matrix = None
+        self._size = 0
+        self._ids = []
+        self._rows = {}
+
+    def search(self, query_vector: List[float], top_k: int,
+               candidate_ids: Optional[Iterable[str]] = None) -> List[Tuple[float, str]]:
+        """检索与查询向量最相似的top_k个chunk
+
+        Args:
+            query_vector: 查询向量
+            top_k: 返回结果数量
+            candidate_ids: 可选的候选chunk id集合，只在其中检索
+
+        Returns:
+            按相似度降序排列的 (score, chunk_id) 列表
+        """
+        if self._size == 0 or top_k <= 0:
+            return []
+        query = self._prepare_query(query_vector)
+        if query is None:
+            return []
+
+        if candidate_ids is None:
+            rows = None
+            scores = self._matrix[:self._size] @ query
+        else:
+            rows = np.fromiter(
+                (self._rows[chunk_id] for chunk_id in candidate_ids if chunk_id in self._rows),
+                dtype=np.int64
+            )
+            if rows.size == 0:
+                return []
+            scores = self._matrix[rows] @ query
+
+        top = self._top_k_positions(scores, top_k)
+        ids = self._ids
+        if rows is None:
+            return [(max(0.0, float(scores[i])), ids[i]) for i in top]
+        return [(max(0.0, float(scores[i])), ids[rows[i]]) for i in top]
+
+    def search_batch(self, query_vectors: List[List[float]], top_k: int,
+                     candidate_ids: Optional[Iterable[str]] = None,
+                     block_size: int = 256) -> List[List[Tuple[float, str]]]:
+        """批量检索：把查询堆叠成矩阵，按查询分块做矩阵-矩阵乘法
+
+        Args:
+            query_vectors: 查询向量列表
+            top_k: 每个查询返回的结果数量
+            candidate_ids: 可选的候选chunk id集合，所有查询共用
+            block_size: 每次乘法包含的查询数，限制分数矩阵的内存占用
+
+        Returns:
+            与 query_vectors 一一对应的结果列表，维度不符或零向量的查询结果为空
+        """
+        results: List[List[Tuple[float, str]]] = [[] for _ in query_vectors]
+        if self._size == 0 or top_k <= 0:
+            return results
+
+        if candidate_ids is None:
+            rows = None
+            matrix = self._matrix[:self._size]
+        else:
+            rows = np.fromiter(
+                (self._rows[chunk_id] for chunk_id in candidate_ids if chunk_id in self._rows),
+                dtype=np.int64
+            )
+            if rows.size == 0:
+                return results
+            matrix = self._matrix[rows]
+
+        valid = []
+        for position, query_vector in enumerate(query_vectors):
+            query = self._prepare_query(query_vector)
+            if query is not None:
+                valid.append((position, query))
+
+        ids = self._ids
+        k = min(top_k, matrix.shape[0])
+        for start in range(0, len(valid), block_size):
+            block = valid[start:start + block_size]
+            scores = np.stack([query for _, query in block]) @ matrix.T
+            if k < matrix.shape[0]:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(matrix.shape[0]), (len(block), k))
+            for (position, _), query_scores, query_top in zip(block, scores, top):
+                query_top = query_top[np.argsort(-query_scores[query_top], kind='stable')]
+                if rows is None:
+                    results[position] = [(max(0.0, float(query_scores[i])), ids[i]) for i in query_top]
+                else:
+                    results[position] = [(max(0.0, float(query_scores[i])), ids[rows[i]]) for i in query_top]
+        return results
+
+    @staticmethod
+    def _top_k_positions(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """用 argpartition 选出 top_k 位置，再只对这 k 个排序"""
+        if top_k < scores.size:
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            top = np.arange(scores.size)
+        return top[np.argsort(-scores[top], kind='stable')]
+
+    def _prepare_query(self, query_vector: List[float]) -> Optional[np.ndarray]:
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.ndim != 1 or query.shape[0] != self.dim:
+            return None
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None
+        return query / norm
+
+    @staticmethod
+    def _normalize(block: np.ndarray) -> np.ndarray:
+        """按行L2归一化，零向量保持为零"""
+        if block.ndim != 2:
+            return block
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return block / norms
+
+    def _ensure_dim(self, dim: int) -> None:
+        if self.dim is None:
+            self.dim = dim
+        elif dim != self.dim:
+            raise ValueError(f"Vector dimension mismatch: expected {self.dim}, got {dim}")
+
+    def _reserve(self, rows: int) -> None:
+        """保证矩阵至少有 rows 行容量"""
+        if self._matrix is None:
+            capacity = max(self._initial_capacity, rows)
+            self._matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        elif rows > self._matrix.shape[0]:
+            capacity = max(rows, self._matrix.shape[0] * 2)
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
@@ -1,8 +1,13 @@
+import asyncio
 import hashlib
-from typing import List, Dict, Optional
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List, Dict, Optional, Tuple
 from .data_collection_agent import RawDocument
 
 class ProcessedKnowledgeChunk:
+    __slots__ = ('id', 'original_id', 'text_content', 'vector', 'category', 'entities', 'relationships', 'metadata')
+
     def __init__(self, id: str, original_id: str, text_content: str, vector: List[float], category: str, entities: List[str], relationships: List[Dict], metadata: Dict):
         self.id = id
         self.original_id = original_id
@@ -13,17 +18,81 @@ class ProcessedKnowledgeChunk:
         self.relationships = relationships
         self.metadata = metadata
 
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+def _process_in_worker(settings: Tuple, documents: List[RawDocument]) -> List[ProcessedKnowledgeChunk]:
+    """Process-pool entry point: processes one IPC batch of documents."""
+    embedding_model, chunk_size, chunk_overlap = settings
+    agent = KnowledgeProcessingAgent(embedding_model=embedding_model, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return agent._process_documents(documents)
+
 class KnowledgeProcessingAgent:
-    def __init__(self, embedding_model: Optional[str] = None, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, embedding_model: Optional[str] = None, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 workers: int = 0, ipc_batch_size: int = 8):
+        """
+        Args:
+            workers: Number of worker processes. 0 or 1 processes documents in the calling process.
+            ipc_batch_size: Documents sent to a worker per round trip.
+        """
         self.embedding_model = embedding_model
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        
+        self.workers = workers
+        self.ipc_batch_size = max(1, ipc_batch_size)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
     def process(self, documents: List[RawDocument]) -> List[ProcessedKnowledgeChunk]:
         """
         Process raw documents into knowledge chunks with embeddings.
+
+        With `workers > 1` the documents are sharded across a process pool in
+        batches of `ipc_batch_size`; chunks are returned in document order either way.
+        Worker processes do not consult the embedding cache.
+        """
+        print(f"Processing {len(documents)} documents")
+        if not self._use_pool(documents):
+            return self._process_documents(documents)
+        results = self._get_pool().map(_process_in_worker, repeat(self._worker_settings()), self._ipc_batches(documents))
+        return [chunk for batch in results for chunk in batch]
+
+    async def aprocess(self, documents: List[RawDocument]) -> List[ProcessedKnowledgeChunk]:
+        """
+        Async variant of `process`: in process-pool mode the batches are awaited
+        without blocking the event loop.
         """
+        if not self._use_pool(documents):
+            return self.process(documents)
         print(f"Processing {len(documents)} documents")
+        pool = self._get_pool()
+        settings = self._worker_settings()
+        results = await asyncio.gather(*[
+            asyncio.wrap_future(pool.submit(_process_in_worker, settings, batch))
+            for batch in self._ipc_batches(documents)
+        ])
+        return [chunk for batch in results for chunk in batch]
+
+    def close(self):
+        """Shuts down the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def _use_pool(self, documents: List[RawDocument]) -> bool:
+        return self.workers > 1 and len(documents) > 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def _worker_settings(self) -> Tuple:
+        return (self.embedding_model, self.chunk_size, self.chunk_overlap)
+
+    def _ipc_batches(self, documents: List[RawDocument]) -> List[List[RawDocument]]:
+        return [documents[i:i + self.ipc_batch_size] for i in range(0, len(documents), self.ipc_batch_size)]
+
+    def _process_documents(self, documents: List[RawDocument]) -> List[ProcessedKnowledgeChunk]:
         processed_chunks = []
         
         for doc in documents:
@@ -34,6 +34,27 @@ class KnowledgeRetrievalAgent:
             filters=filters
         )
 
+        return self._to_answer_candidates(retrieved_chunks)
+
+    def search_batch(self, params: Dict) -> List[List[AnswerCandidate]]:
+        """
+        Searches many queries in one call, e.g. for offline evaluation or bulk FAQ
+        pre-answering. All queries share `top_k` and `filters`; the result list is
+        aligned with `params["queries"]`.
+        """
+        queries = params.get("queries", [])
+        print(f"Searching for {len(queries)} queries in batch")
+
+        filters = {key: value for key, value in params.get("filters", {}).items() if key != "query_text"}
+        retrieved_batches: List[List[RetrievedChunk]] = self.storage_agent.retrieve_batch(
+            query_texts=queries,
+            top_k=params.get("top_k", 5),
+            filters=filters
+        )
+        return [self._to_answer_candidates(retrieved_chunks) for retrieved_chunks in retrieved_batches]
+
+    @staticmethod
+    def _to_answer_candidates(retrieved_chunks: List[RetrievedChunk]) -> List[AnswerCandidate]:
         # Transform retrieved chunks into answer candidates
         answer_candidates = []
         for chunk in retrieved_chunks:
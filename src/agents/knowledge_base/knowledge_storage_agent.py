@@ -2,6 +2,7 @@ from typing import List, Dict, Any
 from .knowledge_processing_agent import ProcessedKnowledgeChunk
 from .storage_providers.base import BaseStorageProvider, RetrievedChunk
 from .storage_providers.memory import MemoryStorageProvider
+from .storage_providers.local_file import LocalFileStorageProvider
 from .storage_providers.notion import NotionStorageProvider
 from .storage_providers.oss import OSSStorageProvider
 # from .storage_providers.google_drive import GoogleDriveStorageProvider
@@ -25,6 +26,7 @@ class KnowledgeStorageAgent:
         """Factory method to create a storage provider instance."""
         provider_map = {
             "memory": MemoryStorageProvider,
+            "local": LocalFileStorageProvider,
             "notion": NotionStorageProvider,
             "oss": OSSStorageProvider,
             # "google_drive": GoogleDriveStorageProvider,
@@ -51,6 +53,19 @@ class KnowledgeStorageAgent:
         """
         return self.provider.retrieve(query_vector, top_k, filters)
 
+    def retrieve_batch(self, query_texts: List[str], top_k: int, filters: Dict = None) -> List[List[RetrievedChunk]]:
+        """
+        Retrieves results for many queries at once. Providers with a native batch
+        path embed and score all queries together; others are queried one by one.
+        """
+        filters = filters or {}
+        if hasattr(self.provider, 'retrieve_batch'):
+            return self.provider.retrieve_batch(query_texts, top_k, filters)
+        return [
+            self.provider.retrieve([], top_k, {**filters, 'query_text': query_text})
+            for query_text in query_texts
+        ]
+
     def get_all_chunk_ids(self) -> List[str]:
         """
         Delegates the get_all_chunk_ids operation to the chosen provider.
@@ -67,4 +82,16 @@ class KnowledgeStorageAgent:
         """Delegates promoting a chunk to the provider."""
         if hasattr(self.provider, 'validate_and_promote'):
             return await self.provider.validate_and_promote(chunk_id)
-        return False
\ No newline at end of file
+        return False
+
+    async def delete_chunk(self, chunk_id: str) -> bool:
+        """Delegates deleting a chunk to the provider."""
+        if hasattr(self.provider, 'delete_chunk'):
+            return await self.provider.delete_chunk(chunk_id)
+        return False
+
+    def close(self):
+        """Closes the provider, releasing its thread pools and flushing any files it holds."""
+        close = getattr(self.provider, 'close', None)
+        if callable(close):
+            close()
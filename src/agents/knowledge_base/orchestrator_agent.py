@@ -1,5 +1,9 @@
 import asyncio
-from typing import Dict, Any, List, Optional
+import functools
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, AsyncIterator
 from .data_collection_agent import DataCollectionAgent
 from .knowledge_processing_agent import KnowledgeProcessingAgent
 from .knowledge_storage_agent import KnowledgeStorageAgent
@@ -7,13 +11,33 @@ from .knowledge_retrieval_agent import KnowledgeRetrievalAgent
 from .knowledge_maintenance_agent import KnowledgeMaintenanceAgent
 from .rag_agent import RAGAgent
 
+class _IngestionError(Exception):
+    """Aborts the ingestion pipeline, carrying the error response to return."""
+
+    def __init__(self, result: Dict):
+        super().__init__(result.get("message"))
+        self.result = result
+
+
+class _StageFailure:
+    """Wraps an exception raised inside a pipeline stage so it can cross a queue."""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
 class OrchestratorAgent:
+    # Agents whose sync tasks are CPU-bound (splitting, embedding, scoring); everything
+    # else is dispatched to the IO pool so slow network calls cannot starve them.
+    CPU_BOUND_AGENTS = frozenset({'KnowledgeProcessingAgent', 'KnowledgeRetrievalAgent', 'KnowledgeStorageAgent'})
+
     def __init__(self,
                  storage_provider: str = 'memory',
                  storage_config: Dict[str, Any] = None,
                  llm_config: Dict[str, Any] = None):
         self.agents = {}
         self.llm_config = llm_config or {}
+        self.embedding_cache = None
         
         # Configuration parameters (previously hardcoded)
         self.config = {
@@ -25,11 +49,37 @@ class OrchestratorAgent:
             'default_language': self.llm_config.get('default_language', 'zh')
         }
 
+        # Sync agent tasks run on these pools instead of the event loop
+        self._cpu_executor = ThreadPoolExecutor(
+            max_workers=self.llm_config.get('cpu_workers', os.cpu_count() or 4),
+            thread_name_prefix='orchestrator-cpu'
+        )
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=self.llm_config.get('io_workers', 32),
+            thread_name_prefix='orchestrator-io'
+        )
+
         # Initialize all agents
         self._initialize_agents(storage_provider, storage_config)
 
     def _initialize_agents(self, storage_provider: str, storage_config: Dict[str, Any]):
         """Initialize all agents and register them."""
+        # Optional persistent cache for model embeddings (the hash placeholder used at ingest
+        # time is cheaper to recompute than to look up, so only LLM embeddings go through it)
+        embedding_cache = None
+        embedding_cache_dir = self.llm_config.get('embedding_cache_dir')
+        if embedding_cache_dir:
+            from .improved_rag.embedding_cache import EmbeddingCache
+            embedding_cache = self.embedding_cache = EmbeddingCache(
+                embedding_cache_dir,
+                max_entries=self.llm_config.get('embedding_cache_max_entries', 100000),
+                max_bytes=self.llm_config.get('embedding_cache_max_bytes')
+            )
+
+        # LLM response cache shared by every LLM client the orchestrator creates
+        from llm_core.cache import LLMCache
+        self.llm_cache = LLMCache(**self.llm_config.get('response_cache', {}))
+
         # Check if we should use enhanced storage
         use_enhanced_storage = self.llm_config.get('use_semantic_search', True)
         
@@ -47,8 +97,8 @@ class OrchestratorAgent:
                     from llm_core.client import LLMClient
                     llm_provider = self.llm_config.get('provider', 'openai')
                     llm_model = self.llm_config.get('model', None)
-                    llm_client = LLMClient(provider=llm_provider, model=llm_model)
-                    embedding_provider = LLMEmbeddingProvider(llm_client)
+                    llm_client = LLMClient(provider=llm_provider, model=llm_model, cache=self.llm_cache)
+                    embedding_provider = LLMEmbeddingProvider(llm_client, cache=embedding_cache)
                     print("Using LLM embedding provider")
                 except Exception as e:
                     print(f"Failed to initialize LLM embedding provider: {e}")
@@ -75,22 +125,58 @@ class OrchestratorAgent:
                 provider_config=storage_config
             )
 
+        # Optional semantic answer cache for near-duplicate questions
+        self.answer_cache = None
+        semantic_cache_config = self.llm_config.get('semantic_cache')
+        if semantic_cache_config:
+            self.answer_cache = self._create_answer_cache(
+                storage_agent.provider,
+                semantic_cache_config if isinstance(semantic_cache_config, dict) else {}
+            )
+
         # Initialize RAG agent with LLM configuration
         llm_provider = self.llm_config.get('provider', 'openai')
         print("llm_provider",llm_provider)
         llm_model = self.llm_config.get('model', None)
-        rag_agent = RAGAgent(llm_provider=llm_provider, model=llm_model)
+        rag_agent = RAGAgent(llm_provider=llm_provider, model=llm_model, cache=self.llm_cache)
 
         # Initialize other agents
         self.agents = {
             'DataCollectionAgent': DataCollectionAgent(),
-            'KnowledgeProcessingAgent': KnowledgeProcessingAgent(),
+            'KnowledgeProcessingAgent': KnowledgeProcessingAgent(
+                workers=self.llm_config.get('processing_workers', 0),
+                ipc_batch_size=self.llm_config.get('processing_ipc_batch_size', 8)
+            ),
             'KnowledgeStorageAgent': storage_agent,
             'KnowledgeRetrievalAgent': KnowledgeRetrievalAgent(storage_agent),
             'KnowledgeMaintenanceAgent': KnowledgeMaintenanceAgent(storage_agent),
             'RAGAgent': rag_agent,
         }
 
+    @staticmethod
+    def _create_answer_cache(provider: Any, cache_config: Dict[str, Any]):
+        """
+        Builds the semantic answer cache on the retrieval provider's embedding model,
+        so question similarity matches retrieval similarity.
+
+        The keyword-table SimpleEmbeddingProvider only has a handful of dimensions, so
+        unrelated questions routinely exceed any cosine threshold; the cache stays off
+        with it unless `allow_simple_embeddings` is set.
+        """
+        from .improved_rag.semantic_answer_cache import SemanticAnswerCache
+        from .improved_rag.semantic_retriever import SimpleEmbeddingProvider
+
+        embedding_provider = getattr(provider, 'embedding_provider', None) or SimpleEmbeddingProvider()
+        if isinstance(embedding_provider, SimpleEmbeddingProvider) and not cache_config.get('allow_simple_embeddings'):
+            print("Semantic answer cache disabled: it needs a real embedding model")
+            return None
+        return SemanticAnswerCache(
+            embedding_provider,
+            similarity_threshold=cache_config.get('similarity_threshold', 0.92),
+            max_entries=cache_config.get('max_entries', 10000),
+            ttl=cache_config.get('ttl')
+        )
+
     def register_agent(self, agent_name: str, agent_instance: Any):
         """Register additional agents."""
         self.agents[agent_name] = agent_instance
@@ -122,57 +208,196 @@ class OrchestratorAgent:
 
     async def _handle_add_knowledge(self, payload: Dict) -> Dict:
         """
-        Handle full knowledge addition workflow: collect -> process -> store
+        Handle full knowledge addition workflow as a streaming pipeline:
+        collect -> process (split + embed) -> store.
+
+        Each stage is an async generator running in its own task, connected to the
+        next by a bounded queue, so chunks reach storage (and become searchable) while
+        later documents are still being collected and processed, and no stage holds
+        the whole corpus in memory.
         """
         sources = payload.get('sources', [])
         processing_options = payload.get('processing_options', {})
+        queue_size = processing_options.get('queue_size', 64)
+        store_batch_size = processing_options.get('store_batch_size', 64)
+
+        documents_count = 0
+        chunks_count = 0
+
+        async def counted_documents():
+            nonlocal documents_count
+            async for document in self._buffered(self._collect_documents(sources, processing_options), queue_size):
+                documents_count += 1
+                yield document
+
+        chunk_batches = self._batch_chunks(
+            self._buffered(self._process_documents(counted_documents()), queue_size),
+            store_batch_size
+        )
+        try:
+            async for batch in chunk_batches:
+                await self._store_batch(batch)
+                chunks_count += len(batch)
+        except _IngestionError as e:
+            return e.result
 
-        all_documents = []
+        if not documents_count:
+            return {"status": "error", "message": "No documents collected"}
+        if not chunks_count:
+            return {"status": "error", "message": "Processing failed"}
 
-        # Step 1: Collect from all sources
-        for source in sources:
-            try:
-                documents = await self.distribute_task("DataCollectionAgent", "collect", source)
-                # Check if result is an error
-                if isinstance(documents, dict) and documents.get('status') == 'error':
-                    return documents
-                # If successful, it should be a list of documents
-                if isinstance(documents, list):
-                    all_documents.extend(documents)
-                else:
-                    return {"status": "error", "message": f"Unexpected response from data collection: {type(documents)}"}
-            except Exception as e:
-                return {"status": "error", "message": f"Collection failed: {str(e)}"}
+        return {
+            "status": "success",
+            "message": f"Successfully processed and stored {chunks_count} knowledge chunks",
+            "chunks_count": chunks_count,
+            "sources_processed": len(sources)
+        }
 
-        if not all_documents:
-            return {"status": "error", "message": "No documents collected"}
+    async def _collect_documents(self, sources: List[Dict], processing_options: Dict) -> AsyncIterator[Any]:
+        """
+        Pipeline stage 1: yields documents as sources finish collecting.
 
-        # Step 2: Process documents
+        When the collector supports `acollect_all`, sources are fetched concurrently,
+        bounded by processing_options `max_concurrent_sources` (global) and
+        `max_connections_per_host` (per HTTP host); otherwise they are collected one by one.
+        """
+        collector = self.agents.get("DataCollectionAgent")
+        if not hasattr(collector, "acollect_all"):
+            for source in sources:
+                documents = await self.distribute_task("DataCollectionAgent", "collect", source)
+                for document in self._check_collected(documents):
+                    yield document
+            return
+
+        collected = collector.acollect_all(
+            sources,
+            max_concurrency=processing_options.get('max_concurrent_sources'),
+            max_per_host=processing_options.get('max_connections_per_host')
+        )
         try:
-            processed_chunks = await self.distribute_task("KnowledgeProcessingAgent", "process", all_documents)
-            if isinstance(processed_chunks, dict) and processed_chunks.get('status') == 'error':
-                return processed_chunks
-            if not processed_chunks:
-                return {"status": "error", "message": "Processing failed"}
-        except Exception as e:
-            return {"status": "error", "message": f"Processing failed: {str(e)}"}
+            async for _, documents in collected:
+                if isinstance(documents, Exception):
+                    raise _IngestionError({"status": "error", "message": f"Collection failed: {str(documents)}"})
+                for document in self._check_collected(documents):
+                    yield document
+        finally:
+            # Cancels the fetches still in flight when a source fails or the pipeline stops
+            await collected.aclose()
+
+    @staticmethod
+    def _check_collected(documents: Any) -> List[Any]:
+        # Check if result is an error
+        if isinstance(documents, dict) and documents.get('status') == 'error':
+            raise _IngestionError(documents)
+        # If successful, it should be a list of documents
+        if not isinstance(documents, list):
+            raise _IngestionError({"status": "error", "message": f"Unexpected response from data collection: {type(documents)}"})
+        return documents
+
+    async def _process_documents(self, documents: AsyncIterator[Any]) -> AsyncIterator[List[Any]]:
+        """
+        Pipeline stage 2: splits and embeds documents, yielding their chunks in document order.
 
-        # Step 3: Store processed chunks
+        With a multiprocess KnowledgeProcessingAgent (`workers > 1`) documents are sent
+        in groups of `ipc_batch_size` and up to `workers` groups are processed at once;
+        otherwise documents are processed one at a time.
+        """
+        processor = self.agents.get("KnowledgeProcessingAgent")
+        workers = getattr(processor, "workers", 0)
+        use_pool = workers > 1 and hasattr(processor, "aprocess")
+        task_name = "aprocess" if use_pool else "process"
+        group_size = processor.ipc_batch_size if use_pool else 1
+        max_in_flight = workers if use_pool else 1
+        in_flight: deque = deque()
+
+        def submit(group: List[Any]):
+            in_flight.append(asyncio.create_task(self.distribute_task("KnowledgeProcessingAgent", task_name, group)))
+
+        async def next_result() -> List[Any]:
+            chunks = await in_flight.popleft()
+            if isinstance(chunks, dict) and chunks.get('status') == 'error':
+                raise _IngestionError(chunks)
+            return chunks
+
+        group = []
         try:
-            storage_result = await self.distribute_task("KnowledgeStorageAgent", "store", processed_chunks)
-            if isinstance(storage_result, dict) and storage_result.get('status') == 'error':
-                return storage_result
-            if not storage_result:
-                return {"status": "error", "message": "Storage failed"}
+            async for document in documents:
+                group.append(document)
+                if len(group) < group_size:
+                    continue
+                submit(group)
+                group = []
+                if len(in_flight) >= max_in_flight:
+                    chunks = await next_result()
+                    if chunks:
+                        yield chunks
+            if group:
+                submit(group)
+            while in_flight:
+                chunks = await next_result()
+                if chunks:
+                    yield chunks
+        finally:
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    @staticmethod
+    async def _batch_chunks(chunk_lists: AsyncIterator[List[Any]], batch_size: int) -> AsyncIterator[List[Any]]:
+        """Regroups per-document chunk lists into store batches of `batch_size` chunks."""
+        batch = []
+        async for chunks in chunk_lists:
+            batch.extend(chunks)
+            while len(batch) >= batch_size:
+                yield batch[:batch_size]
+                batch = batch[batch_size:]
+        if batch:
+            yield batch
+
+    async def _store_batch(self, chunks: List[Any]) -> None:
+        """Pipeline stage 3: stores one batch of chunks."""
+        try:
+            storage_result = await self.distribute_task("KnowledgeStorageAgent", "store", chunks)
         except Exception as e:
-            return {"status": "error", "message": f"Storage failed: {str(e)}"}
+            raise _IngestionError({"status": "error", "message": f"Storage failed: {str(e)}"})
+        if isinstance(storage_result, dict) and storage_result.get('status') == 'error':
+            raise _IngestionError(storage_result)
+        if not storage_result:
+            raise _IngestionError({"status": "error", "message": "Storage failed"})
+
+    @staticmethod
+    async def _buffered(stage: AsyncIterator[Any], maxsize: int) -> AsyncIterator[Any]:
+        """
+        Runs an upstream pipeline stage in its own task and hands its items over
+        through a bounded queue; the producer blocks once `maxsize` items are waiting.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        finished = object()
 
-        return {
-            "status": "success",
-            "message": f"Successfully processed and stored {len(processed_chunks)} knowledge chunks",
-            "chunks_count": len(processed_chunks),
-            "sources_processed": len(sources)
-        }
+        async def pump():
+            try:
+                async for item in stage:
+                    await queue.put(item)
+            except Exception as e:
+                await queue.put(_StageFailure(e))
+            else:
+                await queue.put(finished)
+            finally:
+                # Propagates cancellation to the stages further upstream
+                await stage.aclose()
+
+        producer = asyncio.create_task(pump())
+        try:
+            while True:
+                item = await queue.get()
+                if item is finished:
+                    break
+                if isinstance(item, _StageFailure):
+                    raise item.error
+                yield item
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
 
     async def _handle_query(self, payload: Dict) -> Dict:
         """
@@ -200,17 +425,8 @@ class OrchestratorAgent:
 
         # Step 2: Generate answer using retrieved context
         try:
-            answer = self._generate_answer(query, retrieved_candidates)
-
-            # Format retrieved sources with configurable preview length
-            sources = []
-            preview_length = self.config['source_preview_length']
-            for candidate in retrieved_candidates:
-                sources.append({
-                    "source_id": candidate.source_id,
-                    "content": candidate.content[:preview_length] + "..." if len(candidate.content) > preview_length else candidate.content,
-                    "relevance_score": candidate.relevance_score
-                })
+            answer = await self._generate_answer(query, retrieved_candidates)
+            sources = self._format_sources(retrieved_candidates)
 
             return {
                 "status": "success",
@@ -221,13 +437,92 @@ class OrchestratorAgent:
         except Exception as e:
             return {"status": "error", "message": f"Answer generation failed: {str(e)}"}
 
-    def _generate_answer(self, query: str, retrieved_candidates: List) -> str:
+    async def stream_query(self, payload: Dict) -> AsyncIterator[Dict]:
         """
-        Generate answer using retrieved context with actual LLM integration.
+        Streaming variant of the query workflow.
+
+        Yields events as dicts with "event" and "data" keys: one "sources" event with
+        the retrieved sources, "token" events carrying answer fragments as the LLM
+        produces them, and a final "done" event with the full answer. Failures are
+        reported as a single "error" event.
+        """
+        query = payload.get('query', '')
+        search_params = payload.get('search_params', {})
+
+        if not query:
+            yield {"event": "error", "data": {"message": "Query is required"}}
+            return
+
+        search_payload = {"query": query, **search_params}
+        retrieved_candidates = await self.distribute_task("KnowledgeRetrievalAgent", "search", search_payload)
+        if isinstance(retrieved_candidates, dict) and retrieved_candidates.get('status') == 'error':
+            yield {"event": "error", "data": {"message": f"Retrieval failed: {retrieved_candidates.get('message')}"}}
+            return
+
+        sources = self._format_sources(retrieved_candidates or [])
+        yield {"event": "sources", "data": {"retrieved_sources": sources, "sources_count": len(sources)}}
+
+        if not retrieved_candidates:
+            answer = "I don't have relevant information to answer your question."
+            yield {"event": "token", "data": {"content": answer}}
+            yield {"event": "done", "data": {"answer": answer}}
+            return
+
+        context_snippets, context_ids, message = self._select_context(retrieved_candidates)
+        rag_agent = self.agents.get('RAGAgent')
+        if message is not None or not hasattr(rag_agent, 'astream'):
+            answer = message if message is not None else await self._generate_answer(query, retrieved_candidates)
+            yield {"event": "token", "data": {"content": answer}}
+            yield {"event": "done", "data": {"answer": answer}}
+            return
+
+        cached_answer, query_vector = await self._lookup_cached_answer(query, context_ids)
+        if cached_answer is not None:
+            yield {"event": "token", "data": {"content": cached_answer}}
+            yield {"event": "done", "data": {"answer": cached_answer, "cached": True}}
+            return
+
+        fragments = []
+        try:
+            async for fragment in rag_agent.astream(query, context_snippets):
+                fragments.append(fragment)
+                yield {"event": "token", "data": {"content": fragment}}
+        except Exception as e:
+            print(f"RAG streaming failed: {e}")
+            if fragments:
+                yield {"event": "error", "data": {"message": f"Answer generation failed: {str(e)}"}}
+                return
+            # Nothing was sent yet, so the fallback answer can still replace the stream
+            fallback = self._intelligent_fallback(query, context_snippets)
+            yield {"event": "token", "data": {"content": fallback}}
+            yield {"event": "done", "data": {"answer": fallback}}
+            return
+        answer = "".join(fragments)
+        self._remember_answer(query, context_ids, answer, query_vector)
+        yield {"event": "done", "data": {"answer": answer}}
+
+    def _format_sources(self, retrieved_candidates: List) -> List[Dict]:
+        """Format retrieved sources with configurable preview length."""
+        sources = []
+        preview_length = self.config['source_preview_length']
+        for candidate in retrieved_candidates:
+            sources.append({
+                "source_id": candidate.source_id,
+                "content": candidate.content[:preview_length] + "..." if len(candidate.content) > preview_length else candidate.content,
+                "relevance_score": candidate.relevance_score
+            })
+        return sources
+
+    def _select_context(self, retrieved_candidates: List):
+        """
+        Picks the context snippets for generation.
+
+        Returns (context_snippets, context_ids, None), or (None, None, message) when
+        no candidate is relevant enough and `message` should be returned as the answer instead.
         """
         if not retrieved_candidates:
             no_info_msg = "我没有找到相关信息来回答您的问题。" if self.config['default_language'] == 'zh' else "I don't have relevant information to answer your question."
-            return no_info_msg
+            return None, None, no_info_msg
 
         # Filter candidates by configurable relevance score threshold
         relevant_threshold = self.config['relevance_threshold']
@@ -238,7 +533,7 @@ class OrchestratorAgent:
 
         if not relevant_candidates:
             insufficient_info_msg = "我没有找到足够相关的信息来回答您的问题。" if self.config['default_language'] == 'zh' else "I couldn't find sufficiently relevant information to answer your question."
-            return insufficient_info_msg
+            return None, None, insufficient_info_msg
 
         # Sort by relevance score and take configurable top results
         relevant_candidates.sort(key=lambda x: x.relevance_score, reverse=True)
@@ -251,13 +546,31 @@ class OrchestratorAgent:
             max_length = self.config['max_context_length']
             content = candidate.content[:max_length] if len(candidate.content) > max_length else candidate.content
             context_snippets.append(content)
+        return context_snippets, [candidate.source_id for candidate in top_candidates], None
+
+    async def _generate_answer(self, query: str, retrieved_candidates: List) -> str:
+        """
+        Generate answer using retrieved context with actual LLM integration.
+        """
+        context_snippets, context_ids, message = self._select_context(retrieved_candidates)
+        if message is not None:
+            return message
+
+        # Near-duplicate questions over the same context reuse the earlier answer
+        cached_answer, query_vector = await self._lookup_cached_answer(query, context_ids)
+        if cached_answer is not None:
+            return cached_answer
 
         # Use RAG agent to generate precise answer
         try:
             rag_agent = self.agents.get('RAGAgent')
             if rag_agent:
                 print(f"Using RAG agent with LLM provider: {self.llm_config.get('provider', 'openai')}")
-                answer = rag_agent.generate(query, context_snippets)
+                if hasattr(rag_agent, 'agenerate'):
+                    answer = await rag_agent.agenerate(query, context_snippets)
+                else:
+                    answer = await self.run_blocking('RAGAgent', rag_agent.generate, query, context_snippets)
+                self._remember_answer(query, context_ids, answer, query_vector)
                 return answer
             else:
                 # Fallback to simple context return if RAG agent not available
@@ -267,6 +580,29 @@ class OrchestratorAgent:
             # Fallback to intelligent answer generation
             return self._intelligent_fallback(query, context_snippets)
 
+    async def _lookup_cached_answer(self, query: str, context_ids: List[str]):
+        """Returns (cached answer or None, query embedding) from the semantic answer cache."""
+        if self.answer_cache is None:
+            return None, None
+        try:
+            query_vector = await self.run_blocking('KnowledgeRetrievalAgent', self.answer_cache.embed, query)
+            answer = self.answer_cache.lookup(query, context_ids, query_vector)
+        except Exception as e:
+            print(f"Semantic answer cache lookup failed: {e}")
+            return None, None
+        if answer is not None:
+            print("Answer served from semantic answer cache")
+        return answer, query_vector
+
+    def _remember_answer(self, query: str, context_ids: List[str], answer: str, query_vector=None):
+        """Stores an LLM-generated answer in the semantic answer cache."""
+        if self.answer_cache is None or not answer:
+            return
+        try:
+            self.answer_cache.store(query, context_ids, answer, query_vector)
+        except Exception as e:
+            print(f"Semantic answer cache store failed: {e}")
+
     def _intelligent_fallback(self, query: str, context_snippets: List[str]) -> str:
         """
         Intelligent fallback answer generation when LLM is not available.
@@ -295,7 +631,12 @@ class OrchestratorAgent:
                 return f"Based on the available information: {combined_context}"
 
     async def distribute_task(self, agent_name: str, task_name: str, task_params: Dict):
-        """Enhanced task distribution with better error handling."""
+        """
+        Enhanced task distribution with better error handling.
+
+        Async tasks are awaited directly; sync tasks run on the CPU or IO executor
+        (see CPU_BOUND_AGENTS) so they never block the event loop.
+        """
         if agent_name not in self.agents:
             return {"status": "error", "message": f"Agent {agent_name} not found"}
 
@@ -310,10 +651,29 @@ class OrchestratorAgent:
             if asyncio.iscoroutinefunction(task_method):
                 return await task_method(task_params)
             else:
-                return task_method(task_params)
+                return await self.run_blocking(agent_name, task_method, task_params)
         except Exception as e:
             return {"status": "error", "message": f"Task execution failed: {str(e)}"}
 
+    async def run_blocking(self, agent_name: str, func, *args, **kwargs):
+        """Runs a sync callable on the executor assigned to `agent_name`."""
+        executor = self._cpu_executor if agent_name in self.CPU_BOUND_AGENTS else self._io_executor
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True):
+        """Stops the executors and closes agents and caches that hold pools or connections."""
+        for agent in self.agents.values():
+            close = getattr(agent, 'close', None)
+            if callable(close) and not asyncio.iscoroutinefunction(close):
+                close()
+        self._cpu_executor.shutdown(wait=wait, cancel_futures=True)
+        self._io_executor.shutdown(wait=wait, cancel_futures=True)
+        self.llm_cache.close()
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+            self.embedding_cache = None
+
     def aggregate_result(self, source_agent: str, status: str, result: Dict):
         """
         Enhanced result aggregation."""
@@ -1,19 +1,25 @@
+from typing import AsyncIterator
 from llm_core.client import LLMClient
+from llm_core.cache import LLMCache
 
 class RAGAgent:
     """
     The RAGAgent is responsible for the "generation" part of Retrieval-Augmented Generation.
     """
 
-    def __init__(self, llm_provider: str = "openai", model: str = None):
+    def __init__(self, llm_provider: str = "openai", model: str = None, cache: LLMCache = None, cache_config: dict = None):
         """
         Initializes the RAGAgent.
 
         Args:
             llm_provider: The LLM provider to use for generation.
             model: The model to use for generation.
+            cache: Optional response cache shared with other LLM clients.
+            cache_config: LLMCache settings used when no cache is given, e.g.
+                {"ttl": 86400, "backend": {"type": "sqlite", "path": "cache/llm.sqlite"}}
+                to share completions across worker processes and restarts.
         """
-        self.llm_client = LLMClient(provider=llm_provider, model=model)
+        self.llm_client = LLMClient(provider=llm_provider, model=model, cache=cache, cache_config=cache_config)
 
     def generate(self, query: str, context: list[str]) -> str:
         """
@@ -30,6 +36,38 @@ class RAGAgent:
         response = self.llm_client.chat([{"role": "user", "content": prompt}])
         return response["content"]
 
+    async def agenerate(self, query: str, context: list[str]) -> str:
+        """
+        Async variant of `generate` that awaits the provider's native async chat
+        instead of blocking the calling thread.
+
+        Args:
+            query: The user's query.
+            context: A list of context strings retrieved from the knowledge base.
+
+        Returns:
+            The generated answer.
+        """
+        prompt = self._build_prompt(query, context)
+        response = await self.llm_client.async_chat([{"role": "user", "content": prompt}])
+        return response["content"]
+
+    async def astream(self, query: str, context: list[str]) -> AsyncIterator[str]:
+        """
+        Streams the answer as text fragments while the LLM generates it.
+
+        Args:
+            query: The user's query.
+            context: A list of context strings retrieved from the knowledge base.
+
+        Yields:
+            Answer fragments in generation order.
+        """
+        prompt = self._build_prompt(query, context)
+        async for chunk in self.llm_client.astream([{"role": "user", "content": prompt}]):
+            if chunk.get("content"):
+                yield chunk["content"]
+
     def _build_prompt(self, query: str, context: list[str]) -> str:
         """
         Builds the prompt for the LLM with improved Chinese support.
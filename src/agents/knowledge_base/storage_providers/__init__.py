@@ -1,5 +1,6 @@
 from .base import BaseStorageProvider, RetrievedChunk
 from .memory import MemoryStorageProvider
+from .local_file import LocalFileStorageProvider
 
 # 注释掉有依赖问题的提供者
 # from .gcs import GCSStorageProvider
@@ -13,6 +14,7 @@ __all__ = [
     'BaseStorageProvider',
     'RetrievedChunk',
     'MemoryStorageProvider',
+    'LocalFileStorageProvider',
     # 'GCSStorageProvider',
     # 'GoogleDriveStorageProvider',
     # 'GoogleDriveServiceAccountProvider',
@@ -1,4 +1,6 @@
+import threading
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from typing import List, Dict, Any
 
 class ProcessedKnowledgeChunk:
@@ -6,12 +8,90 @@ class ProcessedKnowledgeChunk:
     pass
 
 class RetrievedChunk:
+    __slots__ = ('id', 'text_content', 'score', 'metadata')
+
     def __init__(self, id: str, text_content: str, score: float, metadata: Dict):
         self.id = id
         self.text_content = text_content
         self.score = score
         self.metadata = metadata
 
+class ReadWriteLock:
+    """
+    Many concurrent readers or a single writer. Waiting writers block new readers,
+    so a steady stream of searches cannot starve ingestion.
+
+    Re-entrant per thread: a reader may read again, and a writer may read or write
+    again. A reader may not upgrade to a writer, since that deadlocks.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def acquire_read(self) -> None:
+        me = threading.get_ident()
+        reads = getattr(self._local, 'reads', 0)
+        with self._cond:
+            if self._writer != me and reads == 0:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+                self._readers += 1
+        self._local.reads = reads + 1
+
+    def release_read(self) -> None:
+        self._local.reads -= 1
+        if self._local.reads == 0 and self._writer != threading.get_ident():
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if getattr(self._local, 'reads', 0):
+                raise RuntimeError("Cannot upgrade a read lock to a write lock")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self) -> None:
+        with self._cond:
+            self._write_depth -= 1
+            if self._write_depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+
 class BaseStorageProvider(ABC):
     """
     Abstract base class for all knowledge storage providers.
@@ -25,6 +105,9 @@ class BaseStorageProvider(ABC):
         e.g., API keys, endpoints, database paths.
         """
         self.config = config
+        # Searches run on worker threads while ingestion mutates in-process indexes;
+        # providers that keep such indexes guard them with this lock
+        self.index_lock = ReadWriteLock()
         print(f"Initialized {self.__class__.__name__}")
 
     @abstractmethod
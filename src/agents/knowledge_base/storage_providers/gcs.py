@@ -55,7 +55,7 @@ class GCSStorageProvider(BaseStorageProvider):
         try:
             for chunk in chunks:
                 blob = self.bucket.blob(f"{chunk.id}.json")
-                chunk_dict = chunk.__dict__
+                chunk_dict = chunk.to_dict()
                 blob.upload_from_string(
                     json.dumps(chunk_dict),
                     content_type="application/json"
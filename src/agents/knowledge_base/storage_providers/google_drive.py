@@ -78,7 +78,7 @@ class GoogleDriveStorageProvider(BaseStorageProvider):
         try:
             for chunk in chunks:
                 file_metadata = {"name": f"{chunk.id}.json", "parents": [self.folder_id]}
-                chunk_dict = chunk.__dict__
+                chunk_dict = chunk.to_dict()
                 json_bytes = json.dumps(chunk_dict).encode('utf-8')
 
                 # Create a temporary file to upload
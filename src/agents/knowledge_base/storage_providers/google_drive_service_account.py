@@ -79,7 +79,7 @@ class GoogleDriveServiceAccountProvider(BaseStorageProvider):
         try:
             for chunk in chunks:
                 file_metadata = {"name": f"{chunk.id}.json", "parents": [self.folder_id]}
-                chunk_dict = chunk.__dict__
+                chunk_dict = chunk.to_dict()
                 json_bytes = json.dumps(chunk_dict).encode('utf-8')
                 
                 tmp_file_path = f"{chunk.id}.tmp.json"
@@ -0,0 +1,585 @@
+import asyncio
+import contextlib
+import json
+import os
+import threading
+import zlib
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from .base import BaseStorageProvider, RetrievedChunk, ProcessedKnowledgeChunk
+from ..improved_rag.bm25_index import BM25Index
+from ..improved_rag.metadata_index import MetadataIndex
+from ..improved_rag.product_quantizer import PQVectorIndex
+from ..improved_rag.tokenizer import CJKTokenizer
+
+
+class LocalFileStorageProvider(BaseStorageProvider):
+    """
+    A durable, local file-backed storage provider.
+
+    Layout of the storage directory:
+      - vectors.f32: memory-mapped float32 segment, one row per stored vector
+      - chunks.log:  append-only JSON-lines log of chunk records and delete/promote ops
+      - index.json:  snapshot of the offset index (chunk id -> log offset, length, row)
+      - wal.log:     write-ahead log; each batch is fsync'ed here before it is applied
+
+    Restarts load the snapshot and only scan the log tail written after it, so they
+    do not re-read the corpus. Vectors stay on disk and are paged in by the OS, which
+    allows datasets larger than RAM. Deleted and superseded records are reclaimed by
+    compaction, which runs on a background thread once dead records exceed `compaction_ratio`.
+
+    With `vector_codec: 'pq'` vector queries score product-quantized codes held in
+    memory and re-rank a short list exactly from the memory-mapped vectors, so the
+    full-precision segment is only touched for a few rows per query.
+    """
+
+    VECTORS_FILE = 'vectors.f32'
+    LOG_FILE = 'chunks.log'
+    INDEX_FILE = 'index.json'
+    WAL_FILE = 'wal.log'
+    COMPACTION_MARKER = 'compact.pending'
+
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config or {})
+        self.path = self.config.get('path', './knowledge_store')
+        self.dim: Optional[int] = self.config.get('dim')
+        self.compaction_ratio = self.config.get('compaction_ratio', 0.5)
+        self.search_block_rows = self.config.get('search_block_rows', 65536)
+        os.makedirs(self.path, exist_ok=True)
+
+        # chunk id -> (offset, length, row or -1, staged)
+        self.entries: Dict[str, Tuple[int, int, int, bool]] = {}
+        self.next_row = 0
+        self.dead_records = 0
+        self._vectors: Optional[np.memmap] = None
+        self._keyword_index: Optional[BM25Index] = None
+        self._metadata_index: Optional[MetadataIndex] = None
+        self._pq_index: Optional[PQVectorIndex] = None
+        self._compaction_thread: Optional[threading.Thread] = None
+        self.vector_codec = self.config.get('vector_codec', 'raw')
+        if self.vector_codec not in ('raw', 'pq'):
+            raise ValueError(f"Unsupported vector codec: {self.vector_codec}")
+        self._tokenizer = CJKTokenizer(dictionary=self.config.get('tokenizer_dictionary'))
+
+        self._open()
+
+    # --- BaseStorageProvider API ---
+
+    async def store(self, chunks: List[ProcessedKnowledgeChunk]) -> bool:
+        """Appends chunks durably: WAL first, then log and vector segment."""
+        print(f"[LocalFileProvider] Storing {len(chunks)} chunks.")
+        records = []
+        for chunk in chunks:
+            vector = self._vector_for(chunk)
+            records.append({
+                'op': 'put',
+                'id': chunk.id,
+                'original_id': getattr(chunk, 'original_id', chunk.id),
+                'text_content': chunk.text_content,
+                'category': getattr(chunk, 'category', None),
+                'entities': getattr(chunk, 'entities', []),
+                'relationships': getattr(chunk, 'relationships', []),
+                'metadata': chunk.metadata,
+                'staged': bool(chunk.metadata.get('stage', False)),
+                # Rows are assigned under the write lock, see _allocate_rows
+                'row': -1,
+                'dim': None,
+                'vector': vector,
+            })
+        await asyncio.to_thread(self._commit, records)
+        return True
+
+    def retrieve(self, query_vector: List[float], top_k: int, filters: Dict) -> List[RetrievedChunk]:
+        print(f"[LocalFileProvider] Retrieving top {top_k} chunks.")
+        with self.index_lock.read():
+            return self._retrieve(query_vector, top_k, filters)
+
+    def _retrieve(self, query_vector: List[float], top_k: int, filters: Dict) -> List[RetrievedChunk]:
+        if top_k <= 0:
+            return []
+        query_text = filters.get('query_text', '') if filters else ''
+        # Indexed metadata filters narrow the candidates before any record is read from the log
+        candidate_ids, residual_filters = None, filters
+        if filters and any(key not in MetadataIndex.CONTROL_KEYS for key in filters):
+            candidate_ids, residual_filters = self._get_metadata_index().lookup(filters)
+        if candidate_ids is not None and not candidate_ids:
+            return []
+
+        if query_text:
+            def rank(limit):
+                return self._get_keyword_index().search(query_text, limit, candidate_ids, normalize=True)
+        elif self._vectors is not None and query_vector is not None and len(query_vector) == self.dim:
+            if self.vector_codec == 'pq' and not residual_filters:
+                return self._collect(self._get_pq_index().search(query_vector, top_k, candidate_ids), top_k, None)
+
+            def rank(limit):
+                return self._vector_search(query_vector, candidate_ids, limit)
+        elif candidate_ids is not None:
+            return self._collect(((0.9, chunk_id) for chunk_id in candidate_ids), top_k, residual_filters)
+        else:
+            return self._collect(((0.9, chunk_id) for chunk_id, entry in self.entries.items() if not entry[3]),
+                                 top_k, residual_filters)
+
+        # Only the best `limit` matches are selected, never a full sort; unindexed filters are checked
+        # on the records, so when they reject too many the selection is widened and repeated
+        limit = top_k
+        while True:
+            ranked = rank(limit)
+            results = self._collect(ranked, top_k, residual_filters)
+            if len(results) >= top_k or len(ranked) < limit:
+                return results
+            limit *= 4
+
+    def _collect(self, ranked, top_k: int, residual_filters: Optional[Dict]) -> List[RetrievedChunk]:
+        """Reads the ranked records in order and keeps the first top_k that pass the residual filters."""
+        results = []
+        with self._open_log() as log:
+            for score, chunk_id in ranked:
+                record = self._read_record(chunk_id, log)
+                if record is None or not self._matches_filters(record['metadata'], residual_filters):
+                    continue
+                results.append(RetrievedChunk(
+                    id=chunk_id,
+                    text_content=record['text_content'],
+                    score=score,
+                    metadata=record['metadata']
+                ))
+                if len(results) >= top_k:
+                    break
+        return results
+
+    def get_all_chunk_ids(self) -> List[str]:
+        print("[LocalFileProvider] Fetching all chunk IDs.")
+        with self.index_lock.read():
+            return [chunk_id for chunk_id, entry in self.entries.items() if not entry[3]]
+
+    async def list_staged_chunks(self) -> List[str]:
+        """Lists the IDs of all chunks currently in the staging area."""
+        print("[LocalFileProvider] Listing staged chunks.")
+        with self.index_lock.read():
+            return [chunk_id for chunk_id, entry in self.entries.items() if entry[3]]
+
+    async def validate_and_promote(self, chunk_id: str) -> bool:
+        """Moves a staged chunk to the searchable set."""
+        print(f"[LocalFileProvider] Promoting chunk {chunk_id}.")
+        entry = self.entries.get(chunk_id)
+        if entry is None or not entry[3]:
+            return False
+        await asyncio.to_thread(self._commit, [{'op': 'promote', 'id': chunk_id}])
+        return True
+
+    async def delete_chunk(self, chunk_id: str) -> bool:
+        """Deletes a chunk; its log record and vector row are reclaimed on compaction."""
+        print(f"[LocalFileProvider] Deleting chunk {chunk_id}.")
+        if chunk_id not in self.entries:
+            return False
+        await asyncio.to_thread(self._commit, [{'op': 'delete', 'id': chunk_id}])
+        return True
+
+    def compact(self) -> None:
+        """Rewrites the log and vector segment with live records only."""
+        with self.index_lock.write():
+            self._compact()
+
+    def _compact(self) -> None:
+        print(f"[LocalFileProvider] Compacting {len(self.entries)} live chunks.")
+        log_tmp = self._file(self.LOG_FILE) + '.compact'
+        vectors_tmp = self._file(self.VECTORS_FILE) + '.compact'
+        live_rows = sum(1 for entry in self.entries.values() if entry[2] >= 0)
+
+        new_entries = {}
+        new_vectors = None
+        if live_rows and self.dim:
+            new_vectors = np.memmap(vectors_tmp, dtype=np.float32, mode='w+', shape=(live_rows, self.dim))
+        row = 0
+        # One handle on the old log for the whole rewrite instead of reopening it per record
+        with open(log_tmp, 'wb') as log, open(self._file(self.LOG_FILE), 'rb') as source:
+            for chunk_id, (_, _, old_row, staged) in self.entries.items():
+                record = self._read_record(chunk_id, source)
+                new_row = -1
+                if old_row >= 0 and new_vectors is not None:
+                    new_vectors[row] = self._vectors[old_row]
+                    new_row = row
+                    row += 1
+                record.update({'op': 'put', 'row': new_row, 'staged': staged})
+                offset, length = log.tell(), self._write_record(log, record)
+                new_entries[chunk_id] = (offset, length, new_row, staged)
+            log.flush()
+            os.fsync(log.fileno())
+        if new_vectors is not None:
+            new_vectors.flush()
+            del new_vectors
+
+        self._vectors = None
+        # The marker makes the two renames below restartable if we crash in between
+        with open(self._file(self.COMPACTION_MARKER), 'wb') as marker:
+            os.fsync(marker.fileno())
+        if not os.path.exists(vectors_tmp) and os.path.exists(self._file(self.VECTORS_FILE)):
+            os.remove(self._file(self.VECTORS_FILE))
+        self._finish_compaction()
+        self.entries = new_entries
+        self.next_row = row
+        self.dead_records = 0
+        self._map_vectors(row)
+        self._write_snapshot()
+
+    def wait_for_compaction(self, timeout: Optional[float] = None) -> None:
+        """Blocks until a running background compaction has finished."""
+        thread = self._compaction_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def close(self) -> None:
+        """Flushes the vector segment and writes an index snapshot for fast restarts."""
+        self.wait_for_compaction()
+        with self.index_lock.write():
+            if self._vectors is not None:
+                self._vectors.flush()
+            self._write_snapshot()
+
+    # --- Write path ---
+
+    def _commit(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Makes a batch durable in the WAL, applies it, then truncates the WAL.
+        Called on a worker thread: the write lock waits for in-flight searches.
+        """
+        with self.index_lock.write():
+            self._commit_locked(records)
+
+    def _commit_locked(self, records: List[Dict[str, Any]]) -> None:
+        self._allocate_rows(records)
+        payload = json.dumps(records, ensure_ascii=False).encode('utf-8')
+        with open(self._file(self.WAL_FILE), 'wb') as wal:
+            wal.write(f"{zlib.crc32(payload)}\t".encode('ascii') + payload + b'\n')
+            wal.flush()
+            os.fsync(wal.fileno())
+        self._apply(records)
+        with open(self._file(self.WAL_FILE), 'wb'):
+            pass
+        if self._needs_compaction():
+            self._schedule_compaction()
+
+    def _allocate_rows(self, records: List[Dict[str, Any]]) -> None:
+        """Assigns vector rows under the write lock, so concurrent stores never share a row."""
+        for record in records:
+            vector = record.get('vector') if record['op'] == 'put' else None
+            if vector is None:
+                continue
+            if self.dim is None:
+                self.dim = len(vector)
+            if len(vector) != self.dim:
+                print(f"[LocalFileProvider] Skipping vector of chunk {record['id']}: dimension {len(vector)} != {self.dim}")
+                record['vector'] = None
+                continue
+            record['row'] = self.next_row
+            record['dim'] = self.dim
+            self.next_row += 1
+
+    def _needs_compaction(self) -> bool:
+        return bool(self.entries) and self.dead_records > len(self.entries) * self.compaction_ratio
+
+    def _schedule_compaction(self) -> None:
+        """Starts compaction on a background thread, so the ingest path never waits for the rewrite."""
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(
+            target=self._background_compact, name='local-file-compaction', daemon=True
+        )
+        self._compaction_thread.start()
+
+    def _background_compact(self) -> None:
+        try:
+            with self.index_lock.write():
+                if self._needs_compaction():
+                    self._compact()
+        except Exception as e:
+            print(f"[LocalFileProvider] Background compaction failed: {e}")
+
+    def _apply(self, records: List[Dict[str, Any]]) -> None:
+        rows = [record['row'] for record in records if record.get('row', -1) >= 0]
+        if rows:
+            self.dim = self.dim or next(record['dim'] for record in records if record.get('row', -1) >= 0)
+            self._map_vectors(max(rows) + 1)
+        with open(self._file(self.LOG_FILE), 'ab') as log:
+            for record in records:
+                if record['op'] == 'put' and record['row'] >= 0:
+                    self._vectors[record['row']] = record['vector']
+                    self.next_row = max(self.next_row, record['row'] + 1)
+                offset = log.tell()
+                stored = {key: value for key, value in record.items() if key != 'vector'}
+                length = self._write_record(log, stored)
+                self._index_record(stored, offset, length)
+            log.flush()
+            os.fsync(log.fileno())
+        if self._vectors is not None:
+            self._vectors.flush()
+
+    def _index_record(self, record: Dict[str, Any], offset: int, length: int) -> None:
+        """Updates the in-memory offset index (and keyword/metadata indexes, if built) for one log record."""
+        chunk_id = record['id']
+        op = record['op']
+        if op == 'put':
+            if chunk_id in self.entries:
+                self.dead_records += 1
+            self.entries[chunk_id] = (offset, length, record['row'], record['staged'])
+            if record['staged']:
+                self._drop_from_indexes(chunk_id)
+            else:
+                if self._keyword_index is not None:
+                    self._keyword_index.add(chunk_id, record['text_content'])
+                if self._metadata_index is not None:
+                    self._metadata_index.add(chunk_id, record['metadata'])
+                if self._pq_index is not None:
+                    if record['row'] >= 0:
+                        self._pq_index.add(chunk_id, self._vectors[record['row']])
+                    else:
+                        self._pq_index.remove(chunk_id)
+        elif op == 'promote' and chunk_id in self.entries:
+            entry_offset, entry_length, row, _ = self.entries[chunk_id]
+            self.entries[chunk_id] = (entry_offset, entry_length, row, False)
+            self.dead_records += 1
+            if self._keyword_index is not None or self._metadata_index is not None:
+                record = self._read_record(chunk_id)
+                if self._keyword_index is not None:
+                    self._keyword_index.add(chunk_id, record['text_content'])
+                if self._metadata_index is not None:
+                    self._metadata_index.add(chunk_id, record['metadata'])
+            if self._pq_index is not None and row >= 0:
+                self._pq_index.add(chunk_id, self._vectors[row])
+        elif op == 'delete' and chunk_id in self.entries:
+            del self.entries[chunk_id]
+            self.dead_records += 2
+            self._drop_from_indexes(chunk_id)
+
+    def _drop_from_indexes(self, chunk_id: str) -> None:
+        for index in (self._keyword_index, self._metadata_index, self._pq_index):
+            if index is not None:
+                index.remove(chunk_id)
+
+    @staticmethod
+    def _write_record(log, record: Dict[str, Any]) -> int:
+        data = json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n'
+        log.write(data)
+        return len(data)
+
+    @staticmethod
+    def _vector_for(chunk: Any) -> Optional[List[float]]:
+        vector = getattr(chunk, 'vector', None)
+        if vector is None or len(vector) == 0:
+            return None
+        return [float(value) for value in vector]
+
+    # --- Read path ---
+
+    def _read_record(self, chunk_id: str, log=None) -> Optional[Dict[str, Any]]:
+        """Reads a chunk's log record; scans pass an open `log` handle to avoid reopening the file."""
+        entry = self.entries.get(chunk_id)
+        if entry is None:
+            return None
+        if log is None:
+            with open(self._file(self.LOG_FILE), 'rb') as log:
+                return self._read_record(chunk_id, log)
+        log.seek(entry[0])
+        return json.loads(log.read(entry[1]))
+
+    def _open_log(self):
+        """Opens the log once for reading many records; yields None while there is no log yet."""
+        log_path = self._file(self.LOG_FILE)
+        return open(log_path, 'rb') if os.path.exists(log_path) else contextlib.nullcontext()
+
+    def _vector_search(self, query_vector: List[float], candidate_ids: Optional[set] = None,
+                       top_k: Optional[int] = None) -> List[Tuple[float, str]]:
+        """Scores the searchable rows (optionally only the candidates) block by block and returns the best top_k."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            return []
+        query = query / query_norm
+
+        if candidate_ids is None:
+            entries = self.entries.items()
+        else:
+            entries = ((chunk_id, self.entries[chunk_id]) for chunk_id in candidate_ids if chunk_id in self.entries)
+        row_to_id = {entry[2]: chunk_id for chunk_id, entry in entries if entry[2] >= 0 and not entry[3]}
+        if not row_to_id:
+            return []
+        rows = np.fromiter(sorted(row_to_id), dtype=np.int64)
+        scores = np.empty(rows.size, dtype=np.float32)
+        for start in range(0, rows.size, self.search_block_rows):
+            block = np.asarray(self._vectors[rows[start:start + self.search_block_rows]])
+            norms = np.linalg.norm(block, axis=1)
+            norms[norms == 0] = 1.0
+            scores[start:start + block.shape[0]] = (block @ query) / norms
+        if top_k is not None and top_k < scores.size:
+            # argpartition selects the best top_k in O(N); only those k are sorted
+            order = np.argpartition(-scores, top_k - 1)[:top_k]
+            order = order[np.argsort(-scores[order], kind='stable')]
+        else:
+            order = np.argsort(-scores, kind='stable')
+        return [(max(0.0, float(scores[i])), row_to_id[int(rows[i])]) for i in order]
+
+    def _get_keyword_index(self) -> BM25Index:
+        """Builds the BM25 index on first text query, then maintains it incrementally."""
+        if self._keyword_index is None:
+            index = BM25Index(tokenizer=self._tokenizer)
+            with self._open_log() as log:
+                for chunk_id, entry in self.entries.items():
+                    if not entry[3]:
+                        index.add(chunk_id, self._read_record(chunk_id, log)['text_content'])
+            self._keyword_index = index
+        return self._keyword_index
+
+    def _get_pq_index(self) -> PQVectorIndex:
+        """Trains PQ codebooks on the stored vectors on first use, then maintains codes incrementally."""
+        if self._pq_index is None:
+            index = PQVectorIndex(
+                dim=self.dim,
+                num_subspaces=self.config.get('pq_subspaces', 16),
+                num_centroids=self.config.get('pq_centroids', 256),
+                train_size=self.config.get('pq_train_size', 4096),
+                rerank_factor=self.config.get('pq_rerank_factor', 4),
+                vector_loader=lambda chunk_ids: self._vectors[[self.entries[chunk_id][2] for chunk_id in chunk_ids]]
+            )
+            live = [(chunk_id, entry[2]) for chunk_id, entry in self.entries.items() if entry[2] >= 0 and not entry[3]]
+            for start in range(0, len(live), self.search_block_rows):
+                block = live[start:start + self.search_block_rows]
+                index.add_batch([chunk_id for chunk_id, _ in block], self._vectors[[row for _, row in block]])
+            self._pq_index = index
+        return self._pq_index
+
+    def _get_metadata_index(self) -> MetadataIndex:
+        """Builds the metadata index on first use, then maintains it incrementally."""
+        if self._metadata_index is None:
+            index = MetadataIndex(self.config.get('metadata_index_keys', MetadataIndex.DEFAULT_KEYS))
+            with self._open_log() as log:
+                for chunk_id, entry in self.entries.items():
+                    if not entry[3]:
+                        index.add(chunk_id, self._read_record(chunk_id, log)['metadata'])
+            self._metadata_index = index
+        return self._metadata_index
+
+    @staticmethod
+    def _matches_filters(metadata: Dict, filters: Dict) -> bool:
+        if not filters:
+            return True
+        for key, value in filters.items():
+            if key not in MetadataIndex.CONTROL_KEYS and not (key in metadata and metadata[key] == value):
+                return False
+        return True
+
+    # --- Startup and recovery ---
+
+    def _open(self) -> None:
+        """Loads the snapshot, scans the log tail, then replays any pending WAL batch."""
+        log_start = self._load_snapshot()
+        self._scan_log(log_start)
+        self._map_vectors(self.next_row)
+        self._replay_wal()
+
+    def _finish_compaction(self) -> None:
+        """Installs the compacted files written by compact() and clears the marker."""
+        # The old snapshot holds offsets into the old log; drop it while the marker is still
+        # present, so a crash before compact() writes the new snapshot rebuilds from the new log
+        if os.path.exists(self._file(self.INDEX_FILE)):
+            os.remove(self._file(self.INDEX_FILE))
+        for name in (self.VECTORS_FILE, self.LOG_FILE):
+            tmp_path = self._file(name) + '.compact'
+            if os.path.exists(tmp_path):
+                os.replace(tmp_path, self._file(name))
+        os.remove(self._file(self.COMPACTION_MARKER))
+
+    def _load_snapshot(self) -> int:
+        snapshot_path = self._file(self.INDEX_FILE)
+        if os.path.exists(self._file(self.COMPACTION_MARKER)):
+            # Interrupted compaction: finish it and rebuild the index from the new log
+            self._finish_compaction()
+            return 0
+        for name in (self.VECTORS_FILE, self.LOG_FILE):
+            # Leftovers of a compaction that never reached the marker are discarded
+            if os.path.exists(self._file(name) + '.compact'):
+                os.remove(self._file(name) + '.compact')
+        if not os.path.exists(snapshot_path):
+            return 0
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        log_size = os.path.getsize(self._file(self.LOG_FILE)) if os.path.exists(self._file(self.LOG_FILE)) else 0
+        if snapshot['log_size'] > log_size:
+            # The log is older than the snapshot (e.g. restored backup): rebuild from scratch
+            return 0
+        self.entries = {chunk_id: tuple(entry) for chunk_id, entry in snapshot['entries'].items()}
+        self.next_row = snapshot['next_row']
+        self.dead_records = snapshot['dead_records']
+        self.dim = self.dim or snapshot['dim']
+        return snapshot['log_size']
+
+    def _scan_log(self, start: int) -> None:
+        log_path = self._file(self.LOG_FILE)
+        if not os.path.exists(log_path):
+            return
+        if start == 0:
+            self.entries, self.next_row, self.dead_records = {}, 0, 0
+        with open(log_path, 'rb+') as log:
+            log.seek(start)
+            offset = start
+            for line in log:
+                if not line.endswith(b'\n'):
+                    # Torn write at the tail: the batch is still in the WAL and will be replayed
+                    log.truncate(offset)
+                    break
+                record = json.loads(line)
+                if record.get('row', -1) >= 0:
+                    self.next_row = max(self.next_row, record['row'] + 1)
+                    self.dim = self.dim or record.get('dim')
+                self._index_record(record, offset, len(line))
+                offset += len(line)
+
+    def _replay_wal(self) -> None:
+        wal_path = self._file(self.WAL_FILE)
+        if not os.path.exists(wal_path) or os.path.getsize(wal_path) == 0:
+            return
+        with open(wal_path, 'rb') as wal:
+            line = wal.readline()
+        checksum, _, payload = line.rstrip(b'\n').partition(b'\t')
+        if line.endswith(b'\n') and checksum.isdigit() and int(checksum) == zlib.crc32(payload):
+            print("[LocalFileProvider] Replaying write-ahead log.")
+            self._apply(json.loads(payload))
+        with open(wal_path, 'wb'):
+            pass
+
+    def _map_vectors(self, rows: int) -> None:
+        """Maps the vector segment, growing the file geometrically when more rows are needed."""
+        if self.dim is None:
+            return
+        if self._vectors is not None and self._vectors.shape[0] >= rows:
+            return
+        vectors_path = self._file(self.VECTORS_FILE)
+        row_bytes = self.dim * 4
+        current = os.path.getsize(vectors_path) // row_bytes if os.path.exists(vectors_path) else 0
+        if current < rows or current == 0:
+            capacity = max(rows, current * 2, 1024)
+            if self._vectors is not None:
+                self._vectors.flush()
+            with open(vectors_path, 'ab') as f:
+                f.truncate(capacity * row_bytes)
+            current = capacity
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode='r+', shape=(current, self.dim))
+
+    def _write_snapshot(self) -> None:
+        log_path = self._file(self.LOG_FILE)
+        snapshot = {
+            'log_size': os.path.getsize(log_path) if os.path.exists(log_path) else 0,
+            'next_row': self.next_row,
+            'dead_records': self.dead_records,
+            'dim': self.dim,
+            'entries': self.entries,
+        }
+        tmp_path = self._file(self.INDEX_FILE) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._file(self.INDEX_FILE))
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
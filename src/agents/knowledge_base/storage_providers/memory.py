@@ -1,5 +1,11 @@
+import asyncio
 from typing import List, Dict, Any
 from .base import BaseStorageProvider, RetrievedChunk, ProcessedKnowledgeChunk
+from ..improved_rag.bm25_index import BM25Index
+from ..improved_rag.metadata_index import MetadataIndex
+from ..improved_rag.tokenizer import CJKTokenizer
+from ..improved_rag.topk import select_top_k
+from ..improved_rag.chunk_store import ColumnarChunkStore
 
 class MemoryStorageProvider(BaseStorageProvider):
     """
@@ -10,182 +16,96 @@ class MemoryStorageProvider(BaseStorageProvider):
 
     def __init__(self, config: Dict[str, Any] = None):
         super().__init__(config or {})
-        self.vector_db: Dict[str, Any] = {}
+        # Columnar store: text, vectors and metadata live in shared arrays, lookups return views
+        self.vector_db = ColumnarChunkStore()
         self.staged_chunks: Dict[str, Any] = {}
+        # BM25 inverted index over the main DB, maintained on store/promote
+        self.keyword_index = BM25Index(tokenizer=CJKTokenizer(dictionary=self.config.get('tokenizer_dictionary')))
+        # Hash indexes on commonly filtered metadata keys, so filtered queries only touch matching chunks
+        self.metadata_index = MetadataIndex(self.config.get('metadata_index_keys', MetadataIndex.DEFAULT_KEYS))
 
     async def store(self, chunks: List[ProcessedKnowledgeChunk]) -> bool:
         """
         Stores chunks in the staging area or main DB based on metadata.
         """
         print(f"[MemoryProvider] Storing {len(chunks)} chunks.")
-        for chunk in chunks:
-            print(f"[MemoryProvider] Storing chunk: {chunk.id}")
-            if chunk.metadata.get('stage', False):
-                print(f"[MemoryProvider] Staging chunk: {chunk.id}")
-                self.staged_chunks[chunk.id] = chunk
-            else:
-                print(f"[MemoryProvider] Storing chunk to DB: {chunk.id}")
-                self.vector_db[chunk.id] = chunk
+        # The write lock waits for in-flight searches, so take it on a worker thread, not the event loop
+        return await asyncio.to_thread(self._store, chunks)
+
+    def _store(self, chunks: List[ProcessedKnowledgeChunk]) -> bool:
+        with self.index_lock.write():
+            for chunk in chunks:
+                print(f"[MemoryProvider] Storing chunk: {chunk.id}")
+                if chunk.metadata.get('stage', False):
+                    print(f"[MemoryProvider] Staging chunk: {chunk.id}")
+                    self.staged_chunks[chunk.id] = chunk
+                else:
+                    print(f"[MemoryProvider] Storing chunk to DB: {chunk.id}")
+                    self.vector_db[chunk.id] = chunk
+                    self.keyword_index.add(chunk.id, chunk.text_content)
+                    self.metadata_index.add(chunk.id, chunk.metadata)
         return True
 
     def retrieve(self, query_vector: List[float], top_k: int, filters: Dict) -> List[RetrievedChunk]:
         print(f"[MemoryProvider] Retrieving top {top_k} chunks.")
+        with self.index_lock.read():
+            return self._retrieve(query_vector, top_k, filters)
 
+    def _retrieve(self, query_vector: List[float], top_k: int, filters: Dict) -> List[RetrievedChunk]:
         # Extract query text if available in filters for content-based matching
         query_text = filters.get('query_text', '').lower() if filters else ''
+        # Indexed metadata filters narrow the candidates up front; only unindexed keys are checked per chunk
+        candidate_ids, residual_filters = self.metadata_index.lookup(filters)
 
-        # Get all chunks and calculate relevance scores
-        candidate_chunks = []
-        for chunk_id, chunk in self.vector_db.items():
-            # Apply metadata filters first
-            if filters:
-                # Check non-query filters
-                metadata_match = True
-                for key, value in filters.items():
-                    if key != 'query_text' and not (key in chunk.metadata and chunk.metadata[key] == value):
-                        metadata_match = False
-                        break
-                if not metadata_match:
-                    continue
-
-            # Calculate relevance score based on query text
-            relevance_score = 0.9  # Default score
-            if query_text:
-                chunk_text = chunk.text_content.lower()
-                
-                # Check for Chinese characters in query
-                has_chinese = any('\u4e00' <= char <= '\u9fff' for char in query_text)
-                
-                if has_chinese:
-                    # For Chinese queries, use character-based matching
-                    # Extract key terms from query
-                    key_terms = []
-                    if '温度' in query_text:
-                        key_terms.extend(['温度', '太阳', '表面'])
-                    elif '分子式' in query_text or '分子' in query_text:
-                        key_terms.extend(['分子式', '化学', 'h2o', '水'])
-                    elif '光速' in query_text:
-                        key_terms.extend(['光速', '30万', '公里'])
-                    elif 'dna' in query_text.lower() or '全称' in query_text:
-                        key_terms.extend(['dna', '脱氧', '核糖', '核酸'])
-                    elif 'python' in query_text.lower() or '语言' in query_text:
-                        key_terms.extend(['python', '编程', '语言'])
-                    elif 'git' in query_text.lower():
-                        key_terms.extend(['git', '版本', '控制'])
-                    elif 'docker' in query_text.lower():
-                        key_terms.extend(['docker', '容器', '平台'])
-                    elif 'react' in query_text.lower():
-                        key_terms.extend(['react', 'facebook', 'javascript'])
-                    elif '长城' in query_text:
-                        key_terms.extend(['长城', '万里', '公元前'])
-                    elif '世界大战' in query_text:
-                        key_terms.extend(['世界大战', '1939', '1945'])
-                    elif '金字塔' in query_text:
-                        key_terms.extend(['金字塔', '埃及', '公元前'])
-                    elif '独立宣言' in query_text:
-                        key_terms.extend(['独立宣言', '美国', '1776'])
-                    elif '最高峰' in query_text:
-                        key_terms.extend(['珠穆朗玛', '最高峰', '8848'])
-                    elif '河流' in query_text:
-                        key_terms.extend(['亚马逊', '河流', '流量'])
-                    elif '沙漠' in query_text:
-                        key_terms.extend(['撒哈拉', '沙漠', '第三'])
-                    elif '海洋' in query_text:
-                        key_terms.extend(['太平洋', '海洋', '最大'])
-                    elif '莎士比亚' in query_text:
-                        key_terms.extend(['莎士比亚', '哈姆雷特', '剧作家'])
-                    elif '贝多芬' in query_text:
-                        key_terms.extend(['贝多芬', '交响曲', '九部'])
-                    elif '蒙娜丽莎' in query_text:
-                        key_terms.extend(['蒙娜丽莎', '达芬奇', '画作'])
-                    elif '奥运会' in query_text:
-                        key_terms.extend(['奥运会', '四年', '古希腊'])
-                    # 数学相关关键词
-                    elif '面积' in query_text and '圆' in query_text:
-                        key_terms.extend(['圆', '面积', 'π', 'r²', '半径'])
-                    elif '勾股定理' in query_text:
-                        key_terms.extend(['勾股定理', 'a²', 'b²', 'c²', '直角三角形'])
-                    elif '正方形' in query_text and '面积' in query_text:
-                        key_terms.extend(['正方形', '边长', '5cm', '25', '平方厘米'])
-                    elif '二次方程' in query_text or '求解公式' in query_text:
-                        key_terms.extend(['二次方程', 'ax²', 'bx', 'c', '求解'])
-                    elif '复利' in query_text:
-                        key_terms.extend(['复利', 'A', 'P', '本金', '年利率'])
-                    elif '投资' in query_text and '10000' in query_text:
-                        key_terms.extend(['投资', '10000', '年利率', '5%', '11576'])
-                    elif '速度公式' in query_text:
-                        key_terms.extend(['速度', 'v', 's/t', '距离', '时间'])
-                    elif '牛顿第二定律' in query_text:
-                        key_terms.extend(['牛顿', 'F', 'ma', '质量', '加速度'])
-                    elif '汽车' in query_text and '60公里' in query_text:
-                        key_terms.extend(['汽车', '60公里', '2小时', '120公里'])
-                    elif '电功率' in query_text:
-                        key_terms.extend(['电功率', 'P', 'UI', '电压', '电流'])
-                    elif '动能公式' in query_text:
-                        key_terms.extend(['动能', 'Ek', '½mv²', '质量', '速度'])
-                    elif '平均数' in query_text:
-                        key_terms.extend(['平均数', '总和', '个数', '÷'])
-                    elif '标准差' in query_text:
-                        key_terms.extend(['标准差', 'σ', '离散程度', '√'])
-                    elif '概率' in query_text and '基本公式' in query_text:
-                        key_terms.extend(['概率', 'P(A)', '有利结果', '总结果'])
-                    elif '硬币' in query_text and '概率' in query_text:
-                        key_terms.extend(['硬币', '正面', '1/2', '50%'])
-                    elif '条件概率' in query_text:
-                        key_terms.extend(['条件概率', 'P(A|B)', 'P(A∩B)'])
-                    elif '肯定前件' in query_text:
-                        key_terms.extend(['肯定前件', 'A则B', 'A为真', 'B也为真'])
-                    elif '否定后件' in query_text:
-                        key_terms.extend(['否定后件', 'A则B', 'B为假', 'A也为假'])
-                    elif '德摩根定律' in query_text:
-                        key_terms.extend(['德摩根定律', '非(A且B)', '(非A)或(非B)'])
-                    elif '三段论' in query_text:
-                        key_terms.extend(['三段论', '大前提', '小前提', '结论', '苏格拉底'])
-                    
-                    # Calculate matching score
-                    matching_terms = sum(1 for term in key_terms if term.lower() in chunk_text)
-                    if matching_terms > 0:
-                        relevance_score = min(0.99, 0.5 + (matching_terms / len(key_terms)) * 0.4)
-                    else:
-                        # Fallback to simple text matching
-                        if any(char in chunk_text for char in query_text if '\u4e00' <= char <= '\u9fff'):
-                            relevance_score = 0.4
-                        else:
-                            relevance_score = 0.05
-                else:
-                    # English query processing
-                    query_words = [word for word in query_text.split() if len(word) > 2]
-                    matching_words = sum(1 for word in query_words if word in chunk_text)
-                    if matching_words > 0:
-                        match_ratio = matching_words / len(query_words)
-                        relevance_score = min(0.99, 0.4 + match_ratio * 0.5)
-                        if query_text in chunk_text:
-                            relevance_score = min(0.99, relevance_score + 0.2)
-                    else:
-                        relevance_score = 0.05
+        if query_text:
+            # Queries are scored with BM25 over character n-grams (Chinese) and words (other
+            # scripts), touching only the postings of the query terms. Matches stream through
+            # a bounded heap instead of being sorted in full.
+            scores = self.keyword_index.scores(query_text, candidate_ids=candidate_ids, normalize=True)
+            candidate_chunks = (
+                (score, self.vector_db[chunk_id]) for chunk_id, score in scores.items()
+                if self._matches_filters(self.vector_db[chunk_id], residual_filters)
+            )
+            return self._to_retrieved_chunks(select_top_k(candidate_chunks, top_k))
 
-            candidate_chunks.append((relevance_score, chunk))
+        # Without query text every chunk that passes the filters is equally relevant
+        chunk_ids = self.vector_db if candidate_ids is None else candidate_ids
+        candidate_chunks = []
+        for chunk_id in chunk_ids:
+            chunk = self.vector_db[chunk_id]
+            if self._matches_filters(chunk, residual_filters):
+                candidate_chunks.append((0.9, chunk))
+                if len(candidate_chunks) >= top_k:
+                    break
+        return self._to_retrieved_chunks(candidate_chunks)
 
-        # Sort by relevance score (descending) and take top_k
-        candidate_chunks.sort(key=lambda x: x[0], reverse=True)
+    @staticmethod
+    def _matches_filters(chunk: Any, filters: Dict) -> bool:
+        """Checks the non-query filters against the chunk metadata."""
+        if not filters:
+            return True
+        for key, value in filters.items():
+            if key != 'query_text' and not (key in chunk.metadata and chunk.metadata[key] == value):
+                return False
+        return True
 
-        # Convert to RetrievedChunk objects
-        retrieved_chunks = []
-        for score, chunk in candidate_chunks[:top_k]:
-            retrieved_chunks.append(
-                RetrievedChunk(
-                    id=chunk.id,
-                    text_content=chunk.text_content,
-                    score=score,
-                    metadata=chunk.metadata
-                )
+    @staticmethod
+    def _to_retrieved_chunks(scored_chunks: List[tuple]) -> List[RetrievedChunk]:
+        """Converts (score, chunk) pairs to RetrievedChunk objects."""
+        return [
+            RetrievedChunk(
+                id=chunk.id,
+                text_content=chunk.text_content,
+                score=score,
+                metadata=chunk.metadata
             )
-
-        return retrieved_chunks
+            for score, chunk in scored_chunks
+        ]
 
     def get_all_chunk_ids(self) -> List[str]:
         print("[MemoryProvider] Fetching all chunk IDs.")
-        return list(self.vector_db.keys())
+        with self.index_lock.read():
+            return list(self.vector_db.keys())
 
     async def list_staged_chunks(self) -> List[str]:
         """Lists the IDs of all chunks currently in the staging area."""
@@ -197,8 +117,14 @@ class MemoryStorageProvider(BaseStorageProvider):
         Moves a chunk from the staging area to the main vector database.
         """
         print(f"[MemoryProvider] Promoting chunk {chunk_id}.")
-        if chunk_id in self.staged_chunks:
-            chunk = self.staged_chunks.pop(chunk_id)
-            self.vector_db[chunk.id] = chunk
-            return True
+        return await asyncio.to_thread(self._promote, chunk_id)
+
+    def _promote(self, chunk_id: str) -> bool:
+        with self.index_lock.write():
+            if chunk_id in self.staged_chunks:
+                chunk = self.staged_chunks.pop(chunk_id)
+                self.vector_db[chunk.id] = chunk
+                self.keyword_index.add(chunk.id, chunk.text_content)
+                self.metadata_index.add(chunk.id, chunk.metadata)
+                return True
         return False
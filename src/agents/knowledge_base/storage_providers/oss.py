@@ -1,8 +1,10 @@
 import json
 import os
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 from .base import BaseStorageProvider, RetrievedChunk
+from ..improved_rag.metadata_index import MetadataIndex
 
 try:
     import oss2
@@ -29,6 +31,12 @@ class OSSStorageProvider(BaseStorageProvider):
         self.access_key_secret = config.get("access_key_secret")
         self.bucket_name = config.get("bucket_name")
         self.prefix = config.get("prefix", "knowledge_chunks/")
+        # 元数据索引在第一次带过滤条件的检索时构建，之后随存储/更新/删除增量维护；
+        # bucket可能被其他写入方共享，超过 metadata_index_ttl 秒后按对象ETag与bucket列表对账
+        self._metadata_index: Optional[MetadataIndex] = None
+        self._indexed_etags: Dict[str, str] = {}
+        self._index_synced_at: Optional[float] = None
+        self.metadata_index_ttl = config.get("metadata_index_ttl", 60)
         
         # 验证必要配置
         required_configs = ["endpoint", "access_key_id", "access_key_secret", "bucket_name"]
@@ -93,6 +101,7 @@ class OSSStorageProvider(BaseStorageProvider):
                 
                 if result.status == 200:
                     success_count += 1
+                    self._index_object(chunk.id, chunk_data, result.etag)
                     print(f"✅ 成功存储: {chunk.id}")
                 else:
                     print(f"❌ 存储失败: {chunk.id} - Status: {result.status}")
@@ -108,6 +117,16 @@ class OSSStorageProvider(BaseStorageProvider):
         print(f"[OSSProvider] 检索前 {top_k} 个知识块...")
         
         try:
+            # 过滤条件涉及已索引字段时，只下载命中的对象
+            # 索引从未成功构建时（如列举bucket失败）退回逐个下载对象
+            index = None
+            if filters and any(key not in MetadataIndex.CONTROL_KEYS for key in filters):
+                index = self._get_metadata_index()
+            if index is not None:
+                candidate_ids, residual_filters = self._lookup_candidates(index, filters)
+                if candidate_ids is not None:
+                    return self._retrieve_candidates(candidate_ids, top_k, residual_filters)
+            
             # 获取所有对象
             objects = []
             for obj in oss2.ObjectIterator(self.bucket, prefix=self.prefix):
@@ -129,29 +148,11 @@ class OSSStorageProvider(BaseStorageProvider):
                     chunk_data = json.loads(content.decode('utf-8'))
                     
                     # 应用过滤器
-                    if filters:
-                        skip = False
-                        for key, value in filters.items():
-                            if key == "category" and chunk_data.get("category") != value:
-                                skip = True
-                                break
-                            elif key in chunk_data.get("metadata", {}):
-                                if chunk_data["metadata"][key] != value:
-                                    skip = True
-                                    break
-                        
-                        if skip:
-                            continue
+                    if not self._matches_filters(chunk_data, filters):
+                        continue
                     
                     # 创建RetrievedChunk对象
-                    retrieved_chunks.append(
-                        RetrievedChunk(
-                            id=chunk_data["id"],
-                            text_content=chunk_data["text_content"],
-                            score=0.9,  # 固定分数，实际应该基于向量相似度
-                            metadata=chunk_data.get("metadata", {})
-                        )
-                    )
+                    retrieved_chunks.append(self._to_retrieved_chunk(chunk_data))
                     
                 except Exception as e:
                     print(f"❌ 处理对象失败: {obj.key} - {str(e)}")
@@ -164,6 +165,122 @@ class OSSStorageProvider(BaseStorageProvider):
             print(f"❌ 检索异常: {str(e)}")
             return []
 
+    def _retrieve_candidates(self, candidate_ids: set, top_k: int, filters: Dict) -> List[RetrievedChunk]:
+        """只下载元数据索引命中的对象，按更新时间倒序返回前top_k个"""
+        candidates = []
+        for chunk_id in candidate_ids:
+            try:
+                content = self.bucket.get_object(f"{self.prefix}{chunk_id}.json").read()
+                chunk_data = json.loads(content.decode('utf-8'))
+            except Exception as e:
+                print(f"❌ 处理对象失败: {chunk_id} - {str(e)}")
+                continue
+            if self._matches_filters(chunk_data, filters):
+                candidates.append(chunk_data)
+        
+        candidates.sort(key=lambda data: data.get("updated_time", ""), reverse=True)
+        retrieved_chunks = [self._to_retrieved_chunk(data) for data in candidates[:top_k]]
+        print(f"[OSSProvider] 检索完成: 索引命中 {len(candidate_ids)} 个，返回 {len(retrieved_chunks)} 个知识块")
+        return retrieved_chunks
+
+    @staticmethod
+    def _lookup_candidates(index: MetadataIndex, filters: Dict):
+        """按元数据索引求候选集，语义与 _matches_filters 一致：
+        category 必须相等，其余字段在对象缺少该字段时视为满足条件"""
+        return index.lookup(filters, missing_matches=[key for key in index.keys if key != "category"])
+
+    def _get_metadata_index(self) -> Optional[MetadataIndex]:
+        """返回元数据索引，首次使用或超过 metadata_index_ttl 后先与bucket对账
+
+        Returns:
+            元数据索引；从未成功与bucket对账时返回None
+        """
+        now = time.time()
+        if self._index_synced_at is None or now - self._index_synced_at >= self.metadata_index_ttl:
+            if self._metadata_index is None:
+                print("[OSSProvider] 构建元数据索引...")
+                self._metadata_index = MetadataIndex(self.config.get("metadata_index_keys", MetadataIndex.DEFAULT_KEYS))
+                self._indexed_etags = {}
+            try:
+                self._sync_metadata_index()
+                self._index_synced_at = now
+            except Exception as e:
+                # 列举失败时保留已有索引，下次查询再重试
+                print(f"❌ 同步元数据索引失败: {str(e)}")
+        return self._metadata_index if self._index_synced_at is not None else None
+
+    def _sync_metadata_index(self) -> None:
+        """列举bucket，只下载新增或ETag变化的对象，并移除已被删除的对象"""
+        listed = set()
+        for obj in oss2.ObjectIterator(self.bucket, prefix=self.prefix):
+            if not obj.key.endswith('.json'):
+                continue
+            chunk_id = self._chunk_id(obj.key)
+            listed.add(chunk_id)
+            if self._indexed_etags.get(chunk_id) == self._normalize_etag(obj.etag):
+                continue
+            try:
+                chunk_data = json.loads(self.bucket.get_object(obj.key).read().decode('utf-8'))
+            except Exception as e:
+                # 单个对象损坏或读取失败只跳过它，下次对账时重试
+                print(f"❌ 处理对象失败: {obj.key} - {str(e)}")
+                self._unindex_object(chunk_id)
+                continue
+            self._index_object(chunk_id, chunk_data, obj.etag)
+        for chunk_id in set(self._indexed_etags) - listed:
+            self._unindex_object(chunk_id)
+
+    def _index_object(self, chunk_id: str, chunk_data: Dict, etag: Optional[str]) -> None:
+        if self._metadata_index is None:
+            return
+        self._metadata_index.add(chunk_id, self._index_fields(chunk_data))
+        if etag:
+            self._indexed_etags[chunk_id] = self._normalize_etag(etag)
+        else:
+            self._indexed_etags.pop(chunk_id, None)
+
+    def _unindex_object(self, chunk_id: str) -> None:
+        if self._metadata_index is not None:
+            self._metadata_index.remove(chunk_id)
+        self._indexed_etags.pop(chunk_id, None)
+
+    @staticmethod
+    def _normalize_etag(etag: Optional[str]) -> Optional[str]:
+        """列举结果和上传响应中的ETag可能带引号、大小写不同"""
+        return etag.strip('"').upper() if etag else etag
+
+    def _chunk_id(self, object_key: str) -> str:
+        """从对象key中提取chunk_id"""
+        return object_key[len(self.prefix):-len('.json')]
+
+    @staticmethod
+    def _index_fields(chunk_data: Dict) -> Dict:
+        """被索引的字段：category 取对象顶层的值，其余取自 metadata"""
+        fields = dict(chunk_data.get("metadata") or {})
+        fields["category"] = chunk_data.get("category")
+        return fields
+
+    @staticmethod
+    def _matches_filters(chunk_data: Dict, filters: Dict) -> bool:
+        if not filters:
+            return True
+        for key, value in filters.items():
+            if key == "category" and chunk_data.get("category") != value:
+                return False
+            elif key in chunk_data.get("metadata", {}):
+                if chunk_data["metadata"][key] != value:
+                    return False
+        return True
+
+    @staticmethod
+    def _to_retrieved_chunk(chunk_data: Dict) -> RetrievedChunk:
+        return RetrievedChunk(
+            id=chunk_data["id"],
+            text_content=chunk_data["text_content"],
+            score=0.9,  # 固定分数，实际应该基于向量相似度
+            metadata=chunk_data.get("metadata", {})
+        )
+
     def get_all_chunk_ids(self) -> List[str]:
         """获取所有知识块ID"""
         print("[OSSProvider] 获取所有知识块ID...")
@@ -173,9 +290,7 @@ class OSSStorageProvider(BaseStorageProvider):
             
             for obj in oss2.ObjectIterator(self.bucket, prefix=self.prefix):
                 if obj.key.endswith('.json'):
-                    # 从对象key中提取chunk_id
-                    chunk_id = obj.key.replace(self.prefix, '').replace('.json', '')
-                    chunk_ids.append(chunk_id)
+                    chunk_ids.append(self._chunk_id(obj.key))
             
             print(f"[OSSProvider] 找到 {len(chunk_ids)} 个知识块ID")
             return chunk_ids
@@ -200,6 +315,7 @@ class OSSStorageProvider(BaseStorageProvider):
             result = self.bucket.delete_object(object_key)
             
             if result.status == 204:
+                self._unindex_object(chunk_id)
                 print(f"✅ 成功删除: {chunk_id}")
                 return True
             else:
@@ -242,6 +358,7 @@ class OSSStorageProvider(BaseStorageProvider):
             )
             
             if result.status == 200:
+                self._index_object(chunk_id, chunk_data, result.etag)
                 print(f"✅ 成功更新: {chunk_id}")
                 return True
             else:
@@ -2,6 +2,7 @@ from llm_core.factory import LLMFactory
 from llm_core.base import LLMBase
 from llm_core.client import LLMClient
 from llm_core.cache import LLMCache, cache_llm_response
+from llm_core.cache_backends import CacheBackend, SQLiteCacheBackend, RedisCacheBackend, create_cache_backend
 from llm_core.exceptions import (
     LLMError, AuthenticationError, RateLimitError, 
     ModelNotFoundError, ServerError, InvalidRequestError,
@@ -16,6 +17,9 @@ __all__ = [
     # 核心类
     'LLMFactory', 'LLMBase', 'LLMClient', 'LLMCache',
     
+    # 缓存后端
+    'CacheBackend', 'SQLiteCacheBackend', 'RedisCacheBackend', 'create_cache_backend',
+    
     # 装饰器
     'cache_llm_response', 'retry_with_exponential_backoff', 'async_retry_with_exponential_backoff',
     
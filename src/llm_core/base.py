@@ -1,3 +1,5 @@
+import asyncio
+import threading
 from abc import ABC, abstractmethod
 from typing import Optional, Type, Dict, List, Any, Union, ClassVar, AsyncGenerator, Generator
 
@@ -128,6 +130,62 @@ class LLMBase(ABC):
         """
         pass
     
+    async def astream_chat(self, messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
+        """异步流式生成对话响应
+        
+        默认实现在后台线程中消费同步的 stream_chat，通过队列把片段交给事件循环；
+        有原生异步流式接口的提供商应覆盖此方法。消费方提前结束或被取消时，后台线程在
+        下一个片段处停止并关闭同步生成器。
+        
+        Args:
+            messages: 对话历史
+            **kwargs: 其他参数
+            
+        Returns:
+            异步生成器，产生对话响应片段
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stopped = threading.Event()
+        finished = object()
+
+        def deliver(item) -> bool:
+            # 事件循环可能已经关闭，此时没有人再消费，停止生产
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+                return True
+            except RuntimeError:
+                stopped.set()
+                return False
+
+        def produce():
+            stream = self.stream_chat(messages, **kwargs)
+            try:
+                for chunk in stream:
+                    if stopped.is_set() or not deliver(chunk):
+                        break
+            except Exception as e:
+                deliver(e)
+            finally:
+                # 关闭同步生成器，让提供商释放底层的HTTP连接
+                close = getattr(stream, 'close', None)
+                if close is not None:
+                    close()
+                if not stopped.is_set():
+                    deliver(finished)
+
+        loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+    
     @classmethod
     def register(cls, provider_name: str):
         """注册LLM提供商的装饰器
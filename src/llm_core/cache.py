@@ -1,23 +1,197 @@
+import asyncio
 import hashlib
 import json
+import logging
+import sys
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import Future
 from typing import Dict, Any, Optional, Callable, Union, List
 from functools import wraps
 
+from llm_core.cache_backends import CacheBackend, CACHE_FORMAT_VERSION, create_cache_backend, encode_value, decode_value
+
+logger = logging.getLogger(__name__)
+
+
+class _CacheEntry:
+    """缓存条目"""
+    
+    __slots__ = ('value', 'expires_at', 'size', 'frequency', 'tick')
+    
+    def __init__(self, value: Any, expires_at: Optional[float], size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.frequency = 1
+        self.tick = -1
+
+
+class SingleFlight:
+    """合并相同键上并发执行的请求
+    
+    某个键的请求正在执行时，后到的调用者不再重复调用，而是等待这次执行并共享它的结果或异常。
+    同步和异步调用共用同一张表，结果通过 concurrent.futures.Future 传递：
+    线程中的 chat 可以等待事件循环中的 async_chat，反之亦然。
+    异步调用在独立的任务中执行，单个等待者（包括发起者）被取消不会取消共享的请求。
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 键 -> (共享结果, 执行该请求的事件循环；同步调用为None)
+        self._calls: Dict[str, tuple] = {}
+        self.coalesced = 0
+    
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """执行同步调用，相同键上已有调用在执行时等待其结果
+        
+        Args:
+            key: 请求的键
+            func: 无参数的调用
+            
+        Returns:
+            调用结果
+        """
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+        leader = False
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                future = Future()
+                self._calls[key] = (future, None)
+                leader = True
+            elif current_loop is not None and call[1] is current_loop:
+                # 正在执行的是本线程事件循环中的任务，在这里阻塞等待会死锁，只能单独调用
+                future = None
+            else:
+                future = call[0]
+                self.coalesced += 1
+        if future is None:
+            return func()
+        if not leader:
+            return future.result()
+        
+        try:
+            result = func()
+        except BaseException as e:
+            self._finish(key, future, exception=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+    
+    async def ado(self, key: str, func: Callable[[], Any]) -> Any:
+        """执行异步调用，相同键上已有调用在执行时等待其结果
+        
+        Args:
+            key: 请求的键
+            func: 无参数、返回协程的调用
+            
+        Returns:
+            调用结果
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                future = Future()
+                self._calls[key] = (future, loop)
+                task = loop.create_task(func())
+                task.add_done_callback(lambda done: self._finish_task(key, future, done))
+            else:
+                future = call[0]
+                self.coalesced += 1
+        return await asyncio.shield(asyncio.wrap_future(future))
+    
+    def __len__(self) -> int:
+        return len(self._calls)
+    
+    def _finish_task(self, key: str, future: Future, task: asyncio.Task) -> None:
+        if task.cancelled():
+            self._finish(key, future, exception=asyncio.CancelledError())
+        elif task.exception() is not None:
+            self._finish(key, future, exception=task.exception())
+        else:
+            self._finish(key, future, result=task.result())
+    
+    def _finish(self, key: str, future: Future, result: Any = None,
+                exception: Optional[BaseException] = None) -> None:
+        """先移除执行中的记录，再唤醒等待者（结果此时已写入缓存）"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and call[0] is future:
+                del self._calls[key]
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
 
 class LLMCache:
-    """LLM响应缓存"""
+    """LLM响应缓存
+    
+    - 淘汰策略：'lru'（最近最少使用）或 'lfu'（最不经常使用），get/set 均为 O(1)
+    - 过期：时间轮按 wheel_resolution 秒一格推进，到期条目在后续操作中主动清理，
+      不必等到再次读取同一个键
+    - 容量：同时限制条目数 max_size 和估算的字节数 max_bytes
+    - 统计：命中、未命中、淘汰、过期次数，见 stats()
+    - 二级缓存：可选的 backend（SQLite文件、Redis等）在多个进程之间共享，
+      本地未命中时查询，写入时同时写入；后端键带有格式版本、提供商和模型。
+      异步代码使用 aget/aset，后端访问在工作线程中执行
+    - 请求合并：single_flight 开启时，缓存未命中的相同请求在执行期间只调用一次LLM，
+      其余并发调用者共享结果（见 SingleFlight 和 cache_llm_response）
+    """
     
-    def __init__(self, max_size: int = 1000, ttl: int = 3600):
+    POLICIES = ('lru', 'lfu')
+    
+    def __init__(self, max_size: int = 1000, ttl: Optional[float] = 3600, max_bytes: Optional[int] = None,
+                 policy: str = 'lru', wheel_resolution: float = 1.0, wheel_slots: int = 512,
+                 backend: Union[CacheBackend, Dict[str, Any], None] = None, compress_threshold: int = 512,
+                 single_flight: bool = True):
         """初始化缓存
         
         Args:
             max_size: 最大缓存条目数
-            ttl: 缓存生存时间（秒）
+            ttl: 缓存生存时间（秒），None表示不过期
+            max_bytes: 缓存值的估算总字节数上限，None表示不限制
+            policy: 淘汰策略，'lru' 或 'lfu'
+            wheel_resolution: 时间轮每一格的时长（秒）
+            wheel_slots: 时间轮的格数
+            backend: 共享的二级缓存后端，或传给 create_cache_backend 的配置字典
+            compress_threshold: 写入后端的值超过该字节数时压缩
+            single_flight: 是否合并缓存未命中的相同并发请求
         """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unsupported cache policy: {policy}")
         self.max_size = max_size
         self.ttl = ttl
-        self.cache: Dict[str, Dict[str, Any]] = {}
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.backend = create_cache_backend(backend) if isinstance(backend, dict) else backend
+        self.compress_threshold = compress_threshold
+        self.in_flight = SingleFlight() if single_flight else None
+        self.cache: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self.total_bytes = 0
+        self._lock = threading.RLock()
+        
+        # LFU：访问次数 -> 该次数下按访问先后排列的键
+        self._frequencies: Dict[int, OrderedDict] = {}
+        self._min_frequency = 0
+        
+        # 时间轮：第 tick 格到期的键保存在 _wheel[tick % wheel_slots]
+        self._wheel_resolution = wheel_resolution
+        self._wheel: List[set] = [set() for _ in range(wheel_slots)]
+        self._wheel_tick = self._tick_of(time.time())
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.backend_hits = 0
+        self.backend_errors = 0
     
     def _get_cache_key(self, provider: str, model: str, args: Any) -> str:
         """生成缓存键
@@ -51,16 +225,53 @@ class LLMCache:
             缓存值，如果不存在或已过期则返回None
         """
         key = self._get_cache_key(provider, model, args)
-        if key in self.cache:
-            # 检查是否过期
-            cache_entry = self.cache[key]
-            if time.time() - cache_entry["timestamp"] <= self.ttl:
-                return cache_entry["value"]
-            # 过期则删除
-            del self.cache[key]
+        value = self._get_local(key)
+        if value is not None:
+            return value
+        return self._record_backend_lookup(key, self._backend_get(provider, model, key))
+    
+    async def aget(self, provider: str, model: str, args: Any) -> Optional[Any]:
+        """异步获取缓存值，后端查询在工作线程中执行，不阻塞事件循环
+        
+        参数和返回值与 get 相同。
+        """
+        key = self._get_cache_key(provider, model, args)
+        value = self._get_local(key)
+        if value is not None:
+            return value
+        if self.backend is not None:
+            value = await asyncio.to_thread(self._backend_get, provider, model, key)
+        return self._record_backend_lookup(key, value)
+    
+    def _get_local(self, key: str) -> Optional[Any]:
+        """查询本地缓存，命中时返回缓存值"""
+        now = time.time()
+        with self._lock:
+            self._advance_wheel(now)
+            entry = self.cache.get(key)
+            if entry is not None and entry.expires_at is not None and entry.expires_at <= now:
+                # 当前时间格内已过期、尚未被时间轮清理的条目
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._touch(key, entry)
+                self.hits += 1
+                return entry.value
         return None
     
-    def set(self, provider: str, model: str, args: Any, value: Any) -> None:
+    def _record_backend_lookup(self, key: str, value: Optional[Any]) -> Optional[Any]:
+        """记录后端查询结果，命中时回填本地缓存"""
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.backend_hits += 1
+        self._set_local(key, value, self.ttl)
+        return value
+    
+    def set(self, provider: str, model: str, args: Any, value: Any, ttl: Optional[float] = None) -> None:
         """设置缓存值
         
         Args:
@@ -68,60 +279,320 @@ class LLMCache:
             model: 模型名称
             args: 缓存参数
             value: 要缓存的值
+            ttl: 该条目的生存时间（秒），默认使用缓存的ttl
         """
-        # 如果缓存已满，删除最早的条目
-        if len(self.cache) >= self.max_size:
-            oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k]["timestamp"])
-            del self.cache[oldest_key]
+        key = self._get_cache_key(provider, model, args)
+        ttl = self.ttl if ttl is None else ttl
+        self._set_local(key, value, ttl)
+        self._backend_set(provider, model, key, value, ttl)
+    
+    async def aset(self, provider: str, model: str, args: Any, value: Any, ttl: Optional[float] = None) -> None:
+        """异步设置缓存值，后端写入在工作线程中执行，不阻塞事件循环
         
+        参数与 set 相同。
+        """
         key = self._get_cache_key(provider, model, args)
-        self.cache[key] = {
-            "value": value,
-            "timestamp": time.time()
-        }
+        ttl = self.ttl if ttl is None else ttl
+        self._set_local(key, value, ttl)
+        if self.backend is not None:
+            await asyncio.to_thread(self._backend_set, provider, model, key, value, ttl)
+    
+    def _set_local(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        """写入本地缓存"""
+        size = self._estimate_size(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            # 单个值就超过字节预算，不缓存
+            return
+        
+        now = time.time()
+        entry = _CacheEntry(value, now + ttl if ttl is not None else None, size)
+        with self._lock:
+            self._advance_wheel(now)
+            if key in self.cache:
+                self._remove(key)
+            self.cache[key] = entry
+            self.total_bytes += size
+            if self.policy == 'lfu':
+                self._frequencies.setdefault(1, OrderedDict())[key] = None
+                self._min_frequency = 1
+            self._schedule(key, entry)
+            
+            # 如果缓存已满，按淘汰策略删除条目
+            while len(self.cache) > self.max_size or (self.max_bytes is not None and self.total_bytes > self.max_bytes):
+                self._remove(self._victim())
+                self.evictions += 1
     
     def clear(self) -> None:
-        """清空缓存"""
-        self.cache.clear()
+        """清空缓存（包括共享的后端）"""
+        if self.backend is not None:
+            try:
+                self.backend.clear()
+            except Exception as e:
+                logger.warning("Failed to clear cache backend: %s", e)
+        with self._lock:
+            self.cache.clear()
+            self._frequencies.clear()
+            self._min_frequency = 0
+            for bucket in self._wheel:
+                bucket.clear()
+            self.total_bytes = 0
+    
+    def expire(self) -> int:
+        """立即清理所有已过期的条目
+        
+        Returns:
+            清理的条目数
+        """
+        now = time.time()
+        with self._lock:
+            before = self.expirations
+            self._advance_wheel(now)
+            expired = [key for key, entry in self.cache.items()
+                       if entry.expires_at is not None and entry.expires_at <= now]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+            return self.expirations - before
+    
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息
+        
+        Returns:
+            包含条目数、字节数、命中率、淘汰和过期次数的字典
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "policy": self.policy,
+                "size": len(self.cache),
+                "max_size": self.max_size,
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "backend": type(self.backend).__name__ if self.backend is not None else None,
+                "backend_hits": self.backend_hits,
+                "backend_errors": self.backend_errors,
+                "coalesced": self.in_flight.coalesced if self.in_flight is not None else 0
+            }
+    
+    def close(self) -> None:
+        """关闭后端连接"""
+        if self.backend is not None:
+            self.backend.close()
+    
+    def __len__(self) -> int:
+        return len(self.cache)
+    
+    @staticmethod
+    def _backend_key(provider: str, model: str, key: str) -> str:
+        """后端键：格式版本、提供商和模型变化时自然失效"""
+        return f"v{CACHE_FORMAT_VERSION}:{provider}:{model}:{key}"
+    
+    def _backend_get(self, provider: str, model: str, key: str) -> Optional[Any]:
+        if self.backend is None:
+            return None
+        try:
+            data = self.backend.get(self._backend_key(provider, model, key))
+            return decode_value(data) if data is not None else None
+        except Exception as e:
+            # 后端不可用时只降级为本地缓存，不影响请求
+            self.backend_errors += 1
+            logger.warning("Cache backend read failed: %s", e)
+            return None
+    
+    def _backend_set(self, provider: str, model: str, key: str, value: Any, ttl: Optional[float]) -> None:
+        if self.backend is None:
+            return
+        try:
+            data = encode_value(value, self.compress_threshold)
+            self.backend.set(self._backend_key(provider, model, key), data, ttl)
+        except Exception as e:
+            self.backend_errors += 1
+            logger.warning("Cache backend write failed: %s", e)
+    
+    def _touch(self, key: str, entry: _CacheEntry) -> None:
+        """记录一次命中"""
+        if self.policy == 'lru':
+            self.cache.move_to_end(key)
+            return
+        frequency = entry.frequency
+        bucket = self._frequencies[frequency]
+        del bucket[key]
+        if not bucket:
+            del self._frequencies[frequency]
+            if self._min_frequency == frequency:
+                self._min_frequency = frequency + 1
+        entry.frequency = frequency + 1
+        self._frequencies.setdefault(frequency + 1, OrderedDict())[key] = None
+    
+    def _victim(self) -> str:
+        """按淘汰策略选出要删除的键"""
+        if self.policy == 'lru':
+            return next(iter(self.cache))
+        if self._min_frequency not in self._frequencies:
+            # 过期或覆盖删除了最低频次的全部条目，重新定位最低频次
+            self._min_frequency = min(self._frequencies)
+        return next(iter(self._frequencies[self._min_frequency]))
+    
+    def _remove(self, key: str) -> None:
+        entry = self.cache.pop(key)
+        self.total_bytes -= entry.size
+        if entry.tick >= 0:
+            self._wheel[entry.tick % len(self._wheel)].discard(key)
+        if self.policy == 'lfu':
+            bucket = self._frequencies[entry.frequency]
+            del bucket[key]
+            if not bucket:
+                del self._frequencies[entry.frequency]
+    
+    def _tick_of(self, timestamp: float) -> int:
+        return int(timestamp / self._wheel_resolution)
+    
+    def _schedule(self, key: str, entry: _CacheEntry) -> None:
+        """把条目放入到期时间所在的时间格"""
+        if entry.expires_at is None:
+            return
+        entry.tick = max(self._tick_of(entry.expires_at), self._wheel_tick)
+        self._wheel[entry.tick % len(self._wheel)].add(key)
+    
+    def _advance_wheel(self, now: float) -> None:
+        """推进时间轮，清理已经完整经过的时间格中到期的条目"""
+        current = self._tick_of(now)
+        if current <= self._wheel_tick:
+            return
+        slots = len(self._wheel)
+        # 经过的格数超过一圈时，每一格只需扫描一次
+        for tick in range(self._wheel_tick, min(current, self._wheel_tick + slots)):
+            bucket = self._wheel[tick % slots]
+            # 同一格中可能有若干圈之后才到期的条目
+            expired = [key for key in bucket if self.cache[key].tick < current]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+        self._wheel_tick = current
+    
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        """估算缓存值占用的字节数"""
+        try:
+            return len(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+        except (TypeError, ValueError):
+            return sys.getsizeof(value)
+
 
+_default_cache: Optional[LLMCache] = None
 
-def cache_llm_response(cache: Optional[LLMCache] = None):
-    """缓存LLM响应的装饰器
+
+def get_default_cache() -> LLMCache:
+    """获取模块级的默认缓存（被装饰对象没有自己的缓存时使用）"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LLMCache()
+    return _default_cache
+
+
+def make_cache_args(namespace: str, args: Any, kwargs: Dict[str, Any]) -> Optional[Any]:
+    """构造缓存参数
     
     Args:
-        cache: LLMCache实例，如果为None则创建一个新实例
+        namespace: 命名空间，区分不同类型的请求
+        args: 位置参数
+        kwargs: 关键字参数
         
     Returns:
-        装饰器函数
+        可序列化的缓存参数；请求不应缓存时返回None
     """
-    if cache is None:
-        cache = LLMCache()
+    # 流式响应和不确定性较高的请求不应缓存
+    if kwargs.get("stream") or (kwargs.get("temperature") or 0) > 0.1:
+        return None
+    try:
+        cache_args = [namespace, args, json.dumps(kwargs, sort_keys=True)]
+        json.dumps(cache_args, sort_keys=True)
+    except (TypeError, ValueError):
+        # 参数无法序列化时不缓存
+        return None
+    return cache_args
+
+
+def cache_identity(obj: Any) -> tuple:
+    """获取对象的缓存标识 (提供商, 模型, 缓存实例)
+    
+    LLMClient 使用自身的 provider、底层模型名和 self.cache；
+    其他对象使用类名、model 属性和默认缓存。
+    """
+    provider = getattr(obj, "provider", None) or obj.__class__.__name__
+    llm = getattr(obj, "llm", None)
+    model = getattr(llm, "model", None) or getattr(obj, "model", None) or "default"
+    cache = getattr(obj, "cache", None)
+    if not isinstance(cache, LLMCache):
+        cache = get_default_cache()
+    return provider, model, cache
+
+
+def cache_llm_response(cache: Optional[LLMCache] = None, namespace: Optional[str] = None):
+    """缓存LLM响应的装饰器，支持同步和异步方法
+    
+    Args:
+        cache: 固定使用的LLMCache实例；为None时使用被装饰对象的 self.cache
+        namespace: 缓存命名空间，默认为函数名；命名空间相同的方法共享缓存结果
         
+    Returns:
+        装饰器函数
+    """
     def decorator(func: Callable):
+        space = namespace or func.__name__
+        
+        def lookup(self, args, kwargs):
+            provider, model, own_cache = cache_identity(self)
+            cache_args = make_cache_args(space, args, kwargs)
+            return cache or own_cache, provider, model, cache_args
+        
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                target, provider, model, cache_args = lookup(self, args, kwargs)
+                if cache_args is None:
+                    return await func(self, *args, **kwargs)
+                # 共享后端的网络/磁盘访问在工作线程中执行，不阻塞事件循环
+                cached = await target.aget(provider, model, cache_args)
+                if cached is not None:
+                    return cached
+                
+                async def call():
+                    result = await func(self, *args, **kwargs)
+                    await target.aset(provider, model, cache_args, result)
+                    return result
+                
+                if target.in_flight is None:
+                    return await call()
+                # 相同请求正在执行时等待它的结果，而不是再调用一次LLM
+                return await target.in_flight.ado(target._get_cache_key(provider, model, cache_args), call)
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(self, *args, **kwargs):
-            # 从kwargs中提取不应该影响缓存键的参数
-            cache_kwargs = kwargs.copy()
-            
-            # 流式响应和不确定性较高的请求不应缓存
-            if cache_kwargs.get("stream") or cache_kwargs.get("temperature", 0) > 0.1:
+            target, provider, model, cache_args = lookup(self, args, kwargs)
+            if cache_args is None:
                 return func(self, *args, **kwargs)
             
-            # 获取提供商和模型信息
-            provider = self.__class__.__name__
-            model = getattr(self, "model", "default")
-            
             # 尝试从缓存获取
-            cache_key = (args, json.dumps(cache_kwargs, sort_keys=True))
-            cached = cache.get(provider, model, cache_key)
+            cached = target.get(provider, model, cache_args)
             if cached is not None:
                 return cached
             
-            # 调用原始函数
-            result = func(self, *args, **kwargs)
+            def call():
+                # 调用原始函数并缓存结果
+                result = func(self, *args, **kwargs)
+                target.set(provider, model, cache_args, result)
+                return result
             
-            # 缓存结果
-            cache.set(provider, model, cache_key, result)
-            return result
+            if target.in_flight is None:
+                return call()
+            # 相同请求正在执行时等待它的结果，而不是再调用一次LLM
+            return target.in_flight.do(target._get_cache_key(provider, model, cache_args), call)
         return wrapper
-    return decorator 
+    return decorator
@@ -0,0 +1,333 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Union
+
+# 缓存数据格式的版本，序列化方式变化时递增，旧条目自然失效
+CACHE_FORMAT_VERSION = 1
+
+# 值的第一个字节标记编码方式
+_RAW = b'j'
+_COMPRESSED = b'z'
+
+
+def encode_value(value: Any, compress_threshold: int = 512) -> bytes:
+    """把缓存值序列化为字节，超过阈值时用zlib压缩
+
+    Args:
+        value: 可JSON序列化的缓存值
+        compress_threshold: 序列化后超过该字节数才压缩
+
+    Returns:
+        编码后的字节
+    """
+    data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+    if len(data) > compress_threshold:
+        return _COMPRESSED + zlib.compress(data)
+    return _RAW + data
+
+
+def decode_value(data: bytes) -> Any:
+    """解码 encode_value 生成的字节"""
+    marker, payload = data[:1], data[1:]
+    if marker == _COMPRESSED:
+        payload = zlib.decompress(payload)
+    elif marker != _RAW:
+        raise ValueError(f"Unknown cache value encoding: {marker!r}")
+    return json.loads(payload.decode('utf-8'))
+
+
+class CacheBackend(ABC):
+    """跨进程共享的缓存存储后端，LLMCache 在本地内存未命中时查询它"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """获取缓存数据，不存在或已过期时返回None"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, data: bytes, ttl: Optional[float] = None) -> None:
+        """写入缓存数据
+
+        Args:
+            key: 缓存键
+            data: 编码后的值
+            ttl: 生存时间（秒），None表示不过期
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """删除缓存数据"""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """清空该后端中的全部缓存"""
+        pass
+
+    def close(self) -> None:
+        """释放连接"""
+        pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """基于SQLite文件的缓存后端
+
+    使用WAL模式，同一台机器上的多个进程可以同时读写；进程重启后缓存仍然有效。
+    """
+
+    # 每写入多少次清理一次过期条目
+    PURGE_INTERVAL = 256
+
+    def __init__(self, path: str, max_entries: Optional[int] = None):
+        """初始化后端
+
+        Args:
+            path: SQLite数据库文件路径，目录不存在时自动创建
+            max_entries: 最大条目数，超出时删除最早写入的条目；None表示不限制
+        """
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS llm_cache_created_at ON llm_cache (created_at);
+        """)
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key: str, data: bytes, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                (key, sqlite3.Binary(data), now + ttl if ttl is not None else None, now)
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_INTERVAL == 0:
+                self._purge(now)
+            self._db.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM llm_cache")
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _purge(self, now: float) -> None:
+        """删除过期条目，并把条目数限制在 max_entries 以内"""
+        self._db.execute("DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        if self.max_entries is not None:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+
+class RedisError(Exception):
+    """Redis服务器返回的错误"""
+    pass
+
+
+class RedisCacheBackend(CacheBackend):
+    """使用Redis协议（RESP）的缓存后端
+
+    内置一个只支持所需命令的最小客户端，不依赖第三方redis库，
+    可连接Redis以及兼容RESP的服务（如KeyDB、Dragonfly）。
+    连接失败后在 retry_interval 秒内不再尝试连接，请求立即失败，
+    服务不可用时缓存读写不会每次都等待连接超时。
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, prefix: str = "llm_cache:", timeout: float = 5.0,
+                 retry_interval: float = 5.0):
+        """初始化后端
+
+        Args:
+            host: 服务器地址
+            port: 服务器端口
+            db: 数据库编号
+            password: 密码，None表示不认证
+            prefix: 所有键的前缀，clear() 只删除带该前缀的键
+            timeout: 连接和读写超时（秒）
+            retry_interval: 连接失败后暂停重连的时间（秒）
+        """
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._retry_at = 0.0
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._command("GET", self.prefix + key)
+
+    def set(self, key: str, data: bytes, ttl: Optional[float] = None) -> None:
+        if ttl is None:
+            self._command("SET", self.prefix + key, data)
+        else:
+            self._command("SET", self.prefix + key, data, "PX", max(1, int(ttl * 1000)))
+
+    def delete(self, key: str) -> None:
+        self._command("DEL", self.prefix + key)
+
+    def clear(self) -> None:
+        cursor = b"0"
+        while True:
+            cursor, keys = self._command("SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", 500)
+            if keys:
+                self._command("DEL", *keys)
+            if cursor == b"0":
+                break
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
+
+    def _command(self, *args: Union[str, bytes, int]) -> Any:
+        """发送一条命令并读取回复，连接断开时重连一次"""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.sendall(self._pack(args))
+                    return self._read_reply(self._reader)
+                except (ConnectionError, socket.timeout, OSError):
+                    self._disconnect()
+                    if attempt or self._retry_at > time.time():
+                        raise
+
+    def _connect(self) -> None:
+        """建立连接并完成认证和选库，成功后才替换当前连接"""
+        now = time.time()
+        if now < self._retry_at:
+            raise ConnectionError(f"Redis at {self.host}:{self.port} unavailable, retrying in {self._retry_at - now:.1f}s")
+        sock = reader = None
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            reader = sock.makefile("rb")
+            if self.password is not None:
+                sock.sendall(self._pack(("AUTH", self.password)))
+                self._read_reply(reader)
+            if self.db:
+                sock.sendall(self._pack(("SELECT", self.db)))
+                self._read_reply(reader)
+        except (RedisError, ConnectionError, socket.timeout, OSError):
+            # 握手失败（包括认证被拒绝）的连接不能留用
+            if sock is not None:
+                self._close_socket(sock, reader)
+            self._retry_at = time.time() + self.retry_interval
+            raise
+        self._sock, self._reader = sock, reader
+        self._retry_at = 0.0
+
+    def _disconnect(self) -> None:
+        if self._sock is not None:
+            self._close_socket(self._sock, self._reader)
+        self._sock = None
+        self._reader = None
+
+    @staticmethod
+    def _close_socket(sock: socket.socket, reader: Any) -> None:
+        try:
+            if reader is not None:
+                reader.close()
+            sock.close()
+        except OSError:
+            pass
+
+    @staticmethod
+    def _pack(args) -> bytes:
+        """把命令编码为RESP数组"""
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, int):
+                arg = str(arg)
+            if isinstance(arg, str):
+                arg = arg.encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    def _read_reply(self, reader: Any) -> Any:
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload
+        if kind == b"-":
+            raise RedisError(payload.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply(reader) for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+
+def create_cache_backend(config: Dict[str, Any]) -> CacheBackend:
+    """根据配置创建缓存后端
+
+    Args:
+        config: 包含 type（'sqlite' 或 'redis'）及对应构造参数的字典
+
+    Returns:
+        缓存后端实例
+    """
+    options = dict(config)
+    backend_type = options.pop("type", "sqlite")
+    backends = {
+        "sqlite": SQLiteCacheBackend,
+        "redis": RedisCacheBackend,
+    }
+    if backend_type not in backends:
+        raise ValueError(f"Unsupported cache backend: {backend_type}")
+    return backends[backend_type](**options)
@@ -1,28 +1,31 @@
-from typing import Dict, List, Any, Union, Optional, Generator
+from typing import Dict, List, Any, Union, Optional, Generator, AsyncGenerator
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
 from llm_core.factory import LLMFactory
 from llm_core.base import LLMBase
-from llm_core.cache import LLMCache, cache_llm_response
+from llm_core.cache import LLMCache, cache_llm_response, make_cache_args
 
 
 class LLMClient:
     """高级LLM客户端，提供缓存和批处理功能"""
     
-    def __init__(self, provider: str = "openai", model: Optional[str] = None, **kwargs):
+    def __init__(self, provider: str = "openai", model: Optional[str] = None,
+                 cache: Optional[LLMCache] = None, cache_config: Optional[Dict[str, Any]] = None, **kwargs):
         """初始化LLM客户端
         
         Args:
             provider: LLM提供商名称
             model: 模型名称
+            cache: 响应缓存，可在多个客户端之间共享；为None时为该客户端创建一个
+            cache_config: 新建缓存时传给LLMCache的参数，如 max_size、ttl、max_bytes、policy
             **kwargs: 其他参数传递给提供商
         """
         self.provider = provider
         self.llm = LLMFactory.create(provider, model, **kwargs)
-        self.cache = LLMCache()
+        self.cache = cache if cache is not None else LLMCache(**(cache_config or {}))
     
-    @cache_llm_response()
+    @cache_llm_response(namespace="chat")
     def chat(self, messages: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
         """生成对话响应（带缓存）
         
@@ -47,6 +50,19 @@ class LLMClient:
         """
         return self.llm.stream_chat(messages, **kwargs)
     
+    def astream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
+        """异步流式生成对话响应
+        
+        Args:
+            messages: 对话历史
+            **kwargs: 其他参数
+            
+        Returns:
+            异步生成器，产生对话响应片段
+        """
+        return self.llm.astream_chat(messages, **kwargs)
+    
+    @cache_llm_response(namespace="function_call")
     def function_call(self, messages: List[Dict[str, str]], functions: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
         """支持函数调用的对话生成
         
@@ -60,8 +76,9 @@ class LLMClient:
         """
         return self.llm.function_calling(messages, functions, **kwargs)
     
+    @cache_llm_response(namespace="chat")
     async def async_chat(self, messages: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
-        """异步生成对话响应
+        """异步生成对话响应（带缓存，与chat共享缓存结果）
         
         Args:
             messages: 对话历史
@@ -83,12 +100,13 @@ class LLMClient:
         Returns:
             生成的文本响应列表
         """
-        results = []
-        
-        with ThreadPoolExecutor(max_workers=batch_size) as executor:
-            futures = [executor.submit(self.llm.generate_text, prompt, **kwargs) for prompt in prompts]
-            for future in futures:
-                results.append(future.result())
+        results, missing = self._cached_items("generate_text", prompts, kwargs)
+        if missing:
+            with ThreadPoolExecutor(max_workers=batch_size) as executor:
+                futures = {index: executor.submit(self.llm.generate_text, prompts[index], **kwargs) for index in missing}
+                for index, future in futures.items():
+                    results[index] = future.result()
+            self._store_items("generate_text", prompts, results, missing, kwargs)
                 
         return results
     
@@ -108,7 +126,7 @@ class LLMClient:
         
         async def process_prompt(prompt):
             async with semaphore:
-                response = await self.llm.async_generate_chat([{"role": "user", "content": prompt}], **kwargs)
+                response = await self.async_chat([{"role": "user", "content": prompt}], **kwargs)
                 return response["content"]
         
         tasks = [process_prompt(prompt) for prompt in prompts]
@@ -126,7 +144,43 @@ class LLMClient:
         Returns:
             嵌入向量或嵌入向量列表
         """
-        return self.llm.generate_embeddings(texts, **kwargs)
+        if isinstance(texts, str):
+            return self.get_embeddings([texts], **kwargs)[0]
+        
+        # 只为未命中缓存的文本调用提供商，且合并为一次请求
+        embeddings, missing = self._cached_items("embeddings", texts, kwargs)
+        if missing:
+            computed = self.llm.generate_embeddings([texts[index] for index in missing], **kwargs)
+            for index, embedding in zip(missing, computed):
+                embeddings[index] = embedding
+            self._store_items("embeddings", texts, embeddings, missing, kwargs)
+        return embeddings
+    
+    def _cached_items(self, namespace: str, items: List[Any], kwargs: Dict[str, Any]) -> tuple:
+        """逐项查询缓存
+        
+        Returns:
+            (结果列表, 未命中的下标列表)，未命中的位置为None
+        """
+        results: List[Any] = [None] * len(items)
+        missing = []
+        model = getattr(self.llm, "model", None) or "default"
+        for index, item in enumerate(items):
+            cache_args = make_cache_args(namespace, [item], kwargs)
+            cached = self.cache.get(self.provider, model, cache_args) if cache_args is not None else None
+            if cached is None:
+                missing.append(index)
+            else:
+                results[index] = cached
+        return results, missing
+    
+    def _store_items(self, namespace: str, items: List[Any], results: List[Any], indices: List[int], kwargs: Dict[str, Any]) -> None:
+        """把逐项计算的结果写入缓存"""
+        model = getattr(self.llm, "model", None) or "default"
+        for index in indices:
+            cache_args = make_cache_args(namespace, [items[index]], kwargs)
+            if cache_args is not None and results[index] is not None:
+                self.cache.set(self.provider, model, cache_args, results[index])
     
     def get_token_count(self, text: str) -> int:
         """获取文本的token数量
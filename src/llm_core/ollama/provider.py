@@ -1,4 +1,4 @@
-from typing import Optional, Dict, List, Any, Union, Generator
+from typing import Optional, Dict, List, Any, Union, Generator, AsyncGenerator
 from llm_core.factory import LLMFactory
 from llm_core.base import LLMBase
 from langchain_ollama import ChatOllama
@@ -114,6 +114,20 @@ class OllamaLLM(LLMBase):
         for chunk in response:
             yield {"role": "assistant", "content": chunk.content}
     
+    async def astream_chat(self, messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
+        """异步流式生成对话响应
+        
+        Args:
+            messages: 对话历史
+            **kwargs: 其他参数
+            
+        Returns:
+            异步生成器，产生对话响应片段
+        """
+        # 使用ChatOllama的原生异步流式API
+        async for chunk in self._llm.astream(messages):
+            yield {"role": "assistant", "content": chunk.content}
+    
     def function_calling(self, messages: List[Dict[str, str]], functions: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
         """支持函数调用的对话生成
         
@@ -139,6 +153,6 @@ class OllamaLLM(LLMBase):
         Returns:
             包含对话响应的字典
         """
-        # 简单实现，使用ChatOllama的非异步API
-        response = self._llm.invoke(messages)
+        # 使用ChatOllama的原生异步API，不阻塞事件循环
+        response = await self._llm.ainvoke(messages)
         return {"role": "assistant", "content": response.content}
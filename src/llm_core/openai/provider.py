@@ -1,4 +1,4 @@
-from typing import Optional, Dict, List, Any, Union, Generator
+from typing import Optional, Dict, List, Any, Union, Generator, AsyncGenerator
 
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from openai import OpenAI, AsyncOpenAI
@@ -178,6 +178,40 @@ class OpenAILLM(LLMBase):
         except Exception as e:
             self._handle_openai_error(e)
     
+    async def astream_chat(self, messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
+        """异步流式生成对话响应
+        
+        Args:
+            messages: 对话历史
+            **kwargs: 其他参数
+            
+        Returns:
+            异步生成器，产生对话响应片段
+        """
+        try:
+            stream = await self._async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=kwargs.get("temperature", self.temperature),
+                max_tokens=kwargs.get("max_tokens"),
+                top_p=kwargs.get("top_p"),
+                presence_penalty=kwargs.get("presence_penalty"),
+                frequency_penalty=kwargs.get("frequency_penalty"),
+                stop=kwargs.get("stop"),
+                stream=True
+            )
+            
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield {
+                        "content": chunk.choices[0].delta.content,
+                        "role": "assistant",
+                        "model": self.model,
+                        "finish_reason": chunk.choices[0].finish_reason
+                    }
+        except Exception as e:
+            self._handle_openai_error(e)
+    
     @retry_with_exponential_backoff()
     def function_calling(self, messages: List[Dict[str, str]], functions: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
         """支持函数调用的对话生成
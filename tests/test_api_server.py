@@ -0,0 +1,115 @@
+import sys
+import os
+import asyncio
+import json
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import httpx
+import pytest
+from fastapi import HTTPException
+from agents.knowledge_base import api_server
+from agents.knowledge_base.orchestrator_agent import OrchestratorAgent
+
+
+class SlowRAGAgent:
+    async def agenerate(self, query, context):
+        await asyncio.sleep(0.3)
+        return f"answer to {query}"
+
+
+def test_query_endpoint_serves_requests_concurrently():
+    orchestrator = OrchestratorAgent(llm_config={"provider": "ollama", "use_semantic_search": False})
+    orchestrator.register_agent("RAGAgent", SlowRAGAgent())
+    api_server.orchestrator = orchestrator
+
+    async def run():
+        transport = httpx.ASGITransport(app=api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            added = await client.post("/api/v1/knowledge", json={
+                "sources": [{"type": "text", "location": "Python is a programming language"}]
+            })
+            started = time.perf_counter()
+            responses = await asyncio.gather(*[
+                client.post("/api/v1/chat/query", json={"query": f"Python programming language {i}"})
+                for i in range(5)
+            ])
+            return added, responses, time.perf_counter() - started
+
+    try:
+        added, responses, elapsed = asyncio.run(run())
+    finally:
+        api_server.orchestrator = None
+        orchestrator.shutdown()
+    assert added.status_code == 200 and added.json()["chunks_count"] == 1
+    assert [r.json()["answer"] for r in responses] == [f"answer to Python programming language {i}" for i in range(5)]
+    assert elapsed < 1.2
+
+
+def test_pipeline_cancelled_when_client_disconnects(monkeypatch):
+    monkeypatch.setattr(api_server, "DISCONNECT_POLL_INTERVAL", 0.01)
+
+    class DisconnectedRequest:
+        class url:
+            path = "/api/v1/chat/query"
+
+        async def is_disconnected(self):
+            return True
+
+    cancelled = asyncio.Event()
+
+    async def pipeline():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def run():
+        with pytest.raises(HTTPException) as exc_info:
+            await api_server.run_until_disconnected(DisconnectedRequest(), pipeline())
+        await asyncio.wait_for(cancelled.wait(), 1)
+        return exc_info.value.status_code
+
+    assert asyncio.run(run()) == 499
+
+
+class StreamingRAGAgent:
+    async def astream(self, query, context):
+        for fragment in ["Python ", "is ", "a language."]:
+            await asyncio.sleep(0)
+            yield fragment
+
+
+def _parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_query_endpoint_emits_sources_then_tokens():
+    orchestrator = OrchestratorAgent(llm_config={"provider": "ollama", "use_semantic_search": False})
+    orchestrator.register_agent("RAGAgent", StreamingRAGAgent())
+    api_server.orchestrator = orchestrator
+
+    async def run():
+        transport = httpx.ASGITransport(app=api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/api/v1/knowledge", json={
+                "sources": [{"type": "text", "location": "Python is a programming language"}]
+            })
+            return await client.post("/api/v1/chat/query/stream",
+                                     json={"query": "Python programming language", "session_id": "s1"})
+
+    try:
+        response = asyncio.run(run())
+    finally:
+        api_server.orchestrator = None
+        orchestrator.shutdown()
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+    assert events[0][0] == "sources" and events[0][1]["sources_count"] == 1
+    assert [data["content"] for name, data in events if name == "token"] == ["Python ", "is ", "a language."]
+    assert events[-1] == ("done", {"answer": "Python is a language.", "session_id": "s1"})
+
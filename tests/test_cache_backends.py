@@ -0,0 +1,196 @@
+import sys
+import os
+import socketserver
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from llm_core.cache import LLMCache
+from llm_core import cache_backends
+from llm_core.cache_backends import (
+    SQLiteCacheBackend, RedisCacheBackend, RedisError, encode_value, decode_value
+)
+
+
+class RESPHandler(socketserver.StreamRequestHandler):
+    """只实现 GET/SET/DEL/SCAN/SELECT 的RESP服务，用来代替Redis"""
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            command = args[0].upper()
+            if command == b"GET":
+                value = store.get(args[1])
+                self.wfile.write(b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value))
+            elif command in (b"SET", b"SELECT"):
+                if command == b"SET":
+                    store[args[1]] = args[2]
+                self.wfile.write(b"+OK\r\n")
+            elif command == b"DEL":
+                removed = sum(store.pop(key, None) is not None for key in args[1:])
+                self.wfile.write(b":%d\r\n" % removed)
+            elif command == b"SCAN":
+                prefix = args[3].rstrip(b"*")
+                keys = [key for key in store if key.startswith(prefix)]
+                self.wfile.write(b"*2\r\n$1\r\n0\r\n*%d\r\n" % len(keys))
+                for key in keys:
+                    self.wfile.write(b"$%d\r\n%s\r\n" % (len(key), key))
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture
+def resp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), RESPHandler)
+    server.daemon_threads = True
+    server.store = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_value_encoding_compresses_large_values():
+    small = {"content": "hi"}
+    large = {"content": "答案" * 1000}
+    assert encode_value(small).startswith(b"j") and decode_value(encode_value(small)) == small
+    encoded = encode_value(large)
+    assert encoded.startswith(b"z") and len(encoded) < 200
+    assert decode_value(encoded) == large
+
+
+def test_sqlite_backend_shared_across_caches(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    first = LLMCache(backend={"type": "sqlite", "path": path})
+    first.set("openai", "gpt-4", ["chat", "q"], {"content": "a"})
+
+    # 另一个进程 / 重启后的进程：本地缓存为空，从文件中读取
+    second = LLMCache(backend=SQLiteCacheBackend(path))
+    assert second.get("openai", "gpt-4", ["chat", "q"]) == {"content": "a"}
+    assert second.get("openai", "gpt-4o", ["chat", "q"]) is None
+    assert second.stats()["backend_hits"] == 1 and len(second) == 1
+
+    second.clear()
+    assert LLMCache(backend=SQLiteCacheBackend(path)).get("openai", "gpt-4", ["chat", "q"]) is None
+    first.close()
+    second.close()
+
+
+def test_sqlite_backend_expiry(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "llm.sqlite"))
+    backend.set("gone", b"jx", ttl=-1)
+    backend.set("kept", b"jy")
+    assert backend.get("gone") is None and backend.get("kept") == b"jy"
+
+
+def test_redis_backend_against_resp_stand_in(resp_server):
+    port = resp_server.server_address[1]
+    first = LLMCache(backend={"type": "redis", "host": "127.0.0.1", "port": port, "db": 1})
+    first.set("ollama", "llama3", ["chat", "q"], {"content": "x" * 2000})
+    assert all(key.startswith(b"llm_cache:v1:ollama:llama3:") for key in resp_server.store)
+
+    second = LLMCache(backend=RedisCacheBackend("127.0.0.1", port))
+    assert second.get("ollama", "llama3", ["chat", "q"]) == {"content": "x" * 2000}
+    second.clear()
+    assert resp_server.store == {}
+    first.close()
+    second.close()
+
+
+def test_unavailable_backend_degrades_to_local_cache():
+    cache = LLMCache(backend=RedisCacheBackend("127.0.0.1", 1, timeout=0.2))
+    cache.set("p", "m", "k", "v")
+    assert cache.get("p", "m", "k") == "v"
+    assert cache.get("p", "m", "missing") is None
+    assert cache.stats()["backend_errors"] == 2
+
+
+def test_redis_backend_discards_connection_when_auth_fails(resp_server):
+    port = resp_server.server_address[1]
+    backend = RedisCacheBackend("127.0.0.1", port, password="secret", retry_interval=0)
+    # 替身服务不认识AUTH，返回错误：未认证的连接不能留下来继续使用
+    with pytest.raises(RedisError):
+        backend.get("k")
+    assert backend._sock is None
+    with pytest.raises(RedisError):
+        backend.set("k", b"jv")
+    assert resp_server.store == {}
+
+
+def test_redis_backend_backs_off_after_connect_failure(monkeypatch):
+    attempts = []
+
+    def refuse(address, timeout=None):
+        attempts.append(address)
+        raise ConnectionRefusedError("refused")
+
+    monkeypatch.setattr(cache_backends.socket, "create_connection", refuse)
+    backend = RedisCacheBackend("127.0.0.1", 6379, retry_interval=30)
+    cache = LLMCache(backend=backend)
+    for _ in range(5):
+        assert cache.get("p", "m", "k") is None
+    # 冷却期内只真正尝试连接一次，其余请求立即失败
+    assert len(attempts) == 1 and cache.stats()["backend_errors"] == 5
+    with pytest.raises(ConnectionError, match="retrying"):
+        backend.get("k")
+
+    backend._retry_at = 0.0
+    with pytest.raises(ConnectionRefusedError):
+        backend.get("k")
+    assert len(attempts) == 2
+
+
+def test_async_lookups_keep_the_backend_off_the_event_loop():
+    import asyncio
+    import time
+
+    class SlowBackend(cache_backends.CacheBackend):
+        def __init__(self):
+            self.store = {}
+            self.threads = set()
+
+        def get(self, key):
+            self.threads.add(threading.get_ident())
+            time.sleep(0.2)
+            return self.store.get(key)
+
+        def set(self, key, data, ttl=None):
+            self.threads.add(threading.get_ident())
+            time.sleep(0.2)
+            self.store[key] = data
+
+        def delete(self, key):
+            self.store.pop(key, None)
+
+        def clear(self):
+            self.store.clear()
+
+    backend = SlowBackend()
+    cache = LLMCache(backend=backend)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        assert await cache.aget("p", "m", "k") is None
+        await cache.aset("p", "m", "k", {"content": "v"})
+        task.cancel()
+        return ticks
+
+    # 后端每次访问耗时0.2秒，期间事件循环照常运行
+    assert asyncio.run(main()) > 10
+    assert threading.get_ident() not in backend.threads
+    assert LLMCache(backend=backend).get("p", "m", "k") == {"content": "v"}
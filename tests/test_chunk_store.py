@@ -0,0 +1,57 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from agents.knowledge_base.knowledge_processing_agent import ProcessedKnowledgeChunk
+from agents.knowledge_base.storage_providers.base import RetrievedChunk
+from agents.knowledge_base.improved_rag.chunk_store import ColumnarChunkStore
+
+
+def _chunk(chunk_id, text, vector, **metadata):
+    return ProcessedKnowledgeChunk(
+        id=chunk_id, original_id="doc-1", text_content=text, vector=vector,
+        category="science", entities=["太阳"], relationships=[{"type": "is"}], metadata=metadata
+    )
+
+
+def test_chunk_classes_use_slots():
+    chunk = _chunk("a", "text", [0.5])
+    assert not hasattr(chunk, "__dict__")
+    assert not hasattr(RetrievedChunk("a", "text", 0.5, {}), "__dict__")
+    assert chunk.to_dict()["metadata"] == {}
+
+
+def test_columnar_store_round_trips_chunks():
+    store = ColumnarChunkStore()
+    store["a"] = _chunk("a", "太阳是恒星。", [0.5, 0.25], source_id="doc-1", chunk_index=0, stage=False)
+    store["b"] = _chunk("b", "Water is H2O.", [0.1] * 3, source_id="doc-1", chunk_index=1)
+    store["c"] = _chunk("c", "No vector", [])
+
+    view = store["a"]
+    assert view.id == "a" and view.text_content == "太阳是恒星。"
+    assert view.vector == [0.5, 0.25]
+    assert view.original_id == "doc-1" and view.category == "science"
+    assert view.entities == ["太阳"] and view.relationships == [{"type": "is"}]
+    assert view.metadata == {"source_id": "doc-1", "chunk_index": 0, "stage": False}
+    assert store["b"].vector == pytest.approx([0.1] * 3)
+    assert store["c"].vector == []
+    assert list(store) == ["a", "b", "c"] and "b" in store and len(store) == 3
+
+
+def test_columnar_store_overwrite_delete_and_compaction():
+    store = ColumnarChunkStore()
+    for i in range(10):
+        store[f"c{i}"] = _chunk(f"c{i}", f"chunk {i}", [float(i)], chunk_index=i)
+    store["c3"] = _chunk("c3", "rewritten", [3.5])
+    assert store["c3"].text_content == "rewritten" and store["c3"].vector == [3.5]
+
+    popped = store.pop("c4")
+    assert isinstance(popped, ProcessedKnowledgeChunk) and popped.metadata == {"chunk_index": 4}
+    assert store.pop("c4", None) is None
+    view = store["c9"]
+    for i in range(6):
+        store.pop(f"c{i}", None)
+    # 压缩后槽位重排，已有视图仍按id解析
+    assert len(store._text_offsets) < 11
+    assert view.text_content == "chunk 9" and view.metadata == {"chunk_index": 9}
+    assert sorted(store) == ["c6", "c7", "c8", "c9"]
@@ -0,0 +1,78 @@
+import sys
+import os
+import asyncio
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from aiohttp import web
+from agents.knowledge_base.data_collection_agent import DataCollectionAgent
+from agents.knowledge_base.orchestrator_agent import OrchestratorAgent
+
+
+async def _serve(delay):
+    state = {"active": 0, "peak": 0}
+
+    async def handler(request):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(delay)
+        state["active"] -= 1
+        if request.match_info["name"] == "missing":
+            raise web.HTTPNotFound()
+        return web.Response(text=f"page {request.match_info['name']}")
+
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", state
+
+
+def test_acollect_all_fetches_concurrently_with_host_limit(tmp_path):
+    file_path = tmp_path / "notes.txt"
+    file_path.write_text("local notes", encoding="utf-8")
+
+    async def run():
+        runner, base_url, state = await _serve(0.2)
+        try:
+            agent = DataCollectionAgent()
+            sources = [{"type": "http", "url": f"{base_url}/{i}"} for i in range(10)]
+            sources += [{"type": "http", "url": f"{base_url}/missing"}, {"type": "file", "path": str(file_path)}]
+            started = time.perf_counter()
+            results = dict([item async for item in agent.acollect_all(sources, max_concurrency=10, max_per_host=5)])
+            elapsed = time.perf_counter() - started
+            agent.close()
+            return results, elapsed, state["peak"]
+        finally:
+            await runner.cleanup()
+
+    results, elapsed, peak = asyncio.run(run())
+    assert [results[i][0].content for i in range(10)] == [f"page {i}" for i in range(10)]
+    assert isinstance(results[10], Exception)
+    assert results[11][0].content == "local notes"
+    # 11 requests of 0.2s with 5 connections per host: 3 rounds instead of 11
+    assert peak == 5 and elapsed < 1.5
+
+
+def test_add_knowledge_collects_sources_concurrently():
+    async def run():
+        runner, base_url, state = await _serve(0.1)
+        try:
+            orchestrator = OrchestratorAgent(llm_config={"provider": "ollama", "use_semantic_search": False})
+            result = await orchestrator.receive_request("test", "add_knowledge", {
+                "sources": [{"type": "http", "url": f"{base_url}/{i}"} for i in range(6)],
+                "processing_options": {"max_connections_per_host": 3}
+            })
+            failed = await orchestrator.receive_request("test", "add_knowledge", {
+                "sources": [{"type": "http", "url": f"{base_url}/missing"}]
+            })
+            return result, failed, state["peak"]
+        finally:
+            await runner.cleanup()
+
+    result, failed, peak = asyncio.run(run())
+    assert result["status"] == "success" and result["chunks_count"] == 6
+    assert peak == 3
+    assert failed["status"] == "error" and failed["message"].startswith("Collection failed")
@@ -0,0 +1,93 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from agents.knowledge_base.knowledge_processing_agent import ProcessedKnowledgeChunk
+from agents.knowledge_base.improved_rag.enhanced_storage_provider import EnhancedMemoryStorageProvider
+from agents.knowledge_base.improved_rag.semantic_retriever import EmbeddingProvider
+
+
+class RecordingEmbeddings(EmbeddingProvider):
+    """记录每次 embed_batch 的输入和同时执行的批次数"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def embed_text(self, text):
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if any("fail" in text for text in texts):
+                raise RuntimeError("embedding service unavailable")
+            vectors = [[1.0, float(len(text))] for text in texts]
+            if any("short" in text for text in texts):
+                return vectors[:-1]
+            return vectors
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def count_tokens(self, text):
+        return len(text.split())
+
+
+def _chunk(chunk_id, text):
+    return ProcessedKnowledgeChunk(id=chunk_id, original_id="doc", text_content=text, vector=[],
+                                   category="general", entities=[], relationships=[], metadata={})
+
+
+def _provider(embeddings, **config):
+    return EnhancedMemoryStorageProvider(config, embedding_provider=embeddings)
+
+
+def test_batches_split_on_size_and_token_budget():
+    provider = _provider(RecordingEmbeddings(), embedding_batch_size=3, embedding_batch_tokens=6)
+    chunks = [_chunk("a", "one"), _chunk("b", "two"), _chunk("c", "three"), _chunk("d", "four"),
+              _chunk("e", "five six seven eight"), _chunk("f", "nine ten"), _chunk("g", "eleven")]
+
+    batches = provider._make_embedding_batches(chunks)
+    # 第一批受条数限制（3条），第二批加入第三条会超过6个token
+    assert [[chunk.id for chunk in batch] for batch in batches] == [["a", "b", "c"], ["d", "e"], ["f", "g"]]
+
+    # 单个chunk超过token预算时单独成批，而不是被丢弃
+    oversized = provider._make_embedding_batches([_chunk("x", "a b c d e f g h"), _chunk("y", "z")])
+    assert [[chunk.id for chunk in batch] for batch in oversized] == [["x"], ["y"]]
+
+
+def test_concurrent_batches_are_bounded():
+    embeddings = RecordingEmbeddings(delay=0.05)
+    provider = _provider(embeddings, embedding_batch_size=1, embedding_concurrency=2)
+
+    assert asyncio.run(provider.store([_chunk(f"c{i}", f"text {i}") for i in range(8)]))
+    assert len(embeddings.batches) == 8
+    assert embeddings.max_in_flight == 2
+    assert len(provider.embeddings_db) == 8
+
+
+def test_failed_or_mismatched_batch_skips_only_its_chunks():
+    embeddings = RecordingEmbeddings()
+    provider = _provider(embeddings, embedding_batch_size=2)
+    chunks = [_chunk("a", "alpha"), _chunk("b", "beta"),
+              _chunk("c", "fail here"), _chunk("d", "delta"),
+              _chunk("e", "short batch"), _chunk("f", "zeta"),
+              _chunk("g", "gamma")]
+
+    assert asyncio.run(provider.store(chunks))
+    # 失败的批次和向量数量不符的批次被整体丢弃，不会把向量错配给其他chunk
+    assert set(provider.embeddings_db) == {"a", "b", "g"}
+    assert provider.embeddings_db["g"] == [1.0, float(len("gamma"))]
+    assert len(provider.vector_index) == 3
+    # 没有向量的chunk仍然存储，并可通过关键词检索
+    assert sorted(provider.get_all_chunk_ids()) == ["a", "b", "c", "d", "e", "f", "g"]
@@ -0,0 +1,53 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from agents.knowledge_base.improved_rag.embedding_cache import EmbeddingCache
+
+
+def test_embedding_cache_roundtrip_and_persistence(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    assert cache.get("model-a", "太阳 温度") is None
+    cache.put_many("model-a", ["太阳 温度", "水"], [[0.5, 0.25, 1.0], [1.0, 0.0, 0.0]])
+
+    # 规范化后相同的文本命中同一条目，不同模型互不干扰
+    assert cache.get("model-a", "  太阳   温度 ") == pytest.approx([0.5, 0.25, 1.0])
+    assert cache.get("model-b", "水") is None
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 2
+    cache.close()
+
+    reopened = EmbeddingCache(str(tmp_path))
+    assert reopened.get_many("model-a", ["水", "火"]) == [pytest.approx([1.0, 0.0, 0.0]), None]
+    assert reopened.stats["entries"] == 2
+    reopened.close()
+
+
+def test_embedding_cache_lru_eviction_reuses_slots(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=2)
+    cache.put("m", "a", [1.0, 0.0])
+    cache.put("m", "b", [0.0, 1.0])
+    cache.get("m", "a")          # a 成为最近使用
+    cache.put("m", "c", [1.0, 1.0])
+
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") == pytest.approx([1.0, 0.0])
+    assert cache.get("m", "c") == pytest.approx([1.0, 1.0])
+    assert cache.stats["evictions"] == 1
+    assert cache.stats["entries"] == 2
+    cache.close()
+
+
+def test_embedding_cache_batches_access_times_until_close(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=2)
+    cache.put_many("m", ["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    cache.get("m", "a")
+    assert cache._pending_access and cache.stats["entries"] == 2 and cache.stats["bytes"] == 16
+    cache.close()
+
+    # 关闭时写回的访问时间决定重启后的淘汰顺序
+    reopened = EmbeddingCache(str(tmp_path), max_entries=2)
+    assert reopened.stats["entries"] == 2
+    reopened.put("m", "c", [1.0, 1.0, 1.0])
+    assert reopened.get("m", "b") is None and reopened.get("m", "a") is not None
+    assert reopened.stats["entries"] == 2 and reopened.stats["bytes"] == 20
+    reopened.close()
@@ -0,0 +1,73 @@
+import sys
+import os
+import asyncio
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from agents.knowledge_base.knowledge_processing_agent import ProcessedKnowledgeChunk
+from agents.knowledge_base.improved_rag.fusion import fuse
+from agents.knowledge_base.improved_rag.enhanced_storage_provider import EnhancedMemoryStorageProvider
+from agents.knowledge_base.improved_rag.semantic_retriever import SemanticRetriever
+
+
+class Item:
+    def __init__(self, item_id):
+        self.id = item_id
+
+
+A, B, C, D = Item("a"), Item("b"), Item("c"), Item("d")
+SEMANTIC = [(0.92, A), (0.90, B), (0.40, C)]
+KEYWORD = [(12.0, C), (3.0, D)]
+
+
+def _ids(results):
+    return [item.id for _, item in results]
+
+
+def test_rrf_uses_ranks_and_is_normalized():
+    results = fuse([SEMANTIC, KEYWORD], method="rrf")
+    assert _ids(results) == ["c", "a", "b", "d"]
+    assert all(0 < score <= 1.0 for score, _ in results)
+    assert fuse([[(0.5, A)], [(0.1, A)]], method="rrf") == [(1.0, A)]
+
+
+def test_minmax_and_zscore_make_scales_comparable():
+    # 原始分数加权时BM25的大分数压倒一切
+    assert _ids(fuse([SEMANTIC, KEYWORD], method="weighted"))[:2] == ["c", "d"]
+
+    minmax = fuse([SEMANTIC, KEYWORD], weights=[0.7, 0.3], method="minmax")
+    assert _ids(minmax)[0] == "a" and minmax[0][0] == pytest.approx(0.7)
+
+    zscore = fuse([SEMANTIC, KEYWORD], method="zscore", top_k=2)
+    assert _ids(zscore) == ["a", "b"]
+
+
+def test_fuse_only_touches_candidate_union():
+    results = fuse([SEMANTIC, KEYWORD], method="minmax")
+    assert sorted(_ids(results)) == ["a", "b", "c", "d"]
+    assert fuse([[], []]) == []
+    with pytest.raises(ValueError):
+        fuse([SEMANTIC], method="borda")
+
+
+def test_enhanced_provider_hybrid_fusion_methods():
+    provider = EnhancedMemoryStorageProvider()
+    asyncio.run(provider.store([
+        ProcessedKnowledgeChunk(id=chunk_id, original_id=chunk_id, text_content=text, vector=[],
+                                category="general", entities=[], relationships=[], metadata={})
+        for chunk_id, text in [
+            ("docker", "Docker is a container platform."),
+            ("git", "Git is a version control system."),
+            ("python", "Python is a programming language."),
+        ]
+    ]))
+    for method in ("weighted", "rrf", "minmax", "zscore"):
+        results = provider.retrieve([], 2, {"query_text": "container platform", "fusion_method": method})
+        assert results[0].id == "docker"
+
+
+def test_fuse_ranked_normalizes_scales_by_default():
+    # 默认按路min-max归一化，BM25的原始分数不会压倒余弦相似度
+    results = SemanticRetriever.fuse_ranked(SEMANTIC, KEYWORD, top_k=2)
+    assert _ids(results) == ["a", "b"]
+    assert results == fuse([SEMANTIC, KEYWORD], weights=[0.7, 0.3], method="minmax", top_k=2)
+    assert _ids(SemanticRetriever.fuse_ranked(SEMANTIC, KEYWORD, fusion_method="weighted"))[0] == "c"
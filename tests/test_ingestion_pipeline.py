@@ -0,0 +1,63 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from agents.knowledge_base.orchestrator_agent import OrchestratorAgent
+from agents.knowledge_base.data_collection_agent import DataCollectionAgent
+
+
+class WaitingCollector:
+    """Collects the second source only after something from the first one is stored."""
+
+    def __init__(self, storage_agent):
+        self.storage_agent = storage_agent
+        self.stored_before_second_source = None
+
+    async def collect(self, source):
+        if source["location"] == "second":
+            for _ in range(200):
+                if self.storage_agent.get_all_chunk_ids():
+                    break
+                await asyncio.sleep(0.01)
+            self.stored_before_second_source = len(self.storage_agent.get_all_chunk_ids())
+        if source["location"] == "broken":
+            return {"status": "error", "message": "source unavailable"}
+        return DataCollectionAgent().collect(source)
+
+
+def _orchestrator():
+    orchestrator = OrchestratorAgent(llm_config={"provider": "ollama", "use_semantic_search": False})
+    collector = WaitingCollector(orchestrator.agents["KnowledgeStorageAgent"])
+    orchestrator.register_agent("DataCollectionAgent", collector)
+    return orchestrator, collector
+
+
+def _sources(*locations):
+    return [{"type": "text", "location": location} for location in locations]
+
+
+def test_add_knowledge_streams_chunks_to_storage():
+    orchestrator, collector = _orchestrator()
+    result = asyncio.run(orchestrator.receive_request("test", "add_knowledge", {
+        "sources": _sources("first", "second", "third"),
+        "processing_options": {"store_batch_size": 1, "queue_size": 1}
+    }))
+    assert result["status"] == "success"
+    assert result["chunks_count"] == 3 and result["sources_processed"] == 3
+    assert collector.stored_before_second_source >= 1
+
+
+def test_add_knowledge_pipeline_errors():
+    orchestrator, _ = _orchestrator()
+    result = asyncio.run(orchestrator.receive_request("test", "add_knowledge", {
+        "sources": _sources("first", "broken", "third"),
+        "processing_options": {"store_batch_size": 1}
+    }))
+    assert result == {"status": "error", "message": "source unavailable"}
+    assert "third" not in [
+        orchestrator.agents["KnowledgeStorageAgent"].provider.vector_db[chunk_id].text_content
+        for chunk_id in orchestrator.agents["KnowledgeStorageAgent"].get_all_chunk_ids()
+    ]
+
+    result = asyncio.run(orchestrator.receive_request("test", "add_knowledge", {"sources": []}))
+    assert result == {"status": "error", "message": "No documents collected"}
@@ -0,0 +1,113 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from agents.knowledge_base.improved_rag.bm25_index import BM25Index
+from agents.knowledge_base.improved_rag.tokenizer import CJKTokenizer
+from agents.knowledge_base.orchestrator_agent import OrchestratorAgent
+
+
+def _index():
+    index = BM25Index()
+    index.add("python", "Python is a high level programming language.")
+    index.add("docker", "Docker is a container platform for packaging applications.")
+    index.add("git", "Git is a distributed version control system for source code.")
+    return index
+
+
+def test_bm25_ranks_matching_documents_only():
+    results = _index().search("container platform")
+    assert [doc_id for _, doc_id in results] == ["docker"]
+    assert results[0][0] > 0
+
+
+def test_bm25_normalized_scores_and_candidates():
+    index = _index()
+    full = index.search("programming language", normalize=True)
+    partial = index.search("programming container", normalize=True)
+    assert 0 < partial[0][0] < full[0][0] <= 1.0
+    # 索引中没有的词不计入归一化
+    assert index.search("programming language rust", normalize=True) == full
+
+    assert index.search("python", candidate_ids=["docker", "git"]) == []
+    assert len(index.search("is a", top_k=2)) == 2
+
+
+def test_bm25_incremental_add_and_remove():
+    index = _index()
+    assert index.remove("docker")
+    assert not index.remove("docker")
+    assert "docker" not in index and len(index) == 2
+    assert "container" not in index.postings
+    assert index.search("container") == []
+
+    index.add("git", "Git tracks changes in containers.")
+    assert [doc_id for _, doc_id in index.search("containers")] == ["git"]
+    assert index.search("distributed") == []
+
+
+def test_bm25_splits_chinese_text():
+    index = BM25Index()
+    index.add("water", "水的化学分子式是H2O。")
+    index.add("sun", "太阳表面温度约5778K。")
+    assert index.search("水的分子式")[0][1] == "water"
+    assert index.search("h2o")[0][1] == "water"
+
+
+def test_cjk_tokenizer_ngrams_and_dictionary():
+    tokenizer = CJKTokenizer()
+    assert tokenizer.tokenize_query("水的分子式 H2O") == ["水的", "的分", "分子", "子式", "水的分", "的分子", "分子式", "h2o"]
+    assert tokenizer.tokenize_query("水") == ["水"]
+    # 文档额外输出单字，短查询才能命中
+    assert tokenizer("水的分子") == ["水", "的", "分", "子", "水的", "的分", "分子", "水的分", "的分子"]
+
+    with_dictionary = CJKTokenizer(dictionary=["勾股定理", "直角"])
+    tokens = with_dictionary("勾股定理适用于直角三角形")
+    assert "勾股定理" in tokens
+    assert tokens.count("直角") == 1
+
+
+def test_bm25_matches_chinese_ngrams():
+    index = BM25Index()
+    index.add("everest", "珠穆朗玛峰是世界最高峰，海拔8848.86米。")
+    index.add("pacific", "太平洋是世界上最大的海洋。")
+    index.add("amazon", "亚马逊河是世界上流量最大的河流。")
+    assert index.search("世界最高峰是哪座山？")[0][1] == "everest"
+    assert index.search("最大的海洋")[0][1] == "pacific"
+
+
+def test_bm25_single_character_and_question_queries():
+    index = BM25Index()
+    index.add("water", "水的化学分子式是H2O，由两个氢原子和一个氧原子组成。")
+    index.add("light", "光速在真空中约为每秒30万公里。")
+    index.add("sun", "太阳是太阳系的中心恒星，表面温度约5778K。")
+    assert [doc_id for _, doc_id in index.search("水", normalize=True)] == ["water"]
+    # 索引中没有的疑问词（“是多少”“是什么”）不会拉低归一化分数
+    light = index.search("光速是多少？", normalize=True)
+    assert light[0][1] == "light" and light[0][0] > 0.5
+    assert index.search("水的分子式是什么？", normalize=True)[0] > (0.5, "")
+
+
+class EchoRAGAgent:
+    def generate(self, query, context):
+        return f"根据资料：{context[0]}"
+
+
+def test_orchestrator_answers_chinese_queries_with_keyword_search():
+    orchestrator = OrchestratorAgent(llm_config={"provider": "ollama", "use_semantic_search": False})
+    orchestrator.register_agent("RAGAgent", EchoRAGAgent())
+    texts = ["太阳是太阳系的中心恒星，表面温度约5778K。",
+             "水的化学分子式是H2O，由两个氢原子和一个氧原子组成。",
+             "光速在真空中约为每秒30万公里。"]
+
+    async def main():
+        await orchestrator.receive_request("test", "add_knowledge", {
+            "sources": [{"type": "text", "location": text} for text in texts]
+        })
+        return [
+            (await orchestrator.receive_request("test", "query", {"query": query}))["answer"]
+            for query in ["太阳的表面温度是多少？", "水的分子式是什么？", "光速是多少？", "水"]
+        ]
+
+    answers = asyncio.run(main())
+    assert answers == [f"根据资料：{text}" for text in texts] + [f"根据资料：{texts[1]}"]
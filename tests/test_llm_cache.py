@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from llm_core import cache as cache_module
+from llm_core.cache import LLMCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module.time, "time", fake.time)
+    return fake
+
+
+def _set(cache, key, value="v", **kwargs):
+    cache.set("p", "m", key, value, **kwargs)
+
+
+def _get(cache, key):
+    return cache.get("p", "m", key)
+
+
+def test_lru_evicts_least_recently_used(clock):
+    cache = LLMCache(max_size=3)
+    for key in "abc":
+        _set(cache, key, key)
+    assert _get(cache, "a") == "a"
+    _set(cache, "d", "d")
+    assert _get(cache, "b") is None
+    assert [_get(cache, key) for key in "acd"] == ["a", "c", "d"]
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["hits"] == 4 and stats["misses"] == 1
+
+
+def test_lfu_evicts_least_frequently_used(clock):
+    cache = LLMCache(max_size=3, policy="lfu")
+    for key in "abc":
+        _set(cache, key, key)
+    for _ in range(3):
+        _get(cache, "a")
+    _get(cache, "b")
+    _set(cache, "d")
+    assert _get(cache, "c") is None and _get(cache, "a") == "a" and _get(cache, "b") == "b"
+    # 覆盖写入重置访问次数
+    _set(cache, "a", "a2")
+    _set(cache, "e")
+    assert _get(cache, "d") is None and _get(cache, "a") == "a2"
+
+
+def test_ttl_wheel_expires_entries_without_reads(clock):
+    cache = LLMCache(ttl=10, wheel_resolution=1.0, wheel_slots=8)
+    _set(cache, "short", ttl=2)
+    _set(cache, "long", ttl=30)
+    _set(cache, "default")
+    clock.now += 5
+    _set(cache, "other")
+    assert len(cache) == 3 and cache.stats()["expirations"] == 1
+    clock.now += 20
+    assert cache.expire() == 2
+    assert len(cache) == 1 and _get(cache, "long") == "v"
+    clock.now += 10
+    assert _get(cache, "long") is None
+
+
+def test_byte_budget(clock):
+    cache = LLMCache(max_size=100, max_bytes=30)
+    _set(cache, "a", "x" * 10)
+    _set(cache, "b", "y" * 10)
+    assert cache.total_bytes == 24
+    _set(cache, "c", "z" * 10)
+    assert _get(cache, "a") is None and cache.total_bytes <= 30
+    _set(cache, "huge", "w" * 100)
+    assert _get(cache, "huge") is None and len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0 and cache.total_bytes == 0
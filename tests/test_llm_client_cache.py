@@ -0,0 +1,72 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from llm_core.cache import LLMCache
+from llm_core.client import LLMClient
+
+
+class CountingLLM:
+    model = "fake-model"
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_chat(self, messages, **kwargs):
+        self.calls.append(("chat", messages[-1]["content"]))
+        return {"role": "assistant", "content": f"answer: {messages[-1]['content']}"}
+
+    async def async_generate_chat(self, messages, **kwargs):
+        self.calls.append(("async_chat", messages[-1]["content"]))
+        return {"role": "assistant", "content": f"answer: {messages[-1]['content']}"}
+
+    def generate_text(self, prompt, **kwargs):
+        self.calls.append(("text", prompt))
+        return f"text: {prompt}"
+
+    def generate_embeddings(self, texts, **kwargs):
+        self.calls.append(("embeddings", tuple(texts)))
+        return [[float(len(text))] for text in texts]
+
+
+def _client(cache=None, **cache_config):
+    client = LLMClient(provider="ollama", cache=cache, cache_config=cache_config)
+    client.llm = CountingLLM()
+    return client
+
+
+def _messages(text):
+    return [{"role": "user", "content": text}]
+
+
+def test_chat_and_async_chat_share_the_client_cache():
+    client = _client()
+    assert client.chat(_messages("hi"))["content"] == "answer: hi"
+    assert asyncio.run(client.async_chat(_messages("hi")))["content"] == "answer: hi"
+    assert asyncio.run(client.async_batch_generate(["hi", "there"])) == ["answer: hi", "answer: there"]
+    assert client.llm.calls == [("chat", "hi"), ("async_chat", "there")]
+    # 高温度请求不缓存
+    client.chat(_messages("hi"), temperature=0.9)
+    assert len(client.llm.calls) == 3
+    assert client.cache.stats()["hits"] == 2
+
+
+def test_injected_cache_is_shared_across_clients():
+    shared = LLMCache(max_size=10)
+    first, second = _client(shared), _client(shared)
+    first.chat(_messages("hi"))
+    second.chat(_messages("hi"))
+    assert len(first.llm.calls) == 1 and second.llm.calls == []
+    assert _client(max_size=5).cache.max_size == 5
+
+
+def test_batch_generate_and_embeddings_only_compute_misses():
+    client = _client()
+    assert client.batch_generate(["a", "b"]) == ["text: a", "text: b"]
+    assert client.batch_generate(["b", "c", "a"]) == ["text: b", "text: c", "text: a"]
+    assert [call for call in client.llm.calls if call[0] == "text"] == [("text", "a"), ("text", "b"), ("text", "c")]
+
+    assert client.get_embeddings(["xx", "yyy"]) == [[2.0], [3.0]]
+    assert client.get_embeddings(["yyy", "z"]) == [[3.0], [1.0]]
+    assert client.get_embeddings("xx") == [2.0]
+    assert [call for call in client.llm.calls if call[0] == "embeddings"] == [("embeddings", ("xx", "yyy")), ("embeddings", ("z",))]
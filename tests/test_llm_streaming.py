@@ -0,0 +1,71 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from llm_core.base import LLMBase
+
+
+def test_default_astream_chat_relays_sync_stream():
+    class FakeLLM:
+        def stream_chat(self, messages, **kwargs):
+            for word in ["a", "b", "c"]:
+                yield {"role": "assistant", "content": word}
+
+    async def collect():
+        return [chunk["content"] async for chunk in LLMBase.astream_chat(FakeLLM(), [])]
+
+    assert asyncio.run(collect()) == ["a", "b", "c"]
+
+
+class EndlessLLM:
+    def __init__(self):
+        self.produced = 0
+        self.closed = threading.Event()
+
+    def stream_chat(self, messages, **kwargs):
+        try:
+            while True:
+                self.produced += 1
+                time.sleep(0.01)
+                yield {"role": "assistant", "content": str(self.produced)}
+        finally:
+            self.closed.set()
+
+
+def test_default_astream_chat_stops_producer_when_consumer_stops():
+    llm = EndlessLLM()
+
+    async def take_two():
+        stream = LLMBase.astream_chat(llm, [])
+        chunks = [await stream.__anext__(), await stream.__anext__()]
+        await stream.aclose()
+        return chunks
+
+    assert [chunk["content"] for chunk in asyncio.run(take_two())] == ["1", "2"]
+    # 后台线程在下一个片段处停止并关闭同步生成器
+    assert llm.closed.wait(1)
+    produced = llm.produced
+    time.sleep(0.05)
+    assert llm.produced == produced
+
+
+def test_default_astream_chat_stops_producer_on_cancel():
+    llm = EndlessLLM()
+
+    async def consume():
+        async for _ in LLMBase.astream_chat(llm, []):
+            pass
+
+    async def main():
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(main())
+    assert llm.closed.wait(1)
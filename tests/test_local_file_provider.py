@@ -0,0 +1,139 @@
+import sys
+import os
+import asyncio
+import json
+import zlib
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from agents.knowledge_base.knowledge_processing_agent import ProcessedKnowledgeChunk
+from agents.knowledge_base.storage_providers.local_file import LocalFileStorageProvider
+
+
+def _chunk(chunk_id, text, vector, **metadata):
+    return ProcessedKnowledgeChunk(
+        id=chunk_id, original_id=chunk_id, text_content=text, vector=vector,
+        category="general", entities=[], relationships=[], metadata=metadata
+    )
+
+
+def _store(provider, chunks):
+    return asyncio.run(provider.store(chunks))
+
+
+def test_local_file_provider_survives_restart(tmp_path):
+    provider = LocalFileStorageProvider({"path": str(tmp_path)})
+    _store(provider, [
+        _chunk("sun", "太阳表面温度约5778K。", [1.0, 0.0, 0.0], category="science"),
+        _chunk("water", "水的化学分子式是H2O。", [0.0, 1.0, 0.0], category="science"),
+        _chunk("git", "Git is a version control system.", [0.0, 0.0, 1.0], category="technology"),
+    ])
+    provider.close()
+
+    reopened = LocalFileStorageProvider({"path": str(tmp_path)})
+    assert sorted(reopened.get_all_chunk_ids()) == ["git", "sun", "water"]
+
+    by_vector = reopened.retrieve([0.9, 0.1, 0.0], 1, {})
+    assert by_vector[0].id == "sun"
+
+    by_text = reopened.retrieve(None, 2, {"query_text": "太阳温度", "category": "science"})
+    assert [chunk.id for chunk in by_text] == ["sun"]
+    assert reopened.retrieve(None, 5, {"query_text": "version control", "category": "science"}) == []
+
+
+def test_local_file_provider_staging_delete_and_compaction(tmp_path):
+    provider = LocalFileStorageProvider({"path": str(tmp_path), "compaction_ratio": 0.5})
+    _store(provider, [_chunk(f"c{i}", f"document {i}", [float(i), 1.0]) for i in range(4)])
+    _store(provider, [_chunk("staged", "pending document", [1.0, 1.0], stage=True)])
+
+    assert asyncio.run(provider.list_staged_chunks()) == ["staged"]
+    assert "staged" not in provider.get_all_chunk_ids()
+    assert asyncio.run(provider.validate_and_promote("staged"))
+    assert "staged" in provider.get_all_chunk_ids()
+
+    assert asyncio.run(provider.delete_chunk("c1"))
+    assert asyncio.run(provider.delete_chunk("c2"))
+    # 死记录超过阈值后在后台线程中自动压缩
+    provider.wait_for_compaction()
+    assert provider.dead_records == 0
+    assert provider.next_row == 3
+
+    reopened = LocalFileStorageProvider({"path": str(tmp_path)})
+    assert sorted(reopened.get_all_chunk_ids()) == ["c0", "c3", "staged"]
+    assert reopened.retrieve([3.0, 1.0], 1, {})[0].id == "c3"
+
+
+def test_local_file_provider_replays_wal_after_crash(tmp_path):
+    provider = LocalFileStorageProvider({"path": str(tmp_path)})
+    _store(provider, [_chunk("a", "alpha", [1.0, 0.0])])
+
+    # 模拟批次已写入WAL、但尚未写入日志和向量段时进程崩溃
+    records = [{"op": "put", "id": "b", "original_id": "b", "text_content": "beta", "category": None,
+                "entities": [], "relationships": [], "metadata": {}, "staged": False, "row": 1,
+                "dim": 2, "vector": [0.0, 1.0]}]
+    payload = json.dumps(records).encode("utf-8")
+    with open(os.path.join(str(tmp_path), "wal.log"), "wb") as wal:
+        wal.write(f"{zlib.crc32(payload)}\t".encode() + payload + b"\n")
+
+    recovered = LocalFileStorageProvider({"path": str(tmp_path)})
+    assert sorted(recovered.get_all_chunk_ids()) == ["a", "b"]
+    assert recovered.retrieve([0.0, 1.0], 1, {})[0].id == "b"
+    assert os.path.getsize(os.path.join(str(tmp_path), "wal.log")) == 0
+
+
+def test_local_file_provider_recovers_from_crash_during_compaction(tmp_path):
+    provider = LocalFileStorageProvider({"path": str(tmp_path)})
+    _store(provider, [_chunk(f"c{i}", f"document {i}", [float(i), 1.0]) for i in range(5)])
+    provider.close()
+    provider = LocalFileStorageProvider({"path": str(tmp_path)})
+    _store(provider, [_chunk(f"c{i}", f"document {i}", [float(i), 1.0]) for i in range(5, 40)])
+    asyncio.run(provider.delete_chunk("c0"))
+
+    # 模拟新文件已换入、但新快照尚未写出时进程崩溃：旧的 index.json 不能再被使用
+    finish = provider._finish_compaction
+
+    def crash():
+        finish()
+        raise KeyboardInterrupt
+
+    provider._finish_compaction = crash
+    try:
+        provider.compact()
+    except KeyboardInterrupt:
+        pass
+
+    reopened = LocalFileStorageProvider({"path": str(tmp_path)})
+    assert sorted(reopened.get_all_chunk_ids()) == sorted(f"c{i}" for i in range(1, 40))
+    assert reopened.retrieve([39.0, 1.0], 1, {})[0].id == "c39"
+    assert reopened.retrieve(None, 1, {"query_text": "document 7"})[0].id == "c7"
+
+
+def test_local_file_provider_concurrent_stores_get_distinct_rows(tmp_path):
+    provider = LocalFileStorageProvider({"path": str(tmp_path), "compaction_ratio": 100})
+
+    async def main():
+        await asyncio.gather(*[
+            provider.store([_chunk(f"c{i}", f"document {i}", [float(i), 1.0])]) for i in range(20)
+        ])
+
+    asyncio.run(main())
+    rows = [entry[2] for entry in provider.entries.values()]
+    assert sorted(rows) == list(range(20))
+    # 每个chunk的向量都写在自己的行里，没有被并发的写入覆盖
+    for i in range(20):
+        assert provider._vectors[provider.entries[f"c{i}"][2]].tolist() == [float(i), 1.0]
+
+
+def test_local_file_provider_bounded_top_k_with_unindexed_filters(tmp_path):
+    provider = LocalFileStorageProvider({"path": str(tmp_path)})
+    # 只有最不相似的几个chunk带有未建索引的 lang 字段
+    _store(provider, [
+        _chunk(f"c{i}", f"document {i}", [1.0, float(i)], **({"lang": "zh"} if i >= 27 else {}))
+        for i in range(30)
+    ])
+
+    best = provider.retrieve([0.0, 1.0], 3, {})
+    assert [chunk.id for chunk in best] == ["c29", "c28", "c27"]
+    # 逐条比较的过滤条件淘汰了前面的候选时，扩大选择范围而不是返回不足top_k个结果
+    worst_zh = provider.retrieve([1.0, 0.0], 2, {"lang": "zh"})
+    assert [chunk.id for chunk in worst_zh] == ["c27", "c28"]
+    by_text = provider.retrieve(None, 3, {"query_text": "document", "lang": "zh"})
+    assert sorted(chunk.id for chunk in by_text) == ["c27", "c28", "c29"]
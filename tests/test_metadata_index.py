@@ -0,0 +1,104 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from agents.knowledge_base.knowledge_processing_agent import ProcessedKnowledgeChunk
+from agents.knowledge_base.improved_rag.metadata_index import MetadataIndex
+from agents.knowledge_base.improved_rag.enhanced_storage_provider import EnhancedMemoryStorageProvider
+from agents.knowledge_base.storage_providers.memory import MemoryStorageProvider
+
+
+def _chunk(chunk_id, text, **metadata):
+    return ProcessedKnowledgeChunk(
+        id=chunk_id, original_id=chunk_id, text_content=text, vector=[],
+        category="general", entities=[], relationships=[], metadata=metadata
+    )
+
+
+CHUNKS = [
+    _chunk("sun", "The sun is a star at the center of the solar system.", category="science", source_type="web"),
+    _chunk("water", "Water is made of hydrogen and oxygen.", category="science", source_type="file"),
+    _chunk("git", "Git is a distributed version control system.", category="technology", source_type="web"),
+]
+
+
+def test_metadata_index_intersects_and_returns_residual_filters():
+    index = MetadataIndex()
+    for chunk in CHUNKS:
+        index.add(chunk.id, chunk.metadata)
+
+    assert index.lookup({"category": "science"}) == ({"sun", "water"}, {})
+    assert index.lookup({"category": "science", "source_type": "web", "query_text": "sun"}) == ({"sun"}, {})
+    assert index.lookup({"category": "history"}) == (set(), {})
+    assert index.lookup({"lang": "en"}) == (None, {"lang": "en"})
+    assert index.lookup({"query_text": "sun"}) == (None, {})
+
+    index.add("sun", {"category": "astronomy"})
+    assert index.lookup({"category": "science"})[0] == {"water"}
+    assert index.remove("water") and not index.remove("water")
+    assert index.lookup({"category": "science"})[0] == set()
+    assert len(index) == 2
+
+
+def test_memory_provider_filters_through_metadata_index():
+    provider = MemoryStorageProvider()
+    asyncio.run(provider.store(CHUNKS))
+
+    results = provider.retrieve([], 5, {"category": "science"})
+    assert sorted(chunk.id for chunk in results) == ["sun", "water"]
+
+    results = provider.retrieve([], 5, {"query_text": "system", "category": "technology"})
+    assert [chunk.id for chunk in results] == ["git"]
+
+
+def test_enhanced_provider_filters_through_metadata_index():
+    provider = EnhancedMemoryStorageProvider()
+    asyncio.run(provider.store(CHUNKS))
+
+    for method in ("semantic", "keyword", "hybrid"):
+        results = provider.retrieve([], 5, {
+            "query_text": "system", "retrieval_method": method,
+            "category": "science", "source_type": "web"
+        })
+        assert {chunk.id for chunk in results} <= {"sun"}
+
+    assert provider.retrieve([], 5, {"query_text": "system", "category": "history"}) == []
+
+    asyncio.run(provider.delete_chunk("sun"))
+    assert provider.metadata_index.lookup({"category": "science"})[0] == {"water"}
+
+
+def test_metadata_index_can_match_documents_missing_the_key():
+    index = MetadataIndex()
+    index.add("tagged", {"topic": "physics"})
+    index.add("other", {"topic": "chemistry"})
+    index.add("untagged", {"category": "science"})
+
+    assert index.lookup({"topic": "physics"})[0] == {"tagged"}
+    assert index.lookup({"topic": "physics"}, missing_matches=["topic"])[0] == {"tagged", "untagged"}
+    index.add("untagged", {"topic": "chemistry"})
+    assert index.lookup({"topic": "physics"}, missing_matches=["topic"])[0] == {"tagged"}
+    index.remove("tagged")
+    assert index.lookup({"topic": "physics"}, missing_matches=["topic"])[0] == set()
+
+
+def test_oss_index_lookup_agrees_with_per_object_filters():
+    from agents.knowledge_base.storage_providers.oss import OSSStorageProvider
+
+    objects = [
+        {"id": "a", "category": "science", "metadata": {"topic": "physics", "source_type": "web"}},
+        {"id": "b", "category": "science", "metadata": {"topic": "chemistry"}},
+        {"id": "c", "category": "science", "metadata": {}},
+        {"id": "d", "category": None, "metadata": {"topic": "physics"}},
+    ]
+    index = MetadataIndex()
+    for chunk_data in objects:
+        index.add(chunk_data["id"], OSSStorageProvider._index_fields(chunk_data))
+
+    # 缺少被过滤字段的对象（c）在两条路径上都被保留
+    for filters in [{"topic": "physics"}, {"category": "science", "topic": "physics"},
+                    {"source_type": "web"}, {"category": "science"}, {"category": "history"}]:
+        candidates, residual = OSSStorageProvider._lookup_candidates(index, filters)
+        assert residual == {}
+        expected = {data["id"] for data in objects if OSSStorageProvider._matches_filters(data, filters)}
+        assert candidates == expected, filters
@@ -0,0 +1,116 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from agents.knowledge_base.orchestrator_agent import OrchestratorAgent
+
+
+class SlowAgent:
+    def __init__(self):
+        self.threads = []
+
+    def work(self, params):
+        self.threads.append(threading.current_thread().name)
+        time.sleep(0.2)
+        return params
+
+
+class SyncRAGAgent:
+    def __init__(self):
+        self.thread = None
+
+    def generate(self, query, context):
+        self.thread = threading.current_thread().name
+        return f"sync answer to {query}"
+
+
+class AsyncRAGAgent:
+    async def agenerate(self, query, context):
+        return f"async answer to {query}"
+
+
+def _orchestrator():
+    return OrchestratorAgent(llm_config={"provider": "ollama", "use_semantic_search": False})
+
+
+def test_sync_tasks_do_not_block_event_loop():
+    orchestrator = _orchestrator()
+    agent = SlowAgent()
+    orchestrator.register_agent("SlowAgent", agent)
+    orchestrator.register_agent("KnowledgeProcessingAgent", agent)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        results = await asyncio.gather(*[
+            orchestrator.distribute_task("SlowAgent", "work", i) for i in range(4)
+        ], orchestrator.distribute_task("KnowledgeProcessingAgent", "work", "cpu"))
+        elapsed = time.perf_counter() - started
+        tick_task.cancel()
+        return results, elapsed, ticks
+
+    try:
+        results, elapsed, ticks = asyncio.run(run())
+    finally:
+        orchestrator.shutdown()
+    assert results == [0, 1, 2, 3, "cpu"]
+    assert elapsed < 0.6 and ticks >= 5
+    assert sorted({name.split("_")[0] for name in agent.threads}) == ["orchestrator-cpu", "orchestrator-io"]
+
+
+def test_answer_generation_awaits_or_offloads_rag_agent():
+    orchestrator = _orchestrator()
+
+    async def run():
+        await orchestrator.receive_request("test", "add_knowledge", {
+            "sources": [{"type": "text", "location": "Python is a programming language"}]
+        })
+        orchestrator.register_agent("RAGAgent", AsyncRAGAgent())
+        async_result = await orchestrator.receive_request("test", "query", {"query": "Python programming language"})
+        sync_agent = SyncRAGAgent()
+        orchestrator.register_agent("RAGAgent", sync_agent)
+        sync_result = await orchestrator.receive_request("test", "query", {"query": "Python programming language"})
+        return async_result, sync_result, sync_agent.thread
+
+    try:
+        async_result, sync_result, thread = asyncio.run(run())
+    finally:
+        orchestrator.shutdown()
+    assert async_result["answer"] == "async answer to Python programming language"
+    assert sync_result["answer"] == "sync answer to Python programming language"
+    assert thread.startswith("orchestrator-io")
+
+
+def test_shutdown_closes_retrieval_executor_and_embedding_cache(tmp_path):
+    orchestrator = OrchestratorAgent(llm_config={"provider": "ollama",
+                                                 "embedding_cache_dir": str(tmp_path / "embeddings")})
+    provider = orchestrator.agents["KnowledgeStorageAgent"].provider
+    embedding_cache = orchestrator.embedding_cache
+
+    try:
+        asyncio.run(orchestrator.receive_request("test", "add_knowledge", {
+            "sources": [{"type": "text", "location": "Python is a programming language"}]
+        }))
+        assert provider.retrieve_batch(["Python"], top_k=1)[0]
+        executor = provider._retrieval_executor
+        assert executor is not None
+    finally:
+        orchestrator.shutdown()
+    assert executor._shutdown and provider._retrieval_executor is None
+    assert orchestrator.embedding_cache is None
+    try:
+        embedding_cache._db.execute("SELECT 1")
+    except Exception as e:
+        assert "closed" in str(e)
+    else:
+        raise AssertionError("embedding cache connection left open")
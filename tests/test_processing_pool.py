@@ -0,0 +1,40 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from agents.knowledge_base.data_collection_agent import RawDocument
+from agents.knowledge_base.knowledge_processing_agent import KnowledgeProcessingAgent
+from agents.knowledge_base.orchestrator_agent import OrchestratorAgent
+
+
+def _documents(n):
+    return [
+        RawDocument(id=f"doc-{i}", content=" ".join(f"Word{i} token{j}" for j in range(80)),
+                    source="test", type="text", metadata={"n": i})
+        for i in range(n)
+    ]
+
+
+def test_process_pool_matches_serial_order():
+    documents = _documents(9)
+    serial = KnowledgeProcessingAgent(chunk_size=200, chunk_overlap=20).process(documents)
+    agent = KnowledgeProcessingAgent(chunk_size=200, chunk_overlap=20, workers=2, ipc_batch_size=2)
+    try:
+        pooled = agent.process(documents)
+        pooled_async = asyncio.run(agent.aprocess(documents))
+    finally:
+        agent.close()
+    assert [c.to_dict() for c in pooled] == [c.to_dict() for c in serial]
+    assert [c.id for c in pooled_async] == [c.id for c in serial]
+
+
+def test_add_knowledge_with_processing_workers():
+    orchestrator = OrchestratorAgent(llm_config={"provider": "ollama", "use_semantic_search": False,
+                                                 "processing_workers": 2, "processing_ipc_batch_size": 2})
+    try:
+        result = asyncio.run(orchestrator.receive_request("test", "add_knowledge", {
+            "sources": [{"type": "text", "location": f"Document number {i}"} for i in range(5)]
+        }))
+    finally:
+        orchestrator.agents["KnowledgeProcessingAgent"].close()
+    assert result["status"] == "success" and result["chunks_count"] == 5
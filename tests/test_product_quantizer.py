@@ -0,0 +1,68 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+from agents.knowledge_base.knowledge_processing_agent import ProcessedKnowledgeChunk
+from agents.knowledge_base.improved_rag.product_quantizer import ProductQuantizer, PQVectorIndex
+from agents.knowledge_base.improved_rag.vector_index import FlatVectorIndex
+from agents.knowledge_base.storage_providers.local_file import LocalFileStorageProvider
+
+
+def _clustered_vectors(n, dim, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return (centers[rng.integers(0, clusters, n)] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def test_product_quantizer_codes_and_distance_table():
+    vectors = _clustered_vectors(500, 30)
+    pq = ProductQuantizer(30, num_subspaces=8, num_centroids=64, seed=1)
+    pq.train(vectors)
+    codes = pq.encode(vectors)
+    assert codes.dtype == np.uint8 and codes.shape == (500, 8)
+
+    error = np.linalg.norm(pq.decode(codes) - vectors) / np.linalg.norm(vectors)
+    assert error < 0.5
+    query = vectors[0]
+    assert np.allclose(pq.score(pq.distance_table(query), codes), pq.decode(codes) @ query, atol=1e-3)
+
+
+def test_pq_index_recall_with_exact_rerank():
+    vectors = _clustered_vectors(2000, 32)
+    ids = [f"c{i}" for i in range(2000)]
+    by_id = dict(zip(ids, vectors))
+    flat = FlatVectorIndex()
+    flat.add_batch(ids, vectors)
+    index = PQVectorIndex(num_subspaces=8, train_size=1000, seed=1,
+                          vector_loader=lambda chunk_ids: [by_id[chunk_id] for chunk_id in chunk_ids])
+    index.add_batch(ids, vectors)
+    assert index.is_trained and len(index) == 2000
+    assert index.nbytes == 2000 * 8
+
+    queries = _clustered_vectors(20, 32, seed=5)
+    recall = np.mean([
+        len({i for _, i in index.search(q, 10)} & {i for _, i in flat.search(q, 10)}) / 10
+        for q in queries
+    ])
+    assert recall >= 0.8
+
+    assert index.remove("c0") and "c0" not in index
+    assert all(chunk_id in {"c1", "c2"} for _, chunk_id in index.search(queries[0], 5, candidate_ids=["c1", "c2"]))
+
+
+def test_local_file_provider_pq_codec(tmp_path):
+    vectors = _clustered_vectors(300, 16)
+    provider = LocalFileStorageProvider({"path": str(tmp_path), "vector_codec": "pq",
+                                         "pq_subspaces": 4, "pq_train_size": 200})
+    asyncio.run(provider.store([
+        ProcessedKnowledgeChunk(id=f"c{i}", original_id=f"c{i}", text_content=f"chunk {i}", vector=vector.tolist(),
+                                category="general", entities=[], relationships=[], metadata={})
+        for i, vector in enumerate(vectors)
+    ]))
+    results = provider.retrieve(vectors[42].tolist(), 3, {})
+    assert results[0].id == "c42" and len(results) == 3
+    assert provider._pq_index.is_trained
+
+    asyncio.run(provider.delete_chunk("c42"))
+    assert provider.retrieve(vectors[42].tolist(), 1, {})[0].id != "c42"
@@ -0,0 +1,121 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from agents.knowledge_base.knowledge_processing_agent import ProcessedKnowledgeChunk
+from agents.knowledge_base.storage_providers.base import ReadWriteLock
+from agents.knowledge_base.storage_providers.memory import MemoryStorageProvider
+
+
+def test_readers_share_and_writers_exclude():
+    lock = ReadWriteLock()
+    events = []
+
+    def reader(name):
+        with lock.read():
+            events.append(f"{name} in")
+            time.sleep(0.1)
+            events.append(f"{name} out")
+
+    def writer():
+        time.sleep(0.02)
+        with lock.write():
+            events.append("writer")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(lambda f: f(), [lambda: reader("a"), lambda: reader("b"), writer]))
+    # 两个读者同时持有锁，写者等到它们都释放之后
+    assert events[:2] == ["a in", "b in"] and events[-1] == "writer"
+
+
+def test_lock_is_reentrant_but_cannot_upgrade():
+    lock = ReadWriteLock()
+    with lock.write():
+        with lock.write():
+            with lock.read():
+                pass
+    with lock.read():
+        with lock.read():
+            with pytest.raises(RuntimeError):
+                lock.acquire_write()
+    # 全部释放后其他线程可以写
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (lock.acquire_write(), acquired.set(), lock.release_write()))
+    thread.start()
+    thread.join(1)
+    assert acquired.is_set()
+
+
+def test_memory_provider_searches_while_storing():
+    provider = MemoryStorageProvider()
+
+    def chunk(i):
+        return ProcessedKnowledgeChunk(id=f"c{i}", original_id="doc", text_content=f"太阳 document {i}",
+                                       vector=[], category="general", entities=[], relationships=[],
+                                       metadata={"category": "science"})
+
+    stop = threading.Event()
+    errors = []
+
+    def search():
+        while not stop.is_set():
+            try:
+                provider.retrieve([], 5, {"query_text": "太阳 document", "category": "science"})
+                provider.get_all_chunk_ids()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=search) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for i in range(300):
+            asyncio.run(provider.store([chunk(i)]))
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert errors == [] and len(provider.get_all_chunk_ids()) == 300
+
+
+def test_ingest_does_not_wait_for_query_embedding():
+    from agents.knowledge_base.improved_rag.enhanced_storage_provider import EnhancedMemoryStorageProvider
+    from agents.knowledge_base.improved_rag.semantic_retriever import EmbeddingProvider
+
+    class SlowQueryEmbeddings(EmbeddingProvider):
+        """查询嵌入很慢（模拟远程模型），入库的批量嵌入很快"""
+
+        def embed_text(self, text):
+            time.sleep(0.5)
+            return [1.0, 0.0]
+
+        def embed_batch(self, texts):
+            return [[1.0, 0.0] for _ in texts]
+
+    provider = EnhancedMemoryStorageProvider(embedding_provider=SlowQueryEmbeddings())
+
+    def chunk(i):
+        return ProcessedKnowledgeChunk(id=f"c{i}", original_id="doc", text_content=f"document {i}",
+                                       vector=[], category="general", entities=[], relationships=[],
+                                       metadata={})
+
+    asyncio.run(provider.store([chunk(0)]))
+
+    async def main():
+        search = asyncio.ensure_future(asyncio.to_thread(
+            provider.retrieve, [], 5, {"query_text": "document", "retrieval_method": "semantic"}
+        ))
+        await asyncio.sleep(0.05)
+        # 检索正在等待查询嵌入，入库不必等它
+        start = time.perf_counter()
+        await provider.store([chunk(1)])
+        stored_in = time.perf_counter() - start
+        return stored_in, await search
+
+    stored_in, results = asyncio.run(main())
+    assert stored_in < 0.3
+    assert {chunk.id for chunk in results} <= {"c0", "c1"} and results
@@ -0,0 +1,84 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from agents.knowledge_base.knowledge_processing_agent import ProcessedKnowledgeChunk
+from agents.knowledge_base.knowledge_storage_agent import KnowledgeStorageAgent
+from agents.knowledge_base.knowledge_retrieval_agent import KnowledgeRetrievalAgent
+from agents.knowledge_base.improved_rag.enhanced_storage_provider import EnhancedMemoryStorageProvider
+from agents.knowledge_base.improved_rag.semantic_retriever import EmbeddingProvider
+
+TEXTS = {
+    "docker": "Docker is a container platform.",
+    "git": "Git is a version control system.",
+    "python": "Python is a programming language.",
+}
+QUERIES = ["container platform", "version control", "programming language"]
+
+
+class TopicEmbeddings(EmbeddingProvider):
+    """确定性的非零向量：每个主题词落在自己的维度上，记录嵌入调用"""
+
+    TOPICS = {"docker": 0, "container": 0, "platform": 0, "git": 1, "version": 1, "control": 1,
+              "python": 2, "programming": 2, "language": 2}
+
+    def __init__(self):
+        self.text_calls = 0
+        self.batch_calls = []
+
+    def _vector(self, text):
+        vector = [0.0, 0.0, 0.0, 0.1]
+        for word in text.lower().rstrip(".").split():
+            if word in self.TOPICS:
+                vector[self.TOPICS[word]] += 1.0
+        return vector
+
+    def embed_text(self, text):
+        self.text_calls += 1
+        return self._vector(text)
+
+    def embed_batch(self, texts):
+        self.batch_calls.append(len(texts))
+        return [self._vector(text) for text in texts]
+
+
+def _retrieval_agent(storage_agent):
+    asyncio.run(storage_agent.store([
+        ProcessedKnowledgeChunk(id=chunk_id, original_id=chunk_id, text_content=text, vector=[],
+                                category="general", entities=[], relationships=[], metadata={})
+        for chunk_id, text in TEXTS.items()
+    ]))
+    return KnowledgeRetrievalAgent(storage_agent)
+
+
+def _assert_batch_matches_single(agent, filters=None):
+    batch = agent.search_batch({"queries": QUERIES, "top_k": 2, "filters": dict(filters or {})})
+    assert len(batch) == len(QUERIES)
+    for query, candidates in zip(QUERIES, batch):
+        single = agent.search({"query": query, "top_k": 2, "filters": dict(filters or {})})
+        assert [(c.source_id, round(c.relevance_score, 6)) for c in candidates] == \
+               [(c.source_id, round(c.relevance_score, 6)) for c in single]
+    assert [candidates[0].source_id for candidates in batch] == ["docker", "git", "python"]
+
+
+def test_search_batch_with_enhanced_provider():
+    _assert_batch_matches_single(_retrieval_agent(
+        KnowledgeStorageAgent(custom_provider=EnhancedMemoryStorageProvider())
+    ))
+
+
+def test_semantic_search_batch_matches_single_queries():
+    embeddings = TopicEmbeddings()
+    agent = _retrieval_agent(KnowledgeStorageAgent(
+        custom_provider=EnhancedMemoryStorageProvider(embedding_provider=embeddings)
+    ))
+    embeddings.batch_calls.clear()
+    _assert_batch_matches_single(agent, {"retrieval_method": "semantic"})
+    # 批量检索把所有查询合并为一次 embed_batch 调用，分数来自非零的语义向量
+    assert embeddings.batch_calls == [len(QUERIES)]
+    batch = agent.search_batch({"queries": QUERIES, "top_k": 2, "filters": {"retrieval_method": "semantic"}})
+    assert all(candidates[0].relevance_score > 0.9 for candidates in batch)
+
+
+def test_search_batch_falls_back_to_single_queries():
+    _assert_batch_matches_single(_retrieval_agent(KnowledgeStorageAgent(provider_type="memory")))
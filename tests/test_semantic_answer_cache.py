@@ -0,0 +1,89 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from agents.knowledge_base.improved_rag.semantic_answer_cache import SemanticAnswerCache
+from agents.knowledge_base.orchestrator_agent import OrchestratorAgent
+
+
+class TableEmbeddings:
+    vectors = {
+        "what is python": [1.0, 0.0, 0.0],
+        "what's python?": [0.98, 0.15, 0.0],
+        "how do i cook rice": [0.0, 1.0, 0.0],
+    }
+
+    def embed_text(self, text):
+        return self.vectors[text]
+
+
+def test_hits_on_similar_question_with_same_context():
+    cache = SemanticAnswerCache(TableEmbeddings(), similarity_threshold=0.95)
+    cache.store("what is python", ["c1", "c2"], "A programming language.")
+    assert cache.lookup("what's python?", ["c2", "c1"]) == "A programming language."
+    assert cache.lookup("what's python?", ["c1", "c3"]) is None
+    assert cache.lookup("how do i cook rice", ["c1", "c2"]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+    strict = SemanticAnswerCache(TableEmbeddings(), similarity_threshold=0.995)
+    strict.store("what is python", ["c1"], "answer")
+    assert strict.lookup("what's python?", ["c1"]) is None
+
+
+def test_eviction_and_ttl():
+    cache = SemanticAnswerCache(TableEmbeddings(), max_entries=1)
+    cache.store("what is python", ["c1"], "python")
+    cache.store("how do i cook rice", ["c2"], "rice")
+    assert len(cache) == 1 and cache.lookup("what is python", ["c1"]) is None
+    assert cache.lookup("how do i cook rice", ["c2"]) == "rice"
+
+    # 反复淘汰不会让索引增长
+    for i in range(50):
+        cache.store(f"question {i}", [f"c{i}"], str(i), query_vector=[1.0, float(i), 0.5])
+    assert len(cache) == 1 and len(cache.vector_index) == 1
+
+    expired = SemanticAnswerCache(TableEmbeddings(), ttl=-1)
+    expired.store("what is python", ["c1"], "python")
+    assert expired.lookup("what is python", ["c1"]) is None and len(expired) == 0
+
+
+class CountingRAGAgent:
+    def __init__(self):
+        self.calls = 0
+
+    async def agenerate(self, query, context):
+        self.calls += 1
+        return f"generated #{self.calls}"
+
+
+def test_orchestrator_reuses_answers_for_near_duplicate_questions():
+    orchestrator = OrchestratorAgent(llm_config={"provider": "ollama", "relevance_threshold": 0.0,
+                                                 "semantic_cache": {"similarity_threshold": 0.9,
+                                                                    "allow_simple_embeddings": True}})
+    rag_agent = CountingRAGAgent()
+    orchestrator.register_agent("RAGAgent", rag_agent)
+
+    async def run():
+        await orchestrator.receive_request("test", "add_knowledge", {
+            "sources": [{"type": "text", "location": "太阳的表面温度约为5500摄氏度"}]
+        })
+        answers = []
+        for query in ["太阳表面温度是多少", "太阳表面的温度有多高？", "请问太阳表面温度"]:
+            result = await orchestrator.receive_request("test", "query", {"query": query})
+            answers.append(result["answer"])
+        return answers
+
+    try:
+        answers = asyncio.run(run())
+    finally:
+        orchestrator.shutdown()
+    assert answers == ["generated #1"] * 3
+    assert rag_agent.calls == 1 and orchestrator.answer_cache.stats()["hits"] == 2
+
+
+def test_orchestrator_keeps_answer_cache_off_for_simple_embeddings():
+    orchestrator = OrchestratorAgent(llm_config={"provider": "ollama", "semantic_cache": True})
+    try:
+        assert orchestrator.answer_cache is None
+    finally:
+        orchestrator.shutdown()
@@ -0,0 +1,48 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from agents.knowledge_base.knowledge_processing_agent import ProcessedKnowledgeChunk
+from agents.knowledge_base.improved_rag.semantic_retriever import SemanticRetriever, EmbeddingProvider
+
+
+class CountingEmbeddings(EmbeddingProvider):
+    """记录每次嵌入调用的输入"""
+
+    VECTORS = {"sun": [1.0, 0.0], "water": [0.0, 1.0], "moon": [0.9, 0.1], "query": [1.0, 0.0]}
+
+    def __init__(self):
+        self.text_calls = []
+        self.batch_calls = []
+
+    def embed_text(self, text):
+        self.text_calls.append(text)
+        return self.VECTORS[text]
+
+    def embed_batch(self, texts):
+        self.batch_calls.append(list(texts))
+        return [self.VECTORS[text] for text in texts]
+
+
+def _chunk(chunk_id):
+    return ProcessedKnowledgeChunk(id=chunk_id, original_id=chunk_id, text_content=chunk_id, vector=[],
+                                   category="general", entities=[], relationships=[], metadata={})
+
+
+def test_retrieve_semantic_reuses_precomputed_vectors():
+    embeddings = CountingEmbeddings()
+    retriever = SemanticRetriever(embeddings, embeddings={"sun": [1.0, 0.0], "water": [0.0, 1.0]})
+    chunks = [_chunk("sun"), _chunk("water"), _chunk("moon")]
+
+    results = retriever.retrieve_semantic("query", chunks, top_k=2)
+    assert [chunk.id for _, chunk in results] == ["sun", "moon"]
+    # 只嵌入查询和缺少向量的chunk，缺失的chunk合并为一次 embed_batch 调用
+    assert embeddings.text_calls == ["query"]
+    assert embeddings.batch_calls == [["moon"]]
+
+    # 显式传入的向量优先于构造时的向量；全部已知时不调用 embed_batch
+    embeddings.batch_calls.clear()
+    results = retriever.retrieve_semantic("query", chunks, top_k=1,
+                                          chunk_embeddings={"sun": [0.0, 1.0], "water": [0.0, 1.0],
+                                                            "moon": [1.0, 0.0]})
+    assert [chunk.id for _, chunk in results] == ["moon"]
+    assert embeddings.batch_calls == []
@@ -0,0 +1,148 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from llm_core.client import LLMClient
+
+
+class SlowLLM:
+    model = "fake-model"
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_chat(self, messages, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.2)
+        if self.fail:
+            raise RuntimeError("rate limited")
+        return {"role": "assistant", "content": f"answer: {messages[-1]['content']}"}
+
+    async def async_generate_chat(self, messages, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.1)
+        if self.fail:
+            raise RuntimeError("rate limited")
+        return {"role": "assistant", "content": f"answer: {messages[-1]['content']}"}
+
+
+def _client(fail=False, **cache_config):
+    client = LLMClient(provider="ollama", cache_config=cache_config)
+    client.llm = SlowLLM(fail)
+    return client
+
+
+def _messages(text):
+    return [{"role": "user", "content": text}]
+
+
+def test_concurrent_identical_chats_call_the_llm_once():
+    client = _client()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: client.chat(_messages("hi")), range(8)))
+    assert all(result["content"] == "answer: hi" for result in results)
+    assert client.llm.calls == 1
+    assert client.cache.stats()["coalesced"] == 7
+    assert len(client.cache.in_flight) == 0
+
+    # 不同的问题和高温度请求不合并
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda text: client.chat(_messages(text)), ["a", "b"]))
+        list(pool.map(lambda _: client.chat(_messages("hi"), temperature=0.9), range(2)))
+    assert client.llm.calls == 5
+
+
+def test_waiters_share_the_leader_exception():
+    client = _client(fail=True)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(client.chat, _messages("hi")) for _ in range(4)]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="rate limited"):
+                future.result()
+    assert client.llm.calls == 1
+    # 失败不会被缓存，也不会留下执行中的记录
+    client.llm.fail = False
+    assert client.chat(_messages("hi"))["content"] == "answer: hi"
+    assert client.llm.calls == 2
+
+
+def test_async_chats_coalesce_and_survive_cancellation():
+    client = _client()
+
+    async def main():
+        first = asyncio.ensure_future(client.async_chat(_messages("hi")))
+        await asyncio.sleep(0)
+        others = [asyncio.ensure_future(client.async_chat(_messages("hi"))) for _ in range(3)]
+        await asyncio.sleep(0)
+        # 发起请求的调用者被取消，其他等待者仍然得到结果
+        first.cancel()
+        return await asyncio.gather(*others)
+
+    results = asyncio.run(main())
+    assert [result["content"] for result in results] == ["answer: hi"] * 3
+    assert client.llm.calls == 1
+
+    failing = _client(fail=True)
+
+    async def failing_main():
+        return await asyncio.gather(*[failing.async_chat(_messages("hi")) for _ in range(3)],
+                                    return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(failing_main()))
+    assert failing.llm.calls == 1
+
+
+def test_single_flight_can_be_disabled():
+    client = _client(single_flight=False)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(lambda _: client.chat(_messages("hi")), range(3)))
+    assert client.llm.calls == 3
+    assert client.cache.stats()["coalesced"] == 0
+
+
+def test_sync_and_async_chats_coalesce():
+    client = _client()
+
+    async def async_leader():
+        leader = asyncio.ensure_future(client.async_chat(_messages("hi")))
+        await asyncio.sleep(0.01)
+        # 线程中的同步调用等待事件循环中正在执行的请求
+        sync_result = await asyncio.to_thread(client.chat, _messages("hi"))
+        return await leader, sync_result
+
+    results = asyncio.run(async_leader())
+    assert [result["content"] for result in results] == ["answer: hi"] * 2
+    assert client.llm.calls == 1
+
+    async def sync_leader():
+        leader = asyncio.ensure_future(asyncio.to_thread(client.chat, _messages("again")))
+        await asyncio.sleep(0.05)
+        return await asyncio.gather(leader, client.async_chat(_messages("again")))
+
+    results = asyncio.run(sync_leader())
+    assert [result["content"] for result in results] == ["answer: again"] * 2
+    assert client.llm.calls == 2
+    assert client.cache.stats()["coalesced"] == 2
+    assert len(client.cache.in_flight) == 0
+
+
+def test_sync_chat_on_the_leader_loop_does_not_deadlock():
+    client = _client()
+
+    async def main():
+        leader = asyncio.ensure_future(client.async_chat(_messages("hi")))
+        await asyncio.sleep(0.01)
+        # 在事件循环线程中阻塞等待同一循环里的任务会死锁，这里应单独调用
+        sync_result = client.chat(_messages("hi"))
+        return await leader, sync_result
+
+    results = asyncio.run(main())
+    assert [result["content"] for result in results] == ["answer: hi"] * 2
+    assert client.llm.calls == 2
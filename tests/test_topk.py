@@ -0,0 +1,20 @@
+import sys
+import os
+import random
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from agents.knowledge_base.improved_rag.topk import select_top_k
+
+
+def test_select_top_k_matches_full_sort():
+    rng = random.Random(7)
+    scored = [(rng.random(), object()) for _ in range(500)]
+    expected = sorted(scored, key=lambda pair: pair[0], reverse=True)
+    assert select_top_k(iter(scored), 10) == expected[:10]
+    assert select_top_k(scored, 1000) == expected
+    assert select_top_k(scored, None) == expected
+    assert select_top_k(scored, 0) == []
+
+
+def test_select_top_k_keeps_input_order_on_ties():
+    scored = [(0.5, "a"), (0.9, "b"), (0.5, "c"), (0.5, "d"), (0.1, "e")]
+    assert select_top_k(scored, 3) == [(0.9, "b"), (0.5, "a"), (0.5, "c")]
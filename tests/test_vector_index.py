@@ -0,0 +1,135 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import numpy as np
+from agents.knowledge_base.improved_rag.vector_index import FlatVectorIndex
+from agents.knowledge_base.improved_rag.hnsw_index import HNSWIndex
+
+
+def _random_vectors(n, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def test_flat_index_matches_brute_force():
+    vectors = _random_vectors(200, 16)
+    index = FlatVectorIndex(initial_capacity=8)
+    index.add_batch([f"c{i}" for i in range(200)], vectors.tolist())
+
+    query = vectors[7] + 0.01
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normed @ (query / np.linalg.norm(query))))[:5]
+
+    results = index.search(query.tolist(), 5)
+    assert [chunk_id for _, chunk_id in results] == [f"c{i}" for i in expected]
+    assert results[0][1] == "c7"
+    assert results[0][0] >= results[-1][0]
+
+
+def test_flat_index_remove_keeps_rows_consistent():
+    vectors = _random_vectors(10, 4)
+    index = FlatVectorIndex()
+    index.add_batch([f"c{i}" for i in range(10)], vectors.tolist())
+
+    assert index.remove("c3")
+    assert not index.remove("c3")
+    assert len(index) == 9
+    assert "c3" not in index
+
+    # 被移动到空洞的最后一行仍然可以被精确检索到
+    results = index.search(vectors[9].tolist(), 1)
+    assert results[0][1] == "c9"
+
+
+def test_flat_index_candidate_restriction_and_overwrite():
+    index = FlatVectorIndex()
+    index.add("a", [1.0, 0.0])
+    index.add("b", [0.9, 0.1])
+    index.add("c", [0.0, 1.0])
+
+    results = index.search([1.0, 0.0], 2, candidate_ids=["b", "c", "missing"])
+    assert [chunk_id for _, chunk_id in results] == ["b", "c"]
+
+    index.add("a", [0.0, 1.0])
+    assert len(index) == 3
+    assert index.search([0.0, 1.0], 1, candidate_ids=["a"])[0][1] == "a"
+    assert index.search([0.0, 0.0], 3) == []
+
+
+def test_hnsw_recall_against_flat():
+    vectors = _random_vectors(1000, 16, seed=1)
+    queries = _random_vectors(20, 16, seed=2)
+    ids = [f"c{i}" for i in range(1000)]
+    flat = FlatVectorIndex()
+    flat.add_batch(ids, vectors.tolist())
+    hnsw = HNSWIndex(m=8, ef_construction=100, ef_search=64, seed=0)
+    hnsw.add_batch(ids, vectors.tolist())
+
+    hits = 0
+    for query in queries:
+        exact = {chunk_id for _, chunk_id in flat.search(query.tolist(), 10)}
+        approx = {chunk_id for _, chunk_id in hnsw.search(query.tolist(), 10)}
+        hits += len(exact & approx)
+    assert hits / 200 >= 0.9
+
+
+def test_hnsw_tombstones_and_candidates():
+    vectors = _random_vectors(300, 8, seed=3)
+    hnsw = HNSWIndex(m=6, seed=0)
+    hnsw.add_batch([f"c{i}" for i in range(300)], vectors.tolist())
+
+    assert hnsw.search(vectors[5].tolist(), 1)[0][1] == "c5"
+    assert hnsw.remove("c5")
+    assert "c5" not in hnsw and len(hnsw) == 299
+    assert all(chunk_id != "c5" for _, chunk_id in hnsw.search(vectors[5].tolist(), 10))
+
+    results = hnsw.search(vectors[5].tolist(), 3, candidate_ids=["c1", "c2", "c5"])
+    assert sorted(chunk_id for _, chunk_id in results) == ["c1", "c2"]
+
+    hnsw.compact()
+    assert hnsw.tombstone_count == 0 and len(hnsw) == 299
+    assert hnsw.search(vectors[7].tolist(), 1)[0][1] == "c7"
+
+
+def test_hnsw_compacts_automatically_under_update_churn():
+    vectors = _random_vectors(100, 8, seed=4)
+    ids = [f"c{i}" for i in range(100)]
+    hnsw = HNSWIndex(m=6, seed=0, compaction_ratio=0.5)
+    hnsw.add_batch(ids, vectors.tolist())
+
+    # 反复重新写入同一批chunk：墓碑不会无限累积
+    for round_ in range(5):
+        hnsw.add_batch(ids[:40], (vectors[:40] + 0.01 * (round_ + 1)).tolist())
+        assert hnsw.tombstone_count <= len(hnsw) * 0.5
+    assert len(hnsw) == 100 and len(hnsw._node_ids) <= 150
+    assert hnsw.search(vectors[60].tolist(), 1)[0][1] == "c60"
+
+    for chunk_id in ids[:60]:
+        hnsw.remove(chunk_id)
+    assert hnsw.tombstone_count <= len(hnsw) * 0.5 and len(hnsw) == 40
+
+    manual = HNSWIndex(m=6, seed=0, compaction_ratio=None)
+    manual.add_batch(ids, vectors.tolist())
+    manual.add_batch(ids, vectors.tolist())
+    assert manual.tombstone_count == 100
+
+
+def test_flat_index_search_batch_matches_single_queries():
+    vectors = _random_vectors(300, 16)
+    index = FlatVectorIndex()
+    index.add_batch([f"c{i}" for i in range(300)], vectors)
+    queries = list(_random_vectors(40, 16, seed=3)) + [np.zeros(16), np.ones(8)]
+
+    batch = index.search_batch(queries, 5, block_size=16)
+    for query, results in zip(queries[:40], batch):
+        single = index.search(query, 5)
+        assert {chunk_id for _, chunk_id in results} == {chunk_id for _, chunk_id in single}
+        assert np.allclose([score for score, _ in results], [score for score, _ in single], atol=1e-5)
+    assert batch[40:] == [[], []]
+
+    candidates = [f"c{i}" for i in range(0, 300, 7)]
+    batch = index.search_batch(queries[:5], 50, candidate_ids=candidates)
+    for query, results in zip(queries[:5], batch):
+        single = index.search(query, 50, candidate_ids=candidates)
+        assert {chunk_id for _, chunk_id in results} == {chunk_id for _, chunk_id in single}
+        assert np.allclose([score for score, _ in results], [score for score, _ in single], atol=1e-5)